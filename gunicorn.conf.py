@@ -0,0 +1,67 @@
+"""
+gunicorn settings for production; picked up automatically when gunicorn
+is started from the project directory:
+
+    gunicorn
+
+The application is loaded and warmed up once in the master (see
+patents/warmup.py) and workers are forked from it ready to serve. Startup
+phase timings are written to the error log.
+"""
+import gc
+import multiprocessing
+import os
+import time
+
+
+_started = time.perf_counter()
+
+wsgi_app = 'patent_project.wsgi:application'
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', '1'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = 30
+keepalive = 5
+
+# Load the application in the master so workers share it copy-on-write
+preload_app = True
+# Recycle workers now and then; staggered so they do not all restart at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = max_requests // 10
+# Worker heartbeat files in memory rather than on a possibly slow disk
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+# Objects freed while the master loads the application leave holes in pages
+# the workers share, and a collection in a worker writes to every object it
+# inherited: collection stays off until the loaded objects are frozen
+gc.disable()
+
+
+def when_ready(server):
+    """Warm up the preloaded application, then freeze it for the workers"""
+    from patents.warmup import warm_up
+
+    server.log.info('Application loaded in %.0f ms', (time.perf_counter() - _started) * 1000)
+    for name, seconds, count in warm_up():
+        if count is None:
+            server.log.warning('Warm-up %s failed after %.0f ms', name, seconds * 1000)
+        else:
+            server.log.info('Warm-up %s: %d in %.0f ms', name, count, seconds * 1000)
+    gc.freeze()
+    gc.enable()
+    server.log.info('Ready in %.0f ms, %d objects frozen', (time.perf_counter() - _started) * 1000, gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    from django.db import connections
+
+    worker.forked_at = time.perf_counter()
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    worker.log.info('Worker %s ready in %.1f ms after fork', worker.pid, (time.perf_counter() - worker.forked_at) * 1000)
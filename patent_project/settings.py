@@ -42,8 +42,12 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # Add WhiteNoise for static files
+    # gzip/brotli for pages; below WhiteNoise, which serves precompressed static files
+    "patents.middleware.CompressionMiddleware",
+    "patents.middleware.ProfileMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
+    "patents.middleware.TenantMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
@@ -51,16 +55,25 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = "patent_project.urls"
 
+# Compiled templates are kept in memory when DEBUG is off; in development they
+# are re-read on every render so edits show up without a restart
+TEMPLATE_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+if not DEBUG:
+    TEMPLATE_LOADERS = [("django.template.loaders.cached.Loader", TEMPLATE_LOADERS)]
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [],
-        "APP_DIRS": True,
         "OPTIONS": {
             "context_processors": [
                 "django.template.context_processors.request",
                 "django.contrib.messages.context_processors.messages",
             ],
+            "loaders": TEMPLATE_LOADERS,
         },
     },
 ]
@@ -75,10 +88,32 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Wait for the background worker's write transactions instead of failing
+        "OPTIONS": {"timeout": 20},
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# File-based so that every gunicorn worker on the host shares invalidation tokens
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("CACHE_LOCATION", BASE_DIR / ".django_cache"),
+    },
+    # Rate-limit buckets and concurrency slots (patents/throttling.py): one
+    # entry per active client, so the default cap of 300 entries would cull
+    # buckets under load and hand clients fresh ones
+    "throttle": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("THROTTLE_CACHE_LOCATION", BASE_DIR / ".throttle_cache"),
+        "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("THROTTLE_CACHE_MAX_ENTRIES", 100000))},
+    },
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/6.0/topics/i18n/
 
@@ -98,8 +133,49 @@ STATIC_URL = "/static/"
 STATICFILES_DIRS = [BASE_DIR / "patents" / "static"]
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
-# WhiteNoise configuration for static files
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+# WhiteNoise configuration for static files. Django 5.1 ignores the old
+# STATICFILES_STORAGE setting, so the storage is configured through STORAGES.
+# collectstatic writes content-hashed names plus .gz/.br copies, and WhiteNoise
+# serves hashed files with a one-year "immutable" Cache-Control header.
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
+    },
+}
+
+# Serve the minified bundles from `manage.py build_assets` instead of the
+# source CSS/JS (defaults to on when DEBUG is off)
+PATENTS_ASSET_BUNDLES = os.environ.get('ASSET_BUNDLES', str(not DEBUG)) == 'True'
+
+# Institute served on host names that match no tenant, and owner of rows
+# written by management commands run without --tenant
+PATENTS_DEFAULT_TENANT = os.environ.get('DEFAULT_TENANT', 'iiest')
+
+# Rate and concurrency limits on the search, list and export pages (see
+# patents/throttling.py). Trust X-Forwarded-For only behind your own proxy.
+PATENTS_THROTTLING = os.environ.get('THROTTLING', 'True') == 'True'
+PATENTS_TRUST_X_FORWARDED_FOR = os.environ.get('TRUST_X_FORWARDED_FOR', 'False') == 'True'
+
+# TF-IDF index files behind the "related records" lookups, memory-mapped
+# by every worker (written by manage.py rebuild_similarity_index)
+PATENTS_VECTOR_DIR = Path(os.environ.get('VECTOR_DIR', BASE_DIR / 'vectors'))
+
+# Columnar snapshots read by the reports page, memory-mapped by every
+# worker (written by manage.py build_analytics_snapshot)
+PATENTS_ANALYTICS_DIR = Path(os.environ.get('ANALYTICS_DIR', BASE_DIR / 'analytics'))
+
+# Keep each institute's copyrights and patents in memory and answer the list
+# and search pages from that copy instead of SQLite (see patents/readstore.py)
+PATENTS_READ_STORE = os.environ.get('READ_STORE', 'False') == 'True'
+
+# A request sending this value in an X-Profile-Token header is profiled and
+# its report written to PATENTS_PROFILE_DIR (see patents/profiling.py).
+# Empty, the default, turns request profiling off.
+PATENTS_PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PATENTS_PROFILE_DIR = Path(os.environ.get('PROFILE_DIR', BASE_DIR / 'profiles'))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/6.0/ref/settings/#default-auto-field
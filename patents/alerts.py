@@ -0,0 +1,209 @@
+"""
+Saved searches and alerts of new matching records.
+
+A saved search keeps the search form's fields and facets. Rather than
+re-running every saved search when a record is saved, each search is
+indexed under one key that any matching record must produce:
+
+- a trigram of its longest text condition (fields are matched with
+  icontains, so a matching record's field contains every trigram of it);
+- otherwise a stored facet value it selects (year, applicant, topic);
+- otherwise the wildcard key, for searches on computed facets only.
+
+When a filed or granted patent is saved (from the edit pages or
+import_csv), the trigrams and facet values of that one record are looked
+up in the key index, and only the searches found there are checked
+against that record alone. The work done grows with the size of the
+record and the number of candidate searches, not with the table or the
+number of saved searches. The fields a tenant's searches are indexed
+under are cached, so a save only computes and looks up the keys of those
+fields, and runs no query at all while the tenant has no saved searches.
+Matches are recorded as SearchAlert rows, listed on the saved searches
+page.
+"""
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import SavedSearch, SavedSearchKey, SearchAlert
+from .readstore import ascii_lower
+from .tables import TABLES
+
+
+SOURCES = ('filed', 'granted')
+GRAM = 3
+WILDCARD = '*'
+MAX_VALUE_LENGTH = 100
+
+KEY_FIELDS_KEY = 'patents:saved_search_fields:{}'
+# Bounds how long a read racing a new saved search can cache stale fields
+KEY_FIELDS_TIMEOUT = 300
+
+
+def scope_for_model(model):
+    for scope in SOURCES:
+        if TABLES[scope].model is model:
+            return scope
+    return None
+
+
+def _lookup_field(lookup):
+    return lookup.split('__', 1)[0]
+
+
+def _stored_facets(scope):
+    """Facets of a table that are stored columns, and so have a value on an unsaved instance"""
+    return [facet for facet in TABLES[scope].facets if facet.expression is None]
+
+
+def _trigrams(text):
+    text = text.lower()
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+def search_params(scope, params):
+    """The search form fields and facet selections of a query, without blanks and unknown parameters"""
+    spec = TABLES[scope]
+    names = list(spec.search_fields) + [facet.param for facet in spec.facets]
+    return {name: params.get(name, '').strip()[:MAX_VALUE_LENGTH] for name in names if params.get(name, '').strip()}
+
+
+def search_key(scope, params):
+    """(field, term) a search is indexed under"""
+    texts = [(param, params[param]) for param in TABLES[scope].search_fields if len(params.get(param, '')) >= GRAM]
+    if texts:
+        param, value = max(texts, key=lambda item: len(item[1]))
+        grams = sorted(_trigrams(value))
+        # Trigrams spanning a space ("e c") are the most common ones
+        grams = [gram for gram in grams if ' ' not in gram] or grams
+        return param, grams[len(grams) // 2]
+    for facet in _stored_facets(scope):
+        value = facet.from_param(params[facet.param]) if params.get(facet.param) else None
+        if value is not None:
+            return facet.param, facet.to_param(value)
+    return WILDCARD, ''
+
+
+def save_search(name, scope, params):
+    """Create a saved search and its index key"""
+    search = SavedSearch.objects.create(name=name, scope=scope, params=params)
+    field, term = search_key(scope, params)
+    SavedSearchKey.objects.create(search=search, scope=scope, field=field, term=term)
+    return search
+
+
+def search_url(search):
+    return reverse(f'patents:{search.scope}_search') + '?' + urlencode(search.params)
+
+
+def key_fields(tenant_id, scope):
+    """Fields the tenant's saved searches on a table are indexed under"""
+    key = KEY_FIELDS_KEY.format(tenant_id)
+    fields = cache.get(key)
+    if fields is None:
+        fields = {}
+        rows = SavedSearchKey.objects.unscoped().filter(tenant_id=tenant_id).values_list('scope', 'field').distinct()
+        for search_scope, field in rows:
+            fields.setdefault(search_scope, set()).add(field)
+        cache.set(key, fields, KEY_FIELDS_TIMEOUT)
+    return fields.get(scope, set())
+
+
+def invalidate(tenant_id):
+    """Forget the cached key fields after a saved search is added or deleted"""
+    cache.delete(KEY_FIELDS_KEY.format(tenant_id))
+
+
+def record_keys(scope, instance, fields=None):
+    """{field: terms} a record produces, matching the keys of searches it may satisfy"""
+    spec = TABLES[scope]
+    keys = {}
+    for param, lookup in spec.search_fields.items():
+        if fields is not None and param not in fields:
+            continue
+        value = getattr(instance, _lookup_field(lookup))
+        if value:
+            keys[param] = _trigrams(str(value))
+    for facet in _stored_facets(scope):
+        if fields is not None and facet.param not in fields:
+            continue
+        value = getattr(instance, instance._meta.get_field(facet.column).attname)
+        if value not in (None, ''):
+            keys[facet.param] = {facet.to_param(value)}
+    return keys
+
+
+def candidates(scope, instance):
+    """Saved searches indexed under a key the record produces"""
+    fields = key_fields(instance.tenant_id, scope)
+    condition = Q(field=WILDCARD) if WILDCARD in fields else Q()
+    for field, terms in record_keys(scope, instance, fields).items():
+        if terms:
+            condition |= Q(field=field, term__in=terms)
+    if not condition:
+        return []
+    search_ids = (
+        SavedSearchKey.objects.unscoped()
+        .filter(tenant_id=instance.tenant_id, scope=scope).filter(condition)
+        .values('search_id')
+    )
+    return list(SavedSearch.objects.unscoped().filter(pk__in=search_ids))
+
+
+def _icontains(value, text):
+    # SQLite's LIKE, which icontains uses, ignores the case of ASCII letters only
+    return ascii_lower(value) in ascii_lower(str(text))
+
+
+def matches(search, instance):
+    """
+    Whether a saved record is in the results of a search. Text fields and
+    stored facets are compared on the instance; a search on computed
+    facets (status) is run by the database against this one record.
+    """
+    spec = TABLES[search.scope]
+    stored = {facet.param: facet for facet in _stored_facets(search.scope)}
+    computed = False
+    for param, value in search.params.items():
+        lookup = spec.search_fields.get(param)
+        if lookup is not None and lookup.endswith('__icontains'):
+            text = getattr(instance, _lookup_field(lookup))
+            if text is None or not _icontains(value, text):
+                return False
+        elif param in stored:
+            facet = stored[param]
+            selected = facet.from_param(value)
+            if selected is None:
+                # Ignored by the search page too
+                continue
+            current = getattr(instance, instance._meta.get_field(facet.column).attname)
+            if current in (None, '') or facet.to_param(current) != facet.to_param(selected):
+                return False
+        else:
+            computed = True
+    if computed:
+        record = spec.model.objects.unscoped().filter(tenant_id=instance.tenant_id, pk=instance.pk)
+        return spec.filter(record, search.params).exists()
+    return True
+
+
+def percolate(scope, instance, created):
+    """Record an alert for every saved search a just-saved record matches; returns them"""
+    found = [search for search in candidates(scope, instance) if matches(search, instance)]
+    if found:
+        SearchAlert.objects.unscoped().bulk_create(
+            [
+                SearchAlert(
+                    tenant_id=instance.tenant_id, search=search, object_id=instance.pk,
+                    created=created, created_at=timezone.now(),
+                )
+                for search in found
+            ],
+            update_conflicts=True,
+            unique_fields=['search', 'object_id'],
+            update_fields=['seen', 'created_at'],
+        )
+    return found
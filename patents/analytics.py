@@ -0,0 +1,225 @@
+"""
+Columnar analytics snapshot.
+
+``manage.py build_analytics_snapshot`` copies a tenant's records into Arrow
+IPC files, one per table plus one per IP category with ``data`` flattened
+into typed columns, compressed with zstd. Rows are read straight from
+cursors (no model instances) and written a record batch at a time, so the
+export runs in bounded memory. Reports (reports.py) memory-map the files,
+read just the columns they need and aggregate them with pyarrow.compute,
+without touching the live database.
+
+A snapshot is a published generation (generations.py) under
+PATENTS_ANALYTICS_DIR; its manifest records when it was taken and the
+change-log sequence it reflects, so pages can say how far behind it is.
+"""
+import json
+import threading
+from datetime import date, datetime
+from pathlib import Path
+
+import pyarrow as pa
+from pyarrow import feather
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from . import changelog
+from .generations import current_generation, new_generation, publish, store_dir
+from .models import Copyright, IntellectualProperty, IPCategory, PatentFiled, PatentGranted, PatentLifecycle, Topic
+
+
+# snapshot table -> model; IP categories are added as 'ip-<slug>'
+TABLES = {
+    'copyrights': Copyright,
+    'filed': PatentFiled,
+    'granted': PatentGranted,
+    'lifecycle': PatentLifecycle,
+    'topics': Topic,
+}
+BATCH_SIZE = 20000
+COMPRESSION = 'zstd'
+
+_columns = {}
+_lock = threading.Lock()
+
+
+def snapshot_root():
+    return Path(getattr(settings, 'PATENTS_ANALYTICS_DIR', settings.BASE_DIR / 'analytics'))
+
+
+def _arrow_type(field):
+    if isinstance(field, (models.ForeignKey, models.AutoField, models.BigAutoField)):
+        return pa.int64()
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, models.IntegerField):
+        return pa.int64()
+    if isinstance(field, models.FloatField):
+        return pa.float64()
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    if isinstance(field, models.DateField):
+        return pa.date32()
+    if isinstance(field, (models.CharField, models.TextField)):
+        return pa.string()
+    return None
+
+
+def model_columns(model):
+    """(column names, arrow schema) of a model's exported fields (tenant and JSON left out)"""
+    names, fields = [], []
+    for field in model._meta.concrete_fields:
+        arrow_type = _arrow_type(field)
+        if arrow_type is None or field.name == 'tenant':
+            continue
+        names.append(field.attname)
+        fields.append(pa.field(field.attname, arrow_type))
+    return names, pa.schema(fields)
+
+
+def _write(path, schema, batches):
+    """Write record batches to a compressed Arrow IPC file; returns the row count"""
+    rows = 0
+    options = pa.ipc.IpcWriteOptions(compression=COMPRESSION)
+    with pa.OSFile(str(path), 'wb') as sink, pa.ipc.new_file(sink, schema, options=options) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _model_batches(queryset, names, schema, batch_size):
+    rows = queryset.order_by('pk').values_list(*names).iterator(chunk_size=batch_size)
+    for chunk in _chunks(rows, batch_size):
+        yield pa.record_batch([pa.array(column, type=field.type) for column, field in zip(zip(*chunk), schema)], schema=schema)
+
+
+IP_TYPES = {
+    'number': pa.float64(),
+    'date': pa.date32(),
+}
+
+
+def _ip_value(field_type, value):
+    """Typed value of a stored IP field (stored values are validated strings)"""
+    if value in (None, ''):
+        return None
+    try:
+        if field_type == 'number':
+            return float(value)
+        if field_type == 'date':
+            return date.fromisoformat(value)
+    except ValueError:
+        return None
+    return value
+
+
+def _ip_batches(category, schema, batch_size):
+    definitions = category.field_definitions
+    items = (
+        IntellectualProperty.objects.unscoped().filter(category=category).order_by('pk')
+        .values_list('pk', 'created_at', 'updated_at', 'data').iterator(chunk_size=batch_size)
+    )
+    for chunk in _chunks(items, batch_size):
+        columns = [[row[0] for row in chunk], [row[1] for row in chunk], [row[2] for row in chunk]]
+        for field_def in definitions:
+            field_type = field_def.get('type', 'text')
+            columns.append([_ip_value(field_type, (row[3] or {}).get(field_def['name'])) for row in chunk])
+        yield pa.record_batch([pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema)
+
+
+def ip_schema(category):
+    fields = [
+        pa.field('id', pa.int64()),
+        pa.field('created_at', pa.timestamp('us', tz='UTC')),
+        pa.field('updated_at', pa.timestamp('us', tz='UTC')),
+    ]
+    for field_def in category.field_definitions:
+        fields.append(pa.field(field_def['name'], IP_TYPES.get(field_def.get('type'), pa.string())))
+    return pa.schema(fields)
+
+
+def build_snapshot(tenant, batch_size=BATCH_SIZE, progress=None):
+    """Write and publish a snapshot of a tenant's records; returns {table: rows}"""
+    # Taken first: the snapshot holds at least every change up to here
+    seq = changelog.head(tenant)
+    directory = new_generation(store_dir(tenant.pk, 'analytics', snapshot_root()))
+    counts = {}
+    for name, model in TABLES.items():
+        names, schema = model_columns(model)
+        queryset = model.objects.unscoped().filter(tenant=tenant)
+        counts[name] = _write(directory / f'{name}.arrow', schema, _model_batches(queryset, names, schema, batch_size))
+        if progress:
+            progress(name, counts[name])
+
+    categories = {}
+    for category in IPCategory.objects.unscoped().filter(tenant=tenant).order_by('name'):
+        name = f'ip-{category.slug}'
+        counts[name] = _write(directory / f'{name}.arrow', ip_schema(category), _ip_batches(category, ip_schema(category), batch_size))
+        categories[name] = category.name
+        if progress:
+            progress(name, counts[name])
+
+    (directory / 'manifest.json').write_text(json.dumps({
+        'taken_at': timezone.now().isoformat(),
+        'change_seq': seq,
+        'tables': counts,
+        'categories': categories,
+    }, indent=2), encoding='utf-8')
+    publish(directory)
+    return counts
+
+
+class Snapshot:
+    """The published snapshot of one tenant"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest = json.loads((directory / 'manifest.json').read_text(encoding='utf-8'))
+
+    @classmethod
+    def current(cls, tenant_id):
+        """The tenant's latest snapshot, or None if none was taken"""
+        directory = current_generation(store_dir(tenant_id, 'analytics', snapshot_root()))
+        return cls(directory) if directory is not None else None
+
+    @property
+    def taken_at(self):
+        return datetime.fromisoformat(self.manifest['taken_at'])
+
+    @property
+    def change_seq(self):
+        return self.manifest['change_seq']
+
+    @property
+    def categories(self):
+        """{table name: category name} of the IP category tables"""
+        return self.manifest['categories']
+
+    def table(self, name, columns):
+        """
+        The given columns of a snapshot table. Only those columns are read
+        and decompressed; each stays cached while this snapshot is current.
+        """
+        missing = [column for column in columns if (self.directory, name, column) not in _columns]
+        if missing:
+            table = feather.read_table(str(self.directory / f'{name}.arrow'), columns=missing, memory_map=True)
+            with _lock:
+                # Columns of older generations are dropped once a newer one is read
+                for key in [k for k in _columns if k[0] != self.directory and k[0].parent == self.directory.parent]:
+                    del _columns[key]
+                for column in missing:
+                    _columns[(self.directory, name, column)] = table.column(column)
+        return pa.table({column: _columns[(self.directory, name, column)] for column in columns})
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class PatentsConfig(AppConfig):
     name = "patents"
+
+    def ready(self):
+        # Register signal handlers and background tasks
+        from . import signals, tasks  # noqa: F401
@@ -0,0 +1,126 @@
+"""
+Static asset build step.
+
+``manage.py build_assets`` concatenates and minifies the CSS and JS
+sources into one file each under ``patents/static/patents/dist/`` and
+writes resized WebP/AVIF/PNG copies of the header logo. collectstatic then
+gives every file a content hash and a .gz/.br sibling (WhiteNoise's
+CompressedManifestStaticFilesStorage), and WhiteNoise serves hashed files
+with a one-year immutable Cache-Control header.
+
+Templates use the ``patent_assets`` tags, which fall back to the source
+files when bundles are disabled (DEBUG) or have not been built.
+"""
+import re
+from pathlib import Path
+
+from django.conf import settings
+
+
+STATIC_SOURCE = Path(__file__).resolve().parent / 'static'
+DIST_DIR = 'patents/dist'
+
+# bundle -> source files, in load order (paths relative to STATIC_SOURCE)
+BUNDLES = {
+    'css': (f'{DIST_DIR}/app.min.css', ['patents/css/styles.css']),
+    'js': (f'{DIST_DIR}/app.min.js', ['patents/js/main.js']),
+}
+
+LOGO_SOURCE = 'patents/images/IIESTS_logo.png'
+# The header shows the logo 60px high; 2x and 3x cover high-density screens
+LOGO_WIDTHS = (60, 120, 180)
+# Pillow format name -> (extension, MIME type, save options)
+LOGO_FORMATS = {
+    'AVIF': ('avif', 'image/avif', {'quality': 60}),
+    'WEBP': ('webp', 'image/webp', {'quality': 80, 'method': 6}),
+}
+# The <img> fallback for browsers without AVIF/WebP
+LOGO_FALLBACK_WIDTH = 120
+
+_css_tokens = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.DOTALL)
+_css_strings = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+_css_spaces = re.compile(r'\s*([{};,>])\s*')
+
+
+def bundles_enabled():
+    return getattr(settings, 'PATENTS_ASSET_BUNDLES', not settings.DEBUG)
+
+
+def logo_variant_name(width, extension):
+    return f'{DIST_DIR}/IIESTS_logo-{width}.{extension}'
+
+
+def minify_css(source):
+    """Drop comments and redundant whitespace; string literals are kept as-is"""
+    source = _css_tokens.sub(lambda m: m.group(1) or '', source)
+    parts = _css_strings.split(source)
+    for i in range(0, len(parts), 2):
+        part = ' '.join(parts[i].split())
+        part = _css_spaces.sub(r'\1', part)
+        parts[i] = part.replace(': ', ':').replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+def minify_js(source):
+    """
+    Strip indentation, blank lines and whole-line comments. Line breaks are
+    kept so automatic semicolon insertion behaves exactly as in the source.
+    """
+    lines = []
+    in_comment = False
+    for line in source.splitlines():
+        line = line.strip()
+        if in_comment:
+            in_comment = '*/' not in line
+            continue
+        if line.startswith('/*'):
+            in_comment = '*/' not in line
+            continue
+        if line and not line.startswith('//'):
+            lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {'css': minify_css, 'js': minify_js}
+
+
+def build_bundles(source_dir=STATIC_SOURCE):
+    """Write the minified bundles; returns [(bundle name, source bytes, output bytes)]"""
+    results = []
+    for kind, (output, sources) in BUNDLES.items():
+        text = '\n'.join((source_dir / name).read_text(encoding='utf-8') for name in sources)
+        minified = MINIFIERS[kind](text)
+        path = source_dir / output
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(minified, encoding='utf-8')
+        results.append((output, len(text.encode('utf-8')), path.stat().st_size))
+    return results
+
+
+def build_logo_variants(source_dir=STATIC_SOURCE):
+    """
+    Write the resized logo files. Returns ([(name, bytes)], [skipped format
+    names]); formats missing from the installed Pillow are skipped.
+    """
+    from PIL import Image, features
+
+    written = []
+    skipped = []
+    with Image.open(source_dir / LOGO_SOURCE) as image:
+        image = image.convert('RGBA')
+        (source_dir / DIST_DIR).mkdir(parents=True, exist_ok=True)
+        for width in LOGO_WIDTHS:
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.LANCZOS)
+            targets = [(fmt,) + LOGO_FORMATS[fmt] for fmt in LOGO_FORMATS]
+            if width == LOGO_FALLBACK_WIDTH:
+                targets.append(('PNG', 'png', 'image/png', {'optimize': True}))
+            for fmt, extension, mime, options in targets:
+                if fmt != 'PNG' and not features.check(fmt.lower()):
+                    if fmt not in skipped:
+                        skipped.append(fmt)
+                    continue
+                name = logo_variant_name(width, extension)
+                resized.save(source_dir / name, fmt, **options)
+                written.append((name, (source_dir / name).stat().st_size))
+    return written, skipped
@@ -0,0 +1,79 @@
+"""
+Set-based inserts for imports.
+
+Model.objects.bulk_create prepares every value of every row through the
+field and compiler machinery and splits a batch into statements of at most
+999 parameters. For an import of new rows that per-row work costs more
+than SQLite does, so import_ip writes a batch with:
+
+- ``insert_instances``: one INSERT executed (executemany) for all of the
+  batch's new instances, whose values are prepared field by field and
+  whose auto_now timestamps are adapted once per batch; the pks SQLite
+  assigned are set on the instances afterwards;
+- ``insert_rows``: the same for rows of column values built by the
+  caller (change log entries, record versions).
+
+changelog.record_inserted then copies the batch's rows to the change log
+with one INSERT ... SELECT. insert_instances relies on how SQLite assigns
+rowids, so on other databases it falls back to bulk_create.
+"""
+from django.db import connection, connections
+from django.utils import timezone
+
+
+def supported():
+    return connection.vendor == 'sqlite'
+
+
+def insert_rows(model, columns, rows):
+    """Append rows of column values, already in database form, with one executemany"""
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table), ', '.join(quote(column) for column in columns), ', '.join(['%s'] * len(columns)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def insert_instances(model, instances):
+    """
+    Insert new instances of a model and set their pks, as bulk_create
+    does. Call inside a transaction: the pks are the range below the
+    table's highest one after the insert, which no other writer can
+    take while the transaction holds SQLite's write lock.
+    """
+    if not instances:
+        return
+    if not supported():
+        model.objects.bulk_create(instances)
+        return
+    # Resolved once: every attribute read through django.db.connection goes through a thread-local proxy
+    db = connections[connection.alias]
+    now = timezone.now()
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    columns, converters = [], []
+    for field in fields:
+        columns.append(field.column)
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+            for instance in instances:
+                setattr(instance, field.attname, now)
+            value = field.get_db_prep_save(now, db)
+            converters.append(lambda instance, value=value: value)
+        else:
+            converters.append(
+                lambda instance, field=field: field.get_db_prep_save(getattr(instance, field.attname), db)
+            )
+    insert_rows(model, columns, [tuple(convert(instance) for convert in converters) for instance in instances])
+
+    pk = model._meta.pk
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT MAX({}) FROM {}'.format(
+            connection.ops.quote_name(pk.column), connection.ops.quote_name(model._meta.db_table),
+        ))
+        last = cursor.fetchone()[0]
+    for offset, instance in enumerate(instances, start=last - len(instances) + 1):
+        setattr(instance, pk.attname, offset)
+        instance._state.adding = False
+        instance._state.db = db.alias
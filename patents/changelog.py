@@ -0,0 +1,166 @@
+"""
+Append-only change log for incremental sync.
+
+Every create/update/delete of a record, category or IP item adds a
+ChangeLogEntry with a monotonically increasing ``seq`` and the row's
+values after the change. Consumers call ``/changes/?since=<last seq>``
+and only read what changed since their previous pull.
+
+Entries are written by the signals in signals.py, which run inside the
+saving transaction, and explicitly by paths that bypass signals:
+import_ip's bulk inserts and category schema migrations. Those add a
+batch of entries with one INSERT executed for all of its rows, and
+import_ip copies the entries of the rows it just inserted with one
+INSERT ... SELECT whose payloads SQLite builds from the stored columns.
+SQLite serializes writers, so entries become visible in sequence order.
+
+Entries carry the tenant of the row, and the feed of one tenant is read on
+the (tenant, seq) index. Sequence numbers are shared by all tenants, so a
+tenant's feed has gaps; consumers only rely on them increasing.
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, models
+from django.utils import timezone
+
+from .bulk import insert_rows, supported
+from .models import ChangeLogEntry, Copyright, IntellectualProperty, IPCategory, PatentFiled, PatentGranted
+
+
+# model -> table name used in the feed
+TRACKED_MODELS = {
+    Copyright: 'copyrights',
+    PatentFiled: 'filed',
+    PatentGranted: 'granted',
+    IPCategory: 'categories',
+    IntellectualProperty: 'ip',
+}
+TABLE_NAMES = set(TRACKED_MODELS.values())
+
+FEED_CHUNK_SIZE = 1000
+DEFAULT_FEED_LIMIT = 10000
+MAX_FEED_LIMIT = 100000
+# DjangoJSONEncoder's form of a datetime column stored by Django as UTC
+# 'YYYY-MM-DD HH:MM:SS[.ffffff]': 'YYYY-MM-DDTHH:MM:SS[.fff]Z'
+JSON_DATETIME = (
+    "substr({0}, 1, 10) || 'T' || substr({0}, 12, CASE WHEN length({0}) > 19 THEN 12 ELSE 8 END) || 'Z'"
+)
+
+
+def _payload_fields(model):
+    # Editable columns plus timestamps; summary/facet columns are derived
+    return [
+        field for field in model._meta.concrete_fields
+        if field.editable or isinstance(field, models.DateTimeField)
+    ]
+
+
+def serialize(instance):
+    return {field.attname: getattr(instance, field.attname) for field in _payload_fields(instance.__class__)}
+
+
+def _entry(instance, action):
+    return ChangeLogEntry(
+        tenant_id=instance.tenant_id,
+        table=TRACKED_MODELS[instance.__class__],
+        object_id=instance.pk,
+        action=action,
+        data=serialize(instance) if action == 'upsert' else None,
+    )
+
+
+def record_change(instance, action='upsert'):
+    """Log one saved or deleted instance of a tracked model"""
+    _entry(instance, action).save()
+
+
+def record_bulk(instances, action='upsert'):
+    """Log instances written with bulk_create/bulk_update (their pks must be set)"""
+    if not instances:
+        return
+    created_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    table = TRACKED_MODELS[instances[0].__class__]
+    insert_rows(ChangeLogEntry, ['tenant_id', 'table', 'object_id', 'action', 'data', 'created_at'], [
+        (
+            instance.tenant_id, table, instance.pk, action,
+            json.dumps(serialize(instance), cls=DjangoJSONEncoder) if action == 'upsert' else None, created_at,
+        )
+        for instance in instances
+    ])
+
+
+def _json_value(field, column):
+    """SQL giving a column's value as serialize() puts it in a payload, or None if SQLite would differ"""
+    if isinstance(field, models.DateTimeField):
+        return JSON_DATETIME.format(column)
+    if isinstance(field, models.JSONField):
+        return f'json({column})'
+    if isinstance(field, (models.BooleanField, models.DateField, models.DecimalField, models.TimeField)):
+        return None
+    return column
+
+
+def record_inserted(instances):
+    """
+    Log instances just inserted with consecutive pks (bulk.insert_instances),
+    copying their stored rows with one INSERT ... SELECT
+    """
+    if not instances:
+        return
+    model = instances[0].__class__
+    pks = [instance.pk for instance in instances]
+    quote = connection.ops.quote_name
+    payload = [(field, _json_value(field, quote(field.column))) for field in _payload_fields(model)]
+    if not supported() or pks != list(range(pks[0], pks[0] + len(pks))) or any(value is None for field, value in payload):
+        record_bulk(instances)
+        return
+    entry = ChangeLogEntry._meta
+    sql = 'INSERT INTO {} ({}) SELECT {}, %s, {}, %s, json_object({}), %s FROM {} WHERE {} BETWEEN %s AND %s'.format(
+        quote(entry.db_table),
+        ', '.join(quote(entry.get_field(name).column) for name in (
+            'tenant', 'table', 'object_id', 'action', 'data', 'created_at',
+        )),
+        quote(model._meta.get_field('tenant').column), quote(model._meta.pk.column),
+        ', '.join(f"'{field.attname}', {value}" for field, value in payload),
+        quote(model._meta.db_table), quote(model._meta.pk.column),
+    )
+    created_at = entry.get_field('created_at').get_db_prep_save(timezone.now(), connection)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [TRACKED_MODELS[model], 'upsert', created_at, pks[0], pks[-1]])
+
+
+def record_queryset(queryset, chunk_size=FEED_CHUNK_SIZE):
+    """Log every row of a queryset changed by a set-based UPDATE"""
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:chunk_size])
+        if not chunk:
+            break
+        record_bulk(chunk)
+        last_pk = chunk[-1].pk
+
+
+def head(tenant):
+    """Sequence number of the tenant's newest entry (0 when its log is empty)"""
+    entries = ChangeLogEntry.objects.filter(tenant=tenant)
+    return entries.order_by('-seq').values_list('seq', flat=True).first() or 0
+
+
+def entries_since(tenant, since, limit=DEFAULT_FEED_LIMIT, table=None):
+    """
+    The tenant's entries after ``since`` in sequence order, read in keyset
+    chunks. The tenant is explicit because the feed is streamed after the
+    request's tenant scope has ended.
+    """
+    entries = ChangeLogEntry.objects.filter(tenant=tenant).order_by('seq')
+    if table:
+        entries = entries.filter(table=table)
+    remaining = limit
+    while remaining > 0:
+        chunk = list(entries.filter(seq__gt=since)[:min(FEED_CHUNK_SIZE, remaining)])
+        if not chunk:
+            break
+        yield from chunk
+        since = chunk[-1].seq
+        remaining -= len(chunk)
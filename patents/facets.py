@@ -0,0 +1,192 @@
+"""
+Facet counts for the record search pages.
+
+Facet values live in short indexed columns filled on save (the year parsed
+out of the free-text date, a whitespace-normalized applicant/institute), so
+counting every facet for a result set is one GROUP BY over those columns
+and each drill-down is an equality filter on an index. Used by TableSpec
+in tables.py; the columns are filled by the models' save() and the 0008
+migration.
+"""
+import re
+
+from django.db.models import Count
+
+
+FACET_VALUE_LENGTH = 100
+# Largest value SQLite stores in an INTEGER column
+MAX_INTEGER = 2 ** 63 - 1
+# Values listed per facet
+MAX_FACET_VALUES = 10
+
+# Year facet source column, per model
+YEAR_SOURCES = {
+    'PatentFiled': ('filing_year', 'date_of_filing'),
+    'PatentGranted': ('grant_year', 'date_of_grant'),
+}
+# Normalized name facet column -> source column, per model
+NAME_SOURCES = {
+    'PatentFiled': ('applicant_facet', 'applicant_name'),
+    'PatentGranted': ('institute_facet', 'filing_institute'),
+}
+
+_year = re.compile(r'\b(19[5-9]\d|2[01]\d\d)\b')
+
+
+def extract_year(text):
+    """Four-digit year from a free-text date ('17.06.2025', 'Dec 2024,')"""
+    match = _year.search(text or '')
+    return int(match.group(1)) if match else None
+
+
+def facet_value(text):
+    """Whitespace-collapsed, trimmed value used for grouping names"""
+    return ' '.join((text or '').split()).strip(' ,.;')[:FACET_VALUE_LENGTH]
+
+
+def update_record_facets(record):
+    """Fill the facet columns of a PatentFiled/PatentGranted instance"""
+    name = record.__class__.__name__
+    if name in YEAR_SOURCES:
+        column, source = YEAR_SOURCES[name]
+        setattr(record, column, extract_year(getattr(record, source)))
+    if name in NAME_SOURCES:
+        column, source = NAME_SOURCES[name]
+        setattr(record, column, facet_value(getattr(record, source)))
+
+
+class Facet:
+    """One facet of a record table: a column (or annotation) to group by"""
+
+    def __init__(
+        self, key, label, column, expression=None, value_labels=None, sort_by_value=False, label_lookup=None,
+        integer=False,
+    ):
+        self.key = key
+        self.label = label
+        self.column = column
+        # Callable returning an annotation for facets that are not stored columns
+        self.expression = expression
+        # Display text for coded values, e.g. {True: 'Granted'}
+        self.value_labels = value_labels or {}
+        # List values newest/highest first instead of by count (years)
+        self.sort_by_value = sort_by_value
+        # Callable mapping the listed values to display text, for ids of other rows
+        self.label_lookup = label_lookup
+        # Integer column (years, ids of other rows): parameters that are not integers are ignored
+        self.integer = integer
+
+    @property
+    def param(self):
+        return f'facet_{self.key}'
+
+    def annotate(self, queryset):
+        if self.expression is None:
+            return queryset
+        return queryset.annotate(**{self.column: self.expression()})
+
+    def to_param(self, value):
+        if isinstance(value, bool):
+            return '1' if value else '0'
+        return str(value)
+
+    def from_param(self, raw):
+        """Column value selected by a parameter, or None for a value the column cannot hold"""
+        if self.value_labels and all(isinstance(v, bool) for v in self.value_labels):
+            return raw == '1'
+        if self.integer:
+            try:
+                value = int(raw)
+            except ValueError:
+                return None
+            return value if abs(value) <= MAX_INTEGER else None
+        return raw
+
+
+def apply_facet_filters(queryset, facets, params):
+    """Narrow a queryset to the facet values selected in GET parameters; invalid values are ignored"""
+    for facet in facets:
+        raw = params.get(facet.param, '').strip()
+        value = facet.from_param(raw) if raw else None
+        if value is not None:
+            queryset = facet.annotate(queryset).filter(**{facet.column: value})
+    return queryset
+
+
+def facet_counts(queryset, facets, params):
+    """
+    Counts of every facet value in the result set from a single grouped
+    query, which also yields the total. Returns (facets, total): a list of
+    {'label', 'param', 'values': [...]} dicts where each value carries its
+    count, whether it is selected and the query string that toggles it.
+    """
+    if not facets:
+        return [], queryset.count()
+    total = 0
+    for facet in facets:
+        queryset = facet.annotate(queryset)
+    columns = [facet.column for facet in facets]
+    totals = [{} for _ in facets]
+    for row in queryset.order_by().values(*columns).annotate(facet_count=Count('pk')):
+        total += row['facet_count']
+        for i, column in enumerate(columns):
+            value = row[column]
+            if value not in (None, ''):
+                totals[i][value] = totals[i].get(value, 0) + row['facet_count']
+    return facet_results(facets, totals, params), total
+
+
+def facet_results(facets, totals, params):
+    """facet_counts' list of facets from a {value: count} dict per facet"""
+    results = []
+    for facet, counts in zip(facets, totals):
+        selected = params.get(facet.param, '')
+        if facet.sort_by_value:
+            ordered = sorted(counts.items(), key=lambda item: item[0], reverse=True)
+        else:
+            ordered = sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))
+        labels = facet.value_labels
+        if facet.label_lookup:
+            labels = facet.label_lookup([value for value, count in ordered[:MAX_FACET_VALUES]])
+        values = []
+        for value, count in ordered[:MAX_FACET_VALUES]:
+            token = facet.to_param(value)
+            query = params.copy()
+            if token == selected:
+                query.pop(facet.param, None)
+            else:
+                query[facet.param] = token
+            values.append({
+                'label': labels.get(value, value),
+                'count': count,
+                'selected': token == selected,
+                'query': query.urlencode(),
+            })
+        if values:
+            results.append({'label': facet.label, 'param': facet.param, 'values': values})
+    return results
+
+
+def backfill_facets(model, chunk_size=1000):
+    """
+    Recompute the facet columns of every row of PatentFiled/PatentGranted
+    (historical models too). Returns the number of rows updated.
+    """
+    name = model.__name__
+    year_column, year_source = YEAR_SOURCES[name]
+    name_column, name_source = NAME_SOURCES[name]
+
+    updated = 0
+    last_pk = 0
+    while True:
+        chunk = list(
+            model.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', year_source, name_source)[:chunk_size]
+        )
+        if not chunk:
+            break
+        for record in chunk:
+            update_record_facets(record)
+        model.objects.bulk_update(chunk, [year_column, name_column])
+        updated += len(chunk)
+        last_pk = chunk[-1].pk
+    return updated
@@ -0,0 +1,60 @@
+"""
+Published generations of files derived from the database.
+
+The similarity index, the topic centroids and the analytics snapshot are
+each written to a fresh directory and published by atomically replacing a
+CURRENT file that names it. Readers open whatever CURRENT names, so they
+never see a half-written generation, and files they already have open or
+memory-mapped stay valid after the old directory is removed (POSIX keeps
+unlinked files alive while open).
+"""
+import shutil
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+
+def vector_root():
+    return Path(getattr(settings, 'PATENTS_VECTOR_DIR', settings.BASE_DIR / 'vectors'))
+
+
+def store_dir(tenant_id, kind, root=None):
+    """Directory holding the generations of one kind of file of a tenant"""
+    return (root or vector_root()) / f'tenant-{tenant_id}' / kind
+
+
+def new_generation(root):
+    """Empty directory for a new generation under ``root``"""
+    directory = root / (timezone.now().strftime('%Y%m%d%H%M%S') + '-' + uuid.uuid4().hex[:6])
+    directory.mkdir(parents=True)
+    return directory
+
+
+def publish(directory):
+    """Make a generation current atomically, then drop older ones"""
+    current = directory.parent / 'CURRENT'
+    temporary = current.with_suffix('.tmp')
+    temporary.write_text(directory.name, encoding='utf-8')
+    temporary.replace(current)
+    for old in directory.parent.iterdir():
+        if old.is_dir() and old.name != directory.name:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def unpublish(root):
+    """Remove every generation under ``root``; readers then find none"""
+    (root / 'CURRENT').unlink(missing_ok=True)
+    if root.is_dir():
+        for old in root.iterdir():
+            if old.is_dir():
+                shutil.rmtree(old, ignore_errors=True)
+
+
+def current_generation(root):
+    """Directory of the published generation under ``root``, or None"""
+    current = root / 'CURRENT'
+    if not current.exists():
+        return None
+    return root / current.read_text(encoding='utf-8').strip()
@@ -0,0 +1,355 @@
+"""
+Version history of copyrights, patents and IP items.
+
+Every save adds a RecordVersion holding either all of the record's
+editable values (a checkpoint) or only what changed since the version
+before (a delta): changed values, word-level patches of long texts such
+as abstracts, and the added and removed keys of JSON fields such as
+``IntellectualProperty.data``. Payloads are zlib-compressed JSON.
+
+Every CHECKPOINT_INTERVAL-th version is a checkpoint, so the record as it
+was at any moment is rebuilt from one checkpoint and at most
+CHECKPOINT_INTERVAL - 1 deltas, however long the history. Bulk writes
+(import_ip, category schema migrations) add checkpoints directly.
+
+Versions are written by the signals in signals.py inside the transaction
+of the save (VersionedModel.save is atomic), or collected by ``batched()``
+and inserted together at the end of an import batch. They are kept as
+rows of column values and inserted with bulk.insert_rows, so a batch
+costs one INSERT executed for all of its rows; checkpoints of rows an
+import just inserted skip the lookup of earlier versions. Rows that
+existed before history was kept get a checkpoint of their stored values
+before their first recorded change.
+"""
+import difflib
+import json
+import re
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models import Max, OuterRef, Subquery
+from django.utils import timezone
+
+from .bulk import insert_rows
+from .models import Copyright, IntellectualProperty, PatentFiled, PatentGranted, RecordVersion
+
+
+# model -> table name, as in the change log
+TRACKED_MODELS = {
+    Copyright: 'copyrights',
+    PatentFiled: 'filed',
+    PatentGranted: 'granted',
+    IntellectualProperty: 'ip',
+}
+MODELS = {table: model for model, table in TRACKED_MODELS.items()}
+
+CHECKPOINT_INTERVAL = 10
+# Texts shorter than this are stored whole when they change
+TEXT_PATCH_MIN_LENGTH = 200
+COMPRESSION_LEVEL = 6
+CHUNK_SIZE = 1000
+# Column order of the version rows built by _version()
+COLUMNS = ['tenant_id', 'table', 'object_id', 'version', 'kind', 'data', 'created_at']
+
+_words = re.compile(r'(\s+)')
+_pending = ContextVar('history_pending', default=None)
+
+
+def history_fields(model):
+    """Editable columns of a tracked model; derived summary and facet columns are left out"""
+    return [
+        field for field in model._meta.concrete_fields
+        if field.editable and not field.primary_key and field.name != 'tenant'
+    ]
+
+
+def _normalized(values):
+    # Through JSON, so dates compare equal to what a stored version gives back
+    return json.loads(json.dumps(values, cls=DjangoJSONEncoder))
+
+
+def snapshot(instance):
+    """{column: value} of an instance's editable values, JSON-ready"""
+    return _normalized({field.attname: getattr(instance, field.attname) for field in history_fields(instance.__class__)})
+
+
+def _pack(payload):
+    return zlib.compress(json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8'), COMPRESSION_LEVEL)
+
+
+def _unpack(data):
+    return json.loads(zlib.decompress(bytes(data)).decode('utf-8'))
+
+
+def _text_patch(old, new):
+    """[[start, end, replacement]] turning old's words into new's, or None if storing new is smaller"""
+    if len(old) < TEXT_PATCH_MIN_LENGTH or len(new) < TEXT_PATCH_MIN_LENGTH:
+        return None
+    old_words, new_words = _words.split(old), _words.split(new)
+    matcher = difflib.SequenceMatcher(None, old_words, new_words, autojunk=False)
+    patch = [
+        [i1, i2, ''.join(new_words[j1:j2])]
+        for op, i1, i2, j1, j2 in matcher.get_opcodes() if op != 'equal'
+    ]
+    return patch if len(json.dumps(patch)) < len(new) else None
+
+
+def _apply_text_patch(old, patch):
+    words = _words.split(old)
+    # Applied from the end so earlier positions stay valid
+    for start, end, replacement in reversed(patch):
+        words[start:end] = [replacement]
+    return ''.join(words)
+
+
+def diff(old, new):
+    """Changes turning one snapshot into another, or None if they are equal"""
+    delta = {}
+    for name, value in new.items():
+        before = old.get(name)
+        if value == before:
+            continue
+        if isinstance(before, dict) and isinstance(value, dict):
+            delta.setdefault('keys', {})[name] = {
+                'set': {key: item for key, item in value.items() if before.get(key) != item},
+                'unset': [key for key in before if key not in value],
+            }
+            continue
+        if isinstance(before, str) and isinstance(value, str):
+            patch = _text_patch(before, value)
+            if patch is not None:
+                delta.setdefault('text', {})[name] = patch
+                continue
+        delta.setdefault('set', {})[name] = value
+    return delta or None
+
+
+def apply(state, delta):
+    """Snapshot after applying a delta"""
+    state = dict(state)
+    state.update(delta.get('set', {}))
+    for name, patch in delta.get('text', {}).items():
+        state[name] = _apply_text_patch(state[name], patch)
+    for name, changes in delta.get('keys', {}).items():
+        value = {key: item for key, item in (state.get(name) or {}).items() if key not in changes['unset']}
+        value.update(changes['set'])
+        state[name] = value
+    return state
+
+
+def _insert(versions):
+    for start in range(0, len(versions), CHUNK_SIZE):
+        insert_rows(RecordVersion, COLUMNS, versions[start:start + CHUNK_SIZE])
+
+
+def _write(versions):
+    pending = _pending.get()
+    if pending is not None:
+        pending.extend(versions)
+    else:
+        _insert(versions)
+
+
+@contextmanager
+def batched():
+    """
+    Collect the versions written inside the block and insert them together
+    at its end. Yields the pending list; callers that roll back a row
+    inside the block truncate it to drop that row's versions.
+    """
+    pending = []
+    token = _pending.set(pending)
+    try:
+        yield pending
+    finally:
+        _pending.reset(token)
+    _insert(pending)
+
+
+def _version(instance, number, kind, payload=None, created_at=None):
+    """Row of RecordVersion column values (COLUMNS)"""
+    return (
+        instance.tenant_id,
+        TRACKED_MODELS[instance.__class__],
+        instance.pk,
+        number,
+        kind,
+        _pack(payload) if payload is not None else None,
+        connection.ops.adapt_datetimefield_value(created_at or timezone.now()),
+    )
+
+
+def _checkpoint_data(instance, names):
+    # Encoded once with the JSON encoder; the same JSON as _pack(snapshot(instance))
+    values = {name: getattr(instance, name) for name in names}
+    text = json.dumps(values, cls=DjangoJSONEncoder, separators=(',', ':'), ensure_ascii=False)
+    return zlib.compress(text.encode('utf-8'), COMPRESSION_LEVEL)
+
+
+def _head(instance):
+    versions = RecordVersion.objects.unscoped().filter(
+        tenant_id=instance.tenant_id, table=TRACKED_MODELS[instance.__class__], object_id=instance.pk,
+    )
+    return versions.order_by('-version').values_list('version', flat=True).first() or 0
+
+
+def _heads(instances):
+    """{pk: latest version number} of the instances that have a history"""
+    return dict(
+        RecordVersion.objects.unscoped()
+        .filter(
+            tenant_id__in={instance.tenant_id for instance in instances},
+            table=TRACKED_MODELS[instances[0].__class__],
+            object_id__in=[instance.pk for instance in instances],
+        )
+        .values('object_id').annotate(head=Max('version')).values_list('object_id', 'head')
+    )
+
+
+def remember_stored(instance):
+    """
+    Before a save: the stored row and its latest version number, read with
+    one query, so the version written after the save holds only the
+    changes. The row is left on the instance as ``_stored_row`` for the
+    other pre_save signals (signals.py), which then need no query of their
+    own.
+    """
+    model = instance.__class__
+    row = None
+    if instance.pk and not instance._state.adding:
+        head = RecordVersion.objects.unscoped().filter(
+            tenant_id=OuterRef('tenant_id'), table=TRACKED_MODELS[model], object_id=OuterRef('pk'),
+        ).order_by('-version').values('version')[:1]
+        names = [field.attname for field in model._meta.concrete_fields if not field.primary_key]
+        row = (
+            model.objects.unscoped().filter(pk=instance.pk)
+            .annotate(history_head=Subquery(head)).values(*names, 'history_head').first()
+        )
+    instance._stored_row = row
+    if row is None:
+        instance._history_stored, instance._history_head = None, 0
+    else:
+        names = [field.attname for field in history_fields(model)] + ['updated_at']
+        instance._history_stored = {name: row[name] for name in names}
+        instance._history_head = row['history_head'] or 0
+
+
+def record_saved(instance):
+    """After a save: add a checkpoint or a delta for the new values"""
+    new = snapshot(instance)
+    stored = getattr(instance, '_history_stored', None)
+    head = getattr(instance, '_history_head', 0)
+    versions = []
+    if stored is not None:
+        updated_at = stored.pop('updated_at')
+        stored = _normalized(stored)
+        if head == 0:
+            # Saved before history was kept: start from the stored values
+            head = 1
+            versions.append(_version(instance, head, 'checkpoint', stored, created_at=updated_at))
+        changes = diff(stored, new)
+        if changes is None:
+            _write(versions)
+            return
+    number = head + 1
+    if stored is None or number % CHECKPOINT_INTERVAL == 1:
+        versions.append(_version(instance, number, 'checkpoint', new))
+    else:
+        versions.append(_version(instance, number, 'delta', changes))
+    _write(versions)
+    instance._history_stored, instance._history_head = None, number
+
+
+def record_deleted(instance):
+    _write([_version(instance, _head(instance) + 1, 'delete')])
+
+
+def record_bulk(instances, created=False):
+    """
+    Checkpoints of instances written with bulk_create/bulk_update (their
+    pks must be set); ``created``: all were just inserted, so have no history
+    """
+    if not instances:
+        return
+    heads = _heads(instances) if not created else {}
+    table = TRACKED_MODELS[instances[0].__class__]
+    names = [field.attname for field in history_fields(instances[0].__class__)]
+    created_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    _write([
+        (
+            instance.tenant_id, table, instance.pk,
+            heads.get(instance.pk, 0) + 1, 'checkpoint', _checkpoint_data(instance, names), created_at,
+        )
+        for instance in instances
+    ])
+
+
+def _chunks(queryset, chunk_size):
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:chunk_size])
+        if not chunk:
+            break
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def record_queryset(queryset, chunk_size=CHUNK_SIZE):
+    """Checkpoints of every row of a queryset changed by a set-based UPDATE"""
+    for chunk in _chunks(queryset, chunk_size):
+        record_bulk(chunk)
+
+
+def record_baseline(queryset, chunk_size=CHUNK_SIZE):
+    """Checkpoints of the rows of a queryset that have no history yet, before a set-based UPDATE"""
+    for chunk in _chunks(queryset, chunk_size):
+        heads = _heads(chunk)
+        _write([
+            _version(instance, 1, 'checkpoint', snapshot(instance), created_at=instance.updated_at)
+            for instance in chunk if instance.pk not in heads
+        ])
+
+
+def versions(tenant_id, table, object_id):
+    """[{'version', 'kind', 'label', 'created_at', 'fields'}] of a record, newest first; fields lists what changed"""
+    rows = RecordVersion.objects.unscoped().filter(tenant_id=tenant_id, table=table, object_id=object_id)
+    labels = dict(RecordVersion.KIND_CHOICES)
+    result = []
+    for version in rows.order_by('-version'):
+        payload = _unpack(version.data) if version.data is not None else {}
+        if version.kind == 'delta':
+            fields = sorted(set().union(*(part.keys() for part in payload.values())))
+        else:
+            fields = sorted(payload)
+        result.append({
+            'version': version.version,
+            'kind': version.kind,
+            'label': labels[version.kind],
+            'created_at': version.created_at,
+            'fields': fields,
+        })
+    return result
+
+
+def as_of(tenant_id, table, object_id, when):
+    """
+    (version, {column: value}) of a record as it was at ``when``, or None if
+    it did not exist yet or was deleted by then. Reads one checkpoint and
+    fewer than CHECKPOINT_INTERVAL deltas.
+    """
+    rows = RecordVersion.objects.unscoped().filter(tenant_id=tenant_id, table=table, object_id=object_id)
+    target = rows.filter(created_at__lte=when).order_by('-version').values_list('version', 'kind').first()
+    if target is None or target[1] == 'delete':
+        return None
+    start = (
+        rows.filter(kind='checkpoint', version__lte=target[0])
+        .order_by('-version').values_list('version', flat=True).first()
+    )
+    state = None
+    for version in rows.filter(version__gte=start, version__lte=target[0]).order_by('version'):
+        payload = _unpack(version.data)
+        state = payload if version.kind == 'checkpoint' else apply(state, payload)
+    return target[0], state
@@ -0,0 +1,173 @@
+"""
+Helpers for working with IPCategory field definitions.
+
+Values submitted through ``ip_create``/``ip_edit`` are stored in
+``IntellectualProperty.data`` as stripped strings, so everything here
+normalises to the same representation.
+"""
+from datetime import datetime
+from functools import lru_cache
+
+from django.utils.text import slugify
+
+
+DATE_INPUT_FORMATS = ['%Y-%m-%d', '%d.%m.%Y', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d']
+
+
+class FieldValidationError(ValueError):
+    """Raised when a raw value cannot be stored in a category field"""
+
+
+def field_name_from_header(header):
+    """Turn a column header into an internal field name (e.g. trademark_number)"""
+    return slugify(header).replace('-', '_')
+
+
+def field_definitions_from_header(headers):
+    """Build text field definitions for a category created from a file header"""
+    field_definitions = []
+    seen = set()
+    for header in headers:
+        label = (header or '').strip()
+        name = field_name_from_header(label)
+        if not name or name in seen:
+            continue
+        seen.add(name)
+        field_definitions.append({
+            'name': name,
+            'label': label,
+            'type': 'text',
+            'required': False,
+        })
+    return field_definitions
+
+
+@lru_cache(maxsize=4096)
+def coerce_date(value):
+    """
+    Normalise a date string to the ISO format used by the date input.
+    Cached because imported sheets repeat the same dates many times.
+    """
+    for fmt in DATE_INPUT_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    raise FieldValidationError(f'"{value}" is not a valid date')
+
+
+def coerce_number(value):
+    """Validate a number, dropping thousands separators"""
+    cleaned = value.replace(',', '')
+    try:
+        float(cleaned)
+    except ValueError:
+        raise FieldValidationError(f'"{value}" is not a valid number')
+    return cleaned
+
+
+def coerce_value(field_def, raw):
+    """
+    Validate and convert a raw value for a field definition.
+    Returns None for empty values, which are left out of ``data``.
+    """
+    if raw is None:
+        value = ''
+    else:
+        value = str(raw).strip()
+
+    if not value:
+        if field_def.get('required'):
+            raise FieldValidationError(f'{field_def["label"]} is required')
+        return None
+
+    field_type = field_def.get('type', 'text')
+    if field_type == 'number':
+        return coerce_number(value)
+    if field_type == 'date':
+        return coerce_date(value)
+    if field_type == 'select':
+        options = field_def.get('options') or []
+        if options and value not in options:
+            raise FieldValidationError(f'"{value}" is not an option for {field_def["label"]}')
+    return value
+
+
+def coerce_row(field_definitions, row):
+    """
+    Build a ``data`` dict from a mapping of field name -> raw value.
+    Raises FieldValidationError on the first invalid value.
+    """
+    data = {}
+    for field_def in field_definitions:
+        value = coerce_value(field_def, row.get(field_def['name']))
+        if value is not None:
+            data[field_def['name']] = value
+    return data
+
+
+def diff_field_definitions(old_definitions, new_definitions, renames=None):
+    """
+    Work out how existing ``data`` must change when field definitions are edited.
+
+    ``renames`` maps old field names to new ones (the category form posts the
+    original name of each field). Returns a list of operations, removes first,
+    then renames, then retypes, which is the order they must be applied in.
+    An old field that another field is renamed onto is removed first, so
+    its values never take the place of the renamed ones.
+    """
+    renames = {old: new for old, new in (renames or {}).items() if old != new}
+    old_by_name = {f['name']: f for f in old_definitions}
+    new_by_name = {f['name']: f for f in new_definitions}
+    renamed_to = {new: old for old, new in renames.items() if old in old_by_name and new in new_by_name}
+
+    operations = []
+    for name in old_by_name:
+        if name in renames and renames[name] in new_by_name:
+            continue
+        # A field that is kept, unless another field is renamed onto it
+        if name not in new_by_name or name in renamed_to:
+            operations.append({'op': 'remove', 'field': name})
+
+    for new_name, old_name in renamed_to.items():
+        operations.append({'op': 'rename', 'field': old_name, 'to': new_name})
+
+    for name, new_def in new_by_name.items():
+        old_def = old_by_name.get(renamed_to.get(name, name))
+        if old_def is None:
+            continue
+        old_type = old_def.get('type', 'text')
+        new_type = new_def.get('type', 'text')
+        options_changed = new_type == 'select' and old_def.get('options') != new_def.get('options')
+        if old_type != new_type or options_changed:
+            operations.append({'op': 'retype', 'field': name, 'from': old_type, 'to': new_type})
+
+    return operations
+
+
+def apply_operations(data, operations, field_definitions):
+    """
+    Apply schema operations to a single ``data`` dict in Python.
+    Values that cannot be converted to a new type are kept as they are.
+    """
+    by_name = {f['name']: f for f in field_definitions}
+    data = {k: v for k, v in data.items() if k not in
+            {op['field'] for op in operations if op['op'] == 'remove'}}
+
+    renames = {op['field']: op['to'] for op in operations if op['op'] == 'rename'}
+    if renames:
+        data = {renames.get(k, k): v for k, v in data.items()}
+
+    for op in operations:
+        if op['op'] != 'retype' or op['field'] not in data:
+            continue
+        field_def = dict(by_name[op['field']], required=False)
+        try:
+            value = coerce_value(field_def, data[op['field']])
+        except FieldValidationError:
+            continue
+        if value is None:
+            del data[op['field']]
+        else:
+            data[op['field']] = value
+    return data
@@ -0,0 +1,193 @@
+"""
+Links between filed and granted patents.
+
+Both tables carry a free-text application number ("202331002921 dated
+14.01.2023", "202531058128 A"). Records store the normalized digits in
+``application_key`` and PatentLifecycle keeps one row per key with the
+matched filed/granted records, the parsed filing and grant dates and the
+days between them. Rows are refreshed by the save/delete signals and can
+be rebuilt with ``manage.py rebuild_lifecycle``; a save that changes none
+of LINK_FIELDS (a title or abstract edit) leaves them alone.
+
+Rows are per tenant: the same application number filed at two institutes
+gives two rows. Functions take the model classes as arguments so
+migrations can run them on historical models.
+"""
+import re
+from datetime import datetime
+
+
+APPLICATION_KEY_LENGTH = 50
+# Columns of filed/granted records that decide their lifecycle row
+LINK_FIELDS = ('application_key', 'date_of_filing', 'date_of_grant', 'application_number')
+# Columns of a lifecycle row rewritten by refresh_links
+LINK_COLUMNS = ['filed', 'granted', 'filing_date', 'grant_date', 'filing_year', 'days_to_grant', 'updated_at']
+
+_application_digits = re.compile(r'\d{9,}')
+_numeric_date = re.compile(r'\b(\d{1,2})[./-](\d{1,2})[./-](\d{4})\b')
+_day_month_year = re.compile(r'\b(\d{1,2})(?:st|nd|rd|th)?\s+([A-Za-z]{3,})\.?,?\s+(\d{4})\b')
+_month_year = re.compile(r'\b([A-Za-z]{3,})\.?,?\s+(\d{4})\b')
+_dated = re.compile(r'dated\s+(.+)', re.IGNORECASE)
+
+
+def normalize_application_number(text):
+    """Digits of an Indian application number, or the upper-cased alphanumerics"""
+    if not text:
+        return ''
+    match = _application_digits.search(text)
+    if match:
+        return match.group(0)[:APPLICATION_KEY_LENGTH]
+    return re.sub(r'[^0-9A-Z]', '', text.upper())[:APPLICATION_KEY_LENGTH]
+
+
+def _month(name):
+    try:
+        return datetime.strptime(name[:3], '%b').month
+    except ValueError:
+        return None
+
+
+def _date(year, month, day):
+    try:
+        return datetime(int(year), int(month), int(day)).date()
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_date(text):
+    """
+    Date from the free-text date columns: '17.06.2025', '26/03/2024',
+    '19th July 2024', or 'Dec 2024' (first of the month).
+    """
+    if not text:
+        return None
+    text = ' '.join(text.split())
+
+    match = _numeric_date.search(text)
+    if match:
+        day, month, year = match.groups()
+        return _date(year, month, day)
+
+    match = _day_month_year.search(text)
+    if match and _month(match.group(2)):
+        return _date(match.group(3), _month(match.group(2)), match.group(1))
+
+    match = _month_year.search(text)
+    if match and _month(match.group(1)):
+        return _date(match.group(2), _month(match.group(1)), 1)
+    return None
+
+
+def filing_date_from_application_number(text):
+    """Granted records often note the filing date: '202331002921 dated 14.01.2023'"""
+    match = _dated.search(text or '')
+    return parse_date(match.group(1)) if match else None
+
+
+def year_from_application_key(key):
+    """Indian application numbers start with the filing year"""
+    year = int(key[:4]) if len(key) >= 12 and key[:4].isdigit() else None
+    return year if year and 1950 <= year <= 2199 else None
+
+
+def update_application_key(record):
+    """Fill application_key of a PatentFiled/PatentGranted instance"""
+    record.application_key = normalize_application_number(record.application_number)
+
+
+def build_link(key, filed, granted):
+    """Field values of the lifecycle row for one application"""
+    filing_date = parse_date(filed.date_of_filing) if filed else None
+    if filing_date is None and granted:
+        filing_date = filing_date_from_application_number(granted.application_number)
+    grant_date = parse_date(granted.date_of_grant) if granted else None
+
+    filing_year = filing_date.year if filing_date else None
+    if filing_year is None:
+        filing_year = year_from_application_key(key)
+
+    days_to_grant = None
+    if filing_date and grant_date and grant_date >= filing_date:
+        days_to_grant = (grant_date - filing_date).days
+
+    return {
+        'filed': filed,
+        'granted': granted,
+        'filing_date': filing_date,
+        'grant_date': grant_date,
+        'filing_year': filing_year,
+        'days_to_grant': days_to_grant,
+    }
+
+
+def _first_by_key(queryset):
+    """Earliest record per (tenant, application key)"""
+    records = {}
+    for record in queryset.order_by('-pk'):
+        records[(record.tenant_id, record.application_key)] = record
+    return records
+
+
+def link_inputs_changed(record, stored):
+    """Whether a save changed a value build_link reads; ``stored`` is the row before it, or None"""
+    if stored is None:
+        return True
+    return any(name in stored and stored[name] != getattr(record, name) for name in LINK_FIELDS)
+
+
+def refresh_links(tenant_id, keys, filed_model, granted_model, link_model):
+    """Recompute one tenant's lifecycle rows for the given application keys"""
+    keys = {key for key in keys if key}
+    if not keys:
+        return
+    filed = _first_by_key(filed_model.objects.filter(tenant_id=tenant_id, application_key__in=keys))
+    granted = _first_by_key(granted_model.objects.filter(tenant_id=tenant_id, application_key__in=keys))
+    links, gone = [], []
+    for key in sorted(keys):
+        pair = (tenant_id, key)
+        if pair in filed or pair in granted:
+            links.append(link_model(
+                tenant_id=tenant_id, application_key=key, **build_link(key, filed.get(pair), granted.get(pair)),
+            ))
+        else:
+            gone.append(key)
+    # One upsert and one delete, whatever the number of keys
+    if links:
+        link_model.objects.bulk_create(
+            links, update_conflicts=True, unique_fields=['tenant', 'application_key'], update_fields=LINK_COLUMNS,
+        )
+    if gone:
+        link_model.objects.filter(tenant_id=tenant_id, application_key__in=gone).delete()
+
+
+def rebuild_links(filed_model, granted_model, link_model, batch_size=1000):
+    """Recreate the lifecycle rows (of the active tenant, if any); returns the number of rows written"""
+    filed = _first_by_key(filed_model.objects.exclude(application_key=''))
+    granted = _first_by_key(granted_model.objects.exclude(application_key=''))
+    links = []
+    for tenant_id, key in sorted(set(filed) | set(granted)):
+        pair = (tenant_id, key)
+        links.append(link_model(
+            tenant_id=tenant_id, application_key=key, **build_link(key, filed.get(pair), granted.get(pair)),
+        ))
+    link_model.objects.all().delete()
+    link_model.objects.bulk_create(links, batch_size=batch_size)
+    return len(links)
+
+
+def backfill_application_keys(model, chunk_size=1000):
+    """Recompute application_key of every row (historical models too)"""
+    updated = 0
+    last_pk = 0
+    while True:
+        chunk = list(
+            model.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'application_number')[:chunk_size]
+        )
+        if not chunk:
+            break
+        for record in chunk:
+            update_application_key(record)
+        model.objects.bulk_update(chunk, ['application_key'])
+        updated += len(chunk)
+        last_pk = chunk[-1].pk
+    return updated
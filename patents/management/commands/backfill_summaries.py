@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from patents import readstore
+from patents.models import Copyright, PatentFiled, PatentGranted, IntellectualProperty
+from patents.summaries import backfill_summaries
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized summary and display title columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per bulk update')
+
+    def handle(self, *args, **options):
+        for model in [Copyright, PatentFiled, PatentGranted, IntellectualProperty]:
+            started = time.perf_counter()
+            count = backfill_summaries(model, options['chunk_size'])
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: {count} rows in {elapsed:.2f}s'
+            ))
+        readstore.invalidate()
@@ -0,0 +1,82 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.template.loader import get_template
+from django.utils import timezone
+from patents.models import IPCategory, IntellectualProperty
+from patents.summaries import build_data_summary
+from patents.tables import ip_table_rows
+
+
+# The row template as it was before cells were precomputed in the view
+FILTER_ROW_TEMPLATE = """{% load patent_filters %}{% for item in rows %}
+<tr>
+    <td>{{ item.pk }}</td>
+    {% for field in category.field_definitions %}
+        <td>{{ item.data_summary|get_item:field.name|default:"—" }}</td>
+    {% endfor %}
+    <td>{{ item.created_at|date:"Y-m-d" }}</td>
+    <td class="actions">
+        <a href="{% url 'patents:ip_edit' category.slug item.pk %}" class="btn btn-sm btn-secondary">Edit</a>
+        <a href="{% url 'patents:ip_delete' category.slug item.pk %}" class="btn btn-sm btn-danger">Delete</a>
+    </td>
+</tr>
+{% endfor %}"""
+
+
+class Command(BaseCommand):
+    help = 'Measure IP table row rendering in ms per 1,000 rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--category', help='Category slug to render (default: synthetic 8-field category)')
+        parser.add_argument('--rows', type=int, default=1000, help='Rows per render')
+        parser.add_argument('--repeat', type=int, default=5, help='Renders per variant; the best is reported')
+
+    def handle(self, *args, **options):
+        category, items = self.load(options['category'], options['rows'])
+        if not items:
+            raise CommandError('No items to render')
+
+        precomputed = get_template('patents/rows/ip_rows.html')
+        legacy = engines['django'].from_string(FILTER_ROW_TEMPLATE)
+        variants = [
+            ('get_item filter per cell', lambda: legacy.render({'category': category, 'rows': items})),
+            ('precomputed cells', lambda: precomputed.render({
+                'category': category, 'rows': ip_table_rows(category, items),
+            })),
+        ]
+
+        self.stdout.write(f'{len(items)} rows x {len(category.field_definitions)} fields, best of {options["repeat"]}')
+        for label, render in variants:
+            best = min(self.time(render) for _ in range(options['repeat']))
+            per_thousand = best * 1000 / len(items) * 1000
+            self.stdout.write(self.style.SUCCESS(f'{label:<26} {per_thousand:8.1f} ms / 1,000 rows'))
+
+    def load(self, slug, count):
+        if slug:
+            try:
+                category = IPCategory.objects.get(slug=slug)
+            except IPCategory.DoesNotExist:
+                raise CommandError(f'Category "{slug}" not found')
+            items = list(
+                IntellectualProperty.objects.filter(category=category)
+                .select_related('category')
+                .only('pk', 'data_summary', 'created_at', 'category__name', 'category__slug')[:count]
+            )
+            return category, items
+
+        fields = [{'name': f'field_{i}', 'label': f'Field {i}', 'type': 'text'} for i in range(8)]
+        category = IPCategory(name='Benchmark', slug='benchmark', field_definitions=fields)
+        now = timezone.now()
+        items = []
+        for pk in range(1, count + 1):
+            data = {field['name']: f'Value {pk} of {field["label"]}' for field in fields[:-1]}
+            items.append(IntellectualProperty(
+                pk=pk, category=category, data=data, data_summary=build_data_summary(data), created_at=now,
+            ))
+        return category, items
+
+    def time(self, render):
+        started = time.perf_counter()
+        render()
+        return time.perf_counter() - started
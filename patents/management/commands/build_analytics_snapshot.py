@@ -0,0 +1,49 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from patents.analytics import build_snapshot
+from patents.models import BackgroundTask, Tenant
+from patents.task_queue import enqueue
+from patents.tenants import tenant_context
+
+
+class Command(BaseCommand):
+    help = 'Write copyrights, patents and IP items to the columnar files the analytics reports read'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', help='Slug of the institute to snapshot (default: all)')
+        parser.add_argument(
+            '--background', action='store_true',
+            help='Queue the snapshot for manage.py run_worker instead of taking it now',
+        )
+        parser.add_argument(
+            '--every', type=int, metavar='SECONDS',
+            help='With --background, take a new snapshot every SECONDS (replaces an existing schedule)',
+        )
+
+    def handle(self, *args, **options):
+        if options['every'] is not None and (not options['background'] or options['every'] < 60):
+            raise CommandError('--every needs --background and at least 60 seconds')
+        tenants = Tenant.objects.filter(is_active=True)
+        if options['tenant']:
+            tenants = tenants.filter(slug=options['tenant'])
+            if not tenants:
+                raise CommandError(f'No active institute "{options["tenant"]}"')
+
+        for tenant in tenants:
+            if options['background']:
+                # One schedule per tenant: queued runs are replaced rather than doubled up
+                BackgroundTask.objects.unscoped().filter(
+                    tenant=tenant, name='build_analytics_snapshot', status='queued',
+                ).delete()
+                with tenant_context(tenant):
+                    task_obj = enqueue('build_analytics_snapshot', tenant_id=tenant.pk, every=options['every'])
+                schedule = f', then every {options["every"]}s' if options['every'] else ''
+                self.stdout.write(self.style.SUCCESS(f'{tenant.slug}: queued snapshot as task #{task_obj.pk}{schedule}'))
+                continue
+
+            started = time.perf_counter()
+            counts = build_snapshot(tenant)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(f'{tenant.slug}: snapshot of {sum(counts.values())} rows in {elapsed:.2f}s'))
+            for name, rows in counts.items():
+                self.stdout.write(f'  {name:<24} {rows:>8}')
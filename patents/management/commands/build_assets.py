@@ -0,0 +1,30 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from patents.assets import build_bundles, build_logo_variants
+
+
+class Command(BaseCommand):
+    help = 'Minify and bundle CSS/JS, write logo image variants, then run collectstatic'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-images', action='store_true', help='Skip the logo variants')
+        parser.add_argument('--no-collect', action='store_true', help='Do not run collectstatic afterwards')
+
+    def handle(self, *args, **options):
+        for name, source_size, output_size in build_bundles():
+            self.stdout.write(self.style.SUCCESS(f'{name}: {source_size} -> {output_size} bytes'))
+
+        if not options['no_images']:
+            try:
+                written, skipped = build_logo_variants()
+            except ImportError:
+                self.stdout.write(self.style.WARNING('Pillow is not installed; logo variants skipped'))
+            else:
+                for name, size in written:
+                    self.stdout.write(self.style.SUCCESS(f'{name}: {size} bytes'))
+                for fmt in skipped:
+                    self.stdout.write(self.style.WARNING(f'Pillow has no {fmt} support; {fmt} variants skipped'))
+
+        if not options['no_collect']:
+            # Adds content hashes and .gz/.br copies (see STORAGES in settings)
+            call_command('collectstatic', interactive=False, verbosity=options['verbosity'])
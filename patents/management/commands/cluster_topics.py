@@ -0,0 +1,45 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from patents.models import Tenant
+from patents.task_queue import enqueue
+from patents.tenants import tenant_context
+from patents.topics import BATCH_SIZE, DEFAULT_TOPICS, EPOCHS, MAX_TOPICS, cluster
+
+
+class Command(BaseCommand):
+    help = 'Group filed and granted patents into technology topics and tag every record'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', help='Slug of the institute to cluster (default: all)')
+        parser.add_argument('--topics', type=int, default=DEFAULT_TOPICS, help=f'Number of topics (default {DEFAULT_TOPICS})')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help=f'Records per batch (default {BATCH_SIZE})')
+        parser.add_argument('--epochs', type=int, default=EPOCHS, help=f'Passes over the records (default {EPOCHS})')
+        parser.add_argument(
+            '--background', action='store_true',
+            help='Queue the clustering for manage.py run_worker instead of running it now',
+        )
+
+    def handle(self, *args, **options):
+        if not 1 <= options['topics'] <= MAX_TOPICS:
+            raise CommandError(f'--topics must be between 1 and {MAX_TOPICS}')
+        if options['batch_size'] < 1 or options['epochs'] < 0:
+            raise CommandError('--batch-size must be positive and --epochs not negative')
+        tenants = Tenant.objects.filter(is_active=True)
+        if options['tenant']:
+            tenants = tenants.filter(slug=options['tenant'])
+            if not tenants:
+                raise CommandError(f'No active institute "{options["tenant"]}"')
+
+        for tenant in tenants:
+            if options['background']:
+                with tenant_context(tenant):
+                    task_obj = enqueue('cluster_topics', tenant_id=tenant.pk, topics_count=options['topics'])
+                self.stdout.write(self.style.SUCCESS(f'{tenant.slug}: queued clustering as task #{task_obj.pk}'))
+                continue
+
+            started = time.perf_counter()
+            topics = cluster(tenant, options['topics'], options['batch_size'], options['epochs'])
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(f'{tenant.slug}: {len(topics)} topics in {elapsed:.2f}s'))
+            for topic in topics:
+                self.stdout.write(f'  {topic.number:>3}  {topic.records:>7}  {topic.label}')
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from patents.models import Tenant
+from patents.tenants import usage
+
+
+class Command(BaseCommand):
+    help = 'Add an institute served by this deployment, or update its host name and quotas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('slug', help='Short name, also matched as the subdomain (e.g. "iiest")')
+        parser.add_argument('--name', help='Institute name shown in the page header')
+        parser.add_argument('--domain', help='Host name served for this institute, e.g. patents.example.edu')
+        parser.add_argument('--max-records', type=int, help='Records allowed (0 for no limit)')
+        parser.add_argument('--max-categories', type=int, help='IP categories allowed (0 for no limit)')
+        parser.add_argument('--deactivate', action='store_true', help='Stop serving the institute')
+
+    def handle(self, *args, **options):
+        tenant = Tenant.objects.filter(slug=options['slug']).first()
+        if tenant is None:
+            if not options['name']:
+                raise CommandError('--name is required for a new institute')
+            tenant = Tenant(slug=options['slug'])
+        if options['name']:
+            tenant.name = options['name']
+        if options['domain'] is not None:
+            domain = options['domain'].strip().lower()
+            if domain and Tenant.objects.filter(domain=domain).exclude(pk=tenant.pk).exists():
+                raise CommandError(f'{domain} is already served for another institute')
+            tenant.domain = domain
+        for quota in ('max_records', 'max_categories'):
+            if options[quota] is not None:
+                setattr(tenant, quota, options[quota] or None)
+        tenant.is_active = not options['deactivate']
+        created = tenant.pk is None
+        tenant.save()
+
+        self.stdout.write(self.style.SUCCESS(f'{"Created" if created else "Updated"} tenant "{tenant.name}"'))
+        self.stdout.write(f'  host name: {tenant.domain or f"{tenant.slug}.<your domain>"}')
+        for kind in ('records', 'categories'):
+            limit = getattr(tenant, f'max_{kind}')
+            self.stdout.write(f'  {kind}: {usage(tenant, kind)} of {limit if limit is not None else "unlimited"}')
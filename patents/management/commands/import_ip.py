@@ -0,0 +1,272 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from patents import history
+from patents.bulk import insert_instances
+from patents.changelog import record_inserted
+from patents.models import IPCategory, IntellectualProperty, Tenant
+from patents.task_queue import enqueue
+from patents.tenants import QuotaExceeded, check_quota, default_tenant_slug, get_tenant, tenant_context
+from patents.ip_schema import (
+    FieldValidationError, coerce_row, field_definitions_from_header, field_name_from_header,
+)
+
+
+class Command(BaseCommand):
+    help = 'Bulk-load items into a dynamic IP category from a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='Path to a .csv or .ndjson/.jsonl file')
+        parser.add_argument('--category', help='Slug of the IP category to load into')
+        parser.add_argument('--tenant', help='Slug of the institute to load into (default: PATENTS_DEFAULT_TENANT)')
+        parser.add_argument(
+            '--create-category', metavar='NAME',
+            help='Create a new category with this name, using the file header as fields',
+        )
+        parser.add_argument(
+            '--format', choices=['csv', 'ndjson'],
+            help='Input format (detected from the file extension by default)',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per bulk insert')
+        parser.add_argument(
+            '--map', action='append', default=[], metavar='COLUMN=FIELD',
+            help='Map a file column to a category field name (repeatable)',
+        )
+        parser.add_argument(
+            '--background', action='store_true',
+            help='Queue the import for manage.py run_worker instead of running it now',
+        )
+
+    def handle(self, *args, **options):
+        file_path = options['file']
+        if not os.path.exists(file_path):
+            raise CommandError(f'File not found: {file_path}')
+        if not options['category'] and not options['create_category']:
+            raise CommandError('Pass --category <slug> or --create-category <name>')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        slug = options['tenant'] or default_tenant_slug()
+        try:
+            self.tenant = get_tenant(slug)
+        except Tenant.DoesNotExist:
+            raise CommandError(f'Tenant not found: {slug}')
+
+        with tenant_context(self.tenant):
+            if options['background']:
+                self.enqueue(file_path, options)
+            else:
+                self.run_import(file_path, options)
+
+    def run_import(self, file_path, options):
+        """Stream the file into the category in batches"""
+        file_format = options['format'] or self.detect_format(file_path)
+        explicit_map = self.parse_map(options['map'])
+
+        started = time.perf_counter()
+        with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+            headers, rows = self.open_rows(f, file_format)
+            category = self.get_category(options, headers)
+            match_column = self.column_matcher(category, explicit_map)
+            column_map = {}
+            for header in headers:
+                field_name = match_column(header)
+                if field_name:
+                    column_map[header] = field_name
+
+            unmapped = [h for h in headers if h not in column_map]
+            if unmapped:
+                self.stdout.write(self.style.WARNING(f'Ignoring unmapped columns: {", ".join(unmapped)}'))
+
+            # Later NDJSON objects may have keys the first one did not
+            new_columns = match_column if file_format == 'ndjson' else None
+            imported, skipped = self.load(
+                category, rows, column_map, options['batch_size'], new_columns, set(unmapped),
+            )
+
+        elapsed = time.perf_counter() - started
+        rate = imported / elapsed if elapsed > 0 else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} items into "{category.name}" ({skipped} skipped) '
+            f'in {elapsed:.2f}s ({rate:,.0f} rows/s)'
+        ))
+
+    def enqueue(self, file_path, options):
+        """Hand the import to the background worker"""
+        task_obj = enqueue('run_command', command='import_ip', args=[os.path.abspath(file_path)], options={
+            'category': options['category'],
+            'tenant': self.tenant.slug,
+            'create_category': options['create_category'],
+            'format': options['format'],
+            'batch_size': options['batch_size'],
+            'map': options['map'],
+        })
+        self.stdout.write(self.style.SUCCESS(f'Queued import as task #{task_obj.pk}'))
+
+    def detect_format(self, file_path):
+        """Guess the input format from the file extension"""
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext in ('.ndjson', '.jsonl', '.json'):
+            return 'ndjson'
+        return 'csv'
+
+    def parse_map(self, pairs):
+        """Parse repeated COLUMN=FIELD options"""
+        mapping = {}
+        for pair in pairs:
+            column, sep, field = pair.partition('=')
+            if not sep or not column.strip() or not field.strip():
+                raise CommandError(f'Invalid --map value: {pair}')
+            mapping[column.strip()] = field.strip()
+        return mapping
+
+    def open_rows(self, f, file_format):
+        """
+        Return the header and an iterator of (line number, row dict, error)
+        without reading the whole file. NDJSON lines that are not a JSON
+        object come with the reason instead of a row.
+        """
+        if file_format == 'csv':
+            reader = csv.DictReader(f)
+            return [h.strip() for h in (reader.fieldnames or [])], (
+                (line, {(k or '').strip(): v for k, v in row.items()}, None)
+                for line, row in enumerate(reader, start=2)
+            )
+
+        lines = ((number, line) for number, line in enumerate(f, start=1) if line.strip())
+        # The header comes from the first object; lines read before it are reported first
+        leading = []
+        headers = []
+        for number, line in lines:
+            row, error = self.parse_line(line)
+            leading.append((number, row, error))
+            if error is None:
+                headers = list(row.keys())
+                break
+
+        def rows():
+            yield from leading
+            for number, line in lines:
+                yield (number, *self.parse_line(line))
+
+        return headers, rows()
+
+    def parse_line(self, line):
+        """(row, None) for an NDJSON line holding an object, else (None, reason)"""
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            return None, f'invalid JSON ({getattr(e, "msg", e)})'
+        if not isinstance(row, dict):
+            return None, 'not a JSON object'
+        return row, None
+
+    def get_category(self, options, headers):
+        """Look up the target category, or create it from the header"""
+        if options['create_category']:
+            name = options['create_category'].strip()
+            if IPCategory.objects.filter(name=name).exists():
+                raise CommandError(f'Category "{name}" already exists')
+            field_definitions = field_definitions_from_header(headers)
+            if not field_definitions:
+                raise CommandError('Cannot create a category from an empty header')
+            self.check_quota('categories', 1)
+            category = IPCategory.objects.create(name=name, field_definitions=field_definitions)
+            self.stdout.write(self.style.SUCCESS(
+                f'Created category "{category.name}" with {len(field_definitions)} fields'
+            ))
+            return category
+
+        try:
+            return IPCategory.objects.get(slug=options['category'])
+        except IPCategory.DoesNotExist:
+            raise CommandError(f'Category not found: {options["category"]}')
+
+    def column_matcher(self, category, explicit_map):
+        """Function mapping a file column to a field name by explicit mapping, name or label, or None"""
+        by_name = {f['name']: f['name'] for f in category.field_definitions}
+        by_label = {f['label'].strip().lower(): f['name'] for f in category.field_definitions}
+
+        def match(header):
+            if header in explicit_map:
+                field_name = explicit_map[header]
+                if field_name not in by_name:
+                    raise CommandError(f'Unknown field "{field_name}" in --map for column "{header}"')
+                return field_name
+            return (
+                by_name.get(header)
+                or by_label.get(header.lower())
+                or by_name.get(field_name_from_header(header))
+            )
+        return match
+
+    def load(self, category, rows, column_map, batch_size, new_columns=None, unmapped=()):
+        """
+        Validate rows in batches and bulk insert them. With ``new_columns``,
+        keys first seen on a later row are matched with it and added to
+        ``column_map``, or reported once as unmapped.
+        """
+        field_definitions = category.field_definitions
+        unmapped = set(unmapped)
+        imported = 0
+        skipped = 0
+
+        while True:
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                break
+
+            batch = []
+            for line, row, error in chunk:
+                data = None
+                if error is None:
+                    if new_columns is not None:
+                        self.map_new_columns(row, line, column_map, unmapped, new_columns)
+                    mapped = {column_map[k]: v for k, v in row.items() if k in column_map}
+                    try:
+                        data = coerce_row(field_definitions, mapped)
+                    except FieldValidationError as e:
+                        error = e
+                if error is not None:
+                    skipped += 1
+                    if skipped <= 20:
+                        self.stdout.write(self.style.WARNING(f'Skipped row {line}: {error}'))
+                    continue
+                if data:
+                    item = IntellectualProperty(tenant_id=category.tenant_id, category=category, data=data)
+                    item.update_summaries(field_definitions)
+                    batch.append(item)
+                else:
+                    skipped += 1
+
+            self.check_quota('records', len(batch))
+            with transaction.atomic():
+                insert_instances(IntellectualProperty, batch)
+                record_inserted(batch)
+                history.record_bulk(batch, created=True)
+            imported += len(batch)
+            self.stdout.write(f'  {imported} rows imported...')
+
+        return imported, skipped
+
+    def map_new_columns(self, row, line, column_map, unmapped, match):
+        """Map the keys of a row that no earlier row had"""
+        for key in row:
+            if key in column_map or key in unmapped:
+                continue
+            field_name = match(key)
+            if field_name:
+                column_map[key] = field_name
+            else:
+                unmapped.add(key)
+                self.stdout.write(self.style.WARNING(f'Ignoring unmapped column "{key}" first seen on row {line}'))
+
+    def check_quota(self, kind, adding):
+        """Stop before a write that would take the tenant past its limit"""
+        try:
+            check_quota(self.tenant, kind, adding)
+        except QuotaExceeded as e:
+            raise CommandError(str(e))
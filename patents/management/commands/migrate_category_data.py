@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from patents.models import CategorySchemaMigration
+from patents.schema_migration import RUNNING_LEASE, requeue, run_pending_migrations
+
+
+class Command(BaseCommand):
+    help = 'Apply pending IP category data migrations left behind by category edits'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry',
+            action='store_true',
+            help='Also re-run failed and interrupted (running) migrations',
+        )
+        parser.add_argument(
+            '--stale-after', type=int, default=RUNNING_LEASE,
+            help='Seconds without progress before a running migration counts as interrupted',
+        )
+
+    def handle(self, *args, **options):
+        if options['retry']:
+            reset = requeue(options['stale_after'])
+            if reset:
+                self.stdout.write(self.style.WARNING(f'Re-queued {reset} migration(s)'))
+
+        applied = run_pending_migrations()
+        failed = CategorySchemaMigration.objects.filter(status='failed').count()
+        if failed and not options['retry']:
+            self.stdout.write(self.style.WARNING(
+                f'{failed} failed migration(s) hold back later edits of their category; re-run with --retry'
+            ))
+        if not applied:
+            self.stdout.write('No pending migrations')
+            return
+
+        for migration in applied:
+            if migration.status == 'done':
+                self.stdout.write(self.style.SUCCESS(
+                    f'{migration.category.name}: migrated {migration.total_items} items'
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(
+                    f'{migration.category.name}: failed - {migration.error}'
+                ))
@@ -0,0 +1,18 @@
+import time
+from django.core.management.base import BaseCommand
+from patents import readstore
+from patents.lifecycle import backfill_application_keys, rebuild_links
+from patents.models import PatentFiled, PatentGranted, PatentLifecycle
+
+
+class Command(BaseCommand):
+    help = 'Recompute application keys and the filed-to-granted lifecycle table'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        for model in [PatentFiled, PatentGranted]:
+            backfill_application_keys(model)
+        count = rebuild_links(PatentFiled, PatentGranted, PatentLifecycle)
+        readstore.invalidate()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Linked {count} applications in {elapsed:.2f}s'))
@@ -0,0 +1,19 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from patents.suggest import SOURCES, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the autocomplete term index from the record tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scope', choices=sorted(SOURCES), help='Rebuild one table only')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            count = rebuild(options['scope'])
+        except Exception as exc:
+            raise CommandError(f'Rebuild failed: {exc}')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} suggestion terms in {elapsed:.2f}s'))
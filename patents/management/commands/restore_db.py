@@ -0,0 +1,53 @@
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from patents import alerts, readstore, registry, similarity, suggest, tenants, topics
+from patents.models import Tenant
+from patents.snapshots import import_columnar, restore_database
+
+
+class Command(BaseCommand):
+    help = 'Restore the database from a snapshot_db backup (.sqlite3) or columnar export (.zip)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='Backup or export written by snapshot_db')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='Do not ask for confirmation')
+        parser.add_argument('--ignore-schema', action='store_true',
+                            help='Load an export taken at a different migration state')
+
+    def handle(self, *args, **options):
+        path = Path(options['file'])
+        if not path.exists():
+            raise CommandError(f'File not found: {path}')
+        if options['interactive']:
+            answer = input(f'This replaces the current data with {path.name}. Type "yes" to continue: ')
+            if answer != 'yes':
+                raise CommandError('Restore cancelled')
+
+        started = time.perf_counter()
+        try:
+            if path.suffix == '.zip':
+                counts = import_columnar(path, check_schema=not options['ignore_schema'])
+                for table, rows in counts.items():
+                    self.stdout.write(f'  {table}: {rows} rows')
+            else:
+                restore_database(path)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        # Cached tenants, categories, suggestions, saved search keys and stored tables refer to the replaced data
+        tenants.invalidate()
+        for tenant_id in Tenant.objects.values_list('pk', flat=True):
+            registry.invalidate(tenant_id)
+            suggest.invalidate(tenant_id)
+            alerts.invalidate(tenant_id)
+            similarity.invalidate(tenant_id)
+            # Centroid files may belong to a clustering the restored database never had
+            topics.drop_model(tenant_id)
+            readstore.invalidate(tenant_id)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Restored {path.name} in {elapsed:.2f}s'))
+        self.stdout.write(self.style.WARNING('Run rebuild_similarity_index to bring the related-records index up to date'))
+        self.stdout.write(self.style.WARNING('Run cluster_topics to assign topics to records saved from now on'))
+        self.stdout.write(self.style.WARNING('Run build_analytics_snapshot to bring the reports up to date'))
@@ -0,0 +1,94 @@
+import os
+import signal
+import socket
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from patents.task_queue import renew_leases, requeue_stale, work_once
+
+
+class Command(BaseCommand):
+    help = 'Run background tasks from the database queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1, help='Number of worker threads')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument(
+            '--stale-after', type=int, default=600,
+            help='Re-queue running tasks with no progress for this many seconds',
+        )
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1')
+
+        self.stopping = threading.Event()
+        self.finished = threading.Event()
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+
+        base_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.requeue(options['stale_after'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Worker {base_id} started with {options["concurrency"]} thread(s)'
+        ))
+
+        threads = [
+            threading.Thread(
+                target=self.loop,
+                args=(f'{base_id}:{n}', options['poll_interval'], options['burst']),
+                daemon=True,
+            )
+            for n in range(options['concurrency'])
+        ]
+        leases = threading.Thread(target=self.keep_leases, args=(base_id, options['stale_after']), daemon=True)
+        for thread in threads:
+            thread.start()
+        leases.start()
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=0.5)
+        self.finished.set()
+        leases.join()
+
+        self.stdout.write('Worker stopped')
+
+    def requeue(self, stale_after):
+        requeued = requeue_stale(stale_after)
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Re-queued {requeued} stale task(s)'))
+
+    def keep_leases(self, base_id, stale_after):
+        # Renew this process's tasks well within the lease, and expire those of dead workers
+        interval = max(1, stale_after / 3)
+        try:
+            while not self.finished.wait(interval):
+                renew_leases(f'{base_id}:')
+                self.requeue(stale_after)
+        finally:
+            connection.close()
+
+    def request_stop(self, signum, frame):
+        self.stdout.write(self.style.WARNING('Stopping after the current task...'))
+        self.stopping.set()
+
+    def loop(self, worker_id, poll_interval, burst):
+        try:
+            while not self.stopping.is_set():
+                started = time.perf_counter()
+                task_obj = work_once(worker_id)
+                if task_obj is None:
+                    if burst:
+                        return
+                    self.stopping.wait(poll_interval)
+                    continue
+
+                elapsed = time.perf_counter() - started
+                style = self.style.SUCCESS if task_obj.status == 'done' else self.style.ERROR
+                self.stdout.write(style(
+                    f'[{worker_id}] {task_obj.name} #{task_obj.pk} {task_obj.status} in {elapsed:.2f}s'
+                ))
+        finally:
+            connection.close()
@@ -0,0 +1,39 @@
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from patents.snapshots import BACKUP_PAGES, backup_database, backup_dir, default_path, export_columnar
+
+
+class Command(BaseCommand):
+    help = 'Take a consistent online backup of the database, or a compressed columnar export'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Target file (default: backups/db-<timestamp>.sqlite3 or .zip)')
+        parser.add_argument('--export', action='store_true', help='Write a columnar export instead of a database copy')
+        parser.add_argument('--pages', type=int, default=BACKUP_PAGES, help='Pages copied per backup step')
+        parser.add_argument('--keep', type=int, help='Delete all but the newest N files of the same kind in backups/')
+
+    def handle(self, *args, **options):
+        suffix = '.zip' if options['export'] else '.sqlite3'
+        path = Path(options['output']) if options['output'] else default_path(suffix)
+        started = time.perf_counter()
+
+        try:
+            if options['export']:
+                counts = export_columnar(path)
+                for table, rows in counts.items():
+                    self.stdout.write(f'  {table}: {rows} rows')
+            else:
+                backup_database(path, options['pages'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        elapsed = time.perf_counter() - started
+        size = path.stat().st_size
+        self.stdout.write(self.style.SUCCESS(f'Wrote {path} ({size:,} bytes) in {elapsed:.2f}s'))
+
+        if options['keep']:
+            snapshots = sorted(backup_dir().glob(f'db-*{suffix}'), reverse=True)
+            for old in snapshots[options['keep']:]:
+                old.unlink()
+                self.stdout.write(self.style.WARNING(f'Removed old snapshot {old.name}'))
@@ -0,0 +1,147 @@
+import gzip
+import secrets
+import struct
+import zlib
+
+from django.conf import settings
+from django.http import Http404
+from django.http.request import split_domain_port
+from django.middleware.gzip import GZipMiddleware, re_accepts_gzip
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from . import profiling
+from .tenants import resolve_tenant, tenant_context
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+re_accepts_brotli = _lazy_re_compile(r'\bbr\b')
+# Whole responses shorter than this are sent as they are
+MIN_COMPRESS_LENGTH = 200
+# Fast enough to compress pages as they are sent, at close to gzip -9 sizes
+BROTLI_QUALITY = 5
+GZIP_LEVEL = 6
+# Text of a page that carries a secret (a CSRF token); brotli has no room for
+# the random padding gzip gets against BREACH, so such pages are gzipped
+SECRET_MARKERS = (b'csrfmiddlewaretoken',)
+
+
+class ProfileMiddleware:
+    """
+    Profile a single request that sends an X-Profile-Token header equal to
+    PATENTS_PROFILE_TOKEN (unset: profiling is off). The cProfile dump,
+    sampled stacks and SQL breakdown are written to PATENTS_PROFILE_DIR,
+    and the response names them in X-Profile-Report with the request and
+    SQL times in Server-Timing. A streamed body is sent after the view
+    returns, so only the work before its first byte is profiled.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profiling.requested(request):
+            return self.get_response(request)
+        with profiling.profiled() as report:
+            response = self.get_response(request)
+        name = profiling.report_name(request.path)
+        report.write(settings.PATENTS_PROFILE_DIR, name)
+        sql = sum(float(query['time']) for query in report.queries)
+        response['X-Profile-Report'] = name
+        response['Server-Timing'] = f'total;dur={report.seconds * 1000:.1f}, sql;dur={sql * 1000:.1f}'
+        return response
+
+
+class TenantMiddleware:
+    """Resolve the tenant from the host name and scope the request to it"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        host, port = split_domain_port(request.get_host())
+        tenant = resolve_tenant(host)
+        if tenant is None:
+            raise Http404('No institute is served at this address')
+        request.tenant = tenant
+        # Streaming responses are consumed after this returns, so views that
+        # stream pass request.tenant on explicitly
+        with tenant_context(tenant):
+            return self.get_response(request)
+
+
+def _gzipped_chunks(chunks, max_random_bytes):
+    """
+    Gzip a stream, flushing after every chunk so none is held back. As in
+    GZipMiddleware, the header carries a file name of random length, so the
+    compressed length does not give away how well a secret on the page
+    compressed against text an attacker injected (BREACH).
+    """
+    yield (
+        b'\x1f\x8b\x08' + bytes([gzip.FNAME]) + b'\x00\x00\x00\x00\x00\xff'
+        + b'a' * secrets.randbelow(max_random_bytes) + b'\x00'
+    )
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    crc = size = 0
+    for chunk in chunks:
+        crc = zlib.crc32(chunk, crc)
+        size += len(chunk)
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush() + struct.pack('<II', crc, size & 0xffffffff)
+
+
+def _carries_secret(response):
+    return any(marker in response.content for marker in SECRET_MARKERS)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress responses with brotli when the browser accepts it and the
+    brotli package is installed, else with gzip. Streamed responses (the
+    ?all=1 pages, the change feed) are gzipped chunk by chunk and every
+    chunk is flushed, so rows reach the browser as soon as they are
+    rendered; Django's GZipMiddleware buffers them until its compressor
+    fills up. Every gzip body is padded with a random-length header field
+    against BREACH. Brotli has no such field, so it is used only for whole
+    responses without a CSRF token; the others, and whole responses without
+    brotli, are left to GZipMiddleware. Static files are compressed ahead of
+    time and served by WhiteNoise.
+    """
+
+    def process_response(self, request, response):
+        accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if response.streaming:
+            if response.is_async or not re_accepts_gzip.search(accepted):
+                return super().process_response(request, response)
+        elif brotli is None or not re_accepts_brotli.search(accepted) or _carries_secret(response):
+            return super().process_response(request, response)
+        elif len(response.content) < MIN_COMPRESS_LENGTH:
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if response.streaming:
+            encoding = 'gzip'
+            response.streaming_content = _gzipped_chunks(response.streaming_content, self.max_random_bytes)
+            del response.headers['Content-Length']
+        else:
+            encoding = 'br'
+            content = brotli.compress(response.content, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response.headers['Content-Length'] = str(len(content))
+
+        # Compressed bytes differ from the original, so a strong ETag becomes weak
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
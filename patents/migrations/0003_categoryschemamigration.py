@@ -0,0 +1,77 @@
+# Generated by Django 5.1.5 on 2026-10-19 14:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patents", "0002_ipcategory_intellectualproperty"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CategorySchemaMigration",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "operations",
+                    models.JSONField(
+                        default=list,
+                        help_text="Field removes, renames and retypes to apply to item data",
+                        verbose_name="Operations",
+                    ),
+                ),
+                (
+                    "field_definitions",
+                    models.JSONField(
+                        default=list,
+                        help_text="Field definitions the data is migrated to",
+                        verbose_name="Field Definitions",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                ("total_items", models.IntegerField(default=0)),
+                ("processed_items", models.IntegerField(default=0)),
+                ("error", models.TextField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="schema_migrations",
+                        to="patents.ipcategory",
+                        verbose_name="Category",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Category Schema Migration",
+                "verbose_name_plural": "Category Schema Migrations",
+                "db_table": "category_schema_migrations",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
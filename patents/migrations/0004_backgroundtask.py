@@ -0,0 +1,69 @@
+# Generated by Django 5.1.5 on 2026-10-19 14:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patents", "0003_categoryschemamigration"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BackgroundTask",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, verbose_name="Task Name")),
+                ("kwargs", models.JSONField(default=dict, verbose_name="Arguments")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "Queued"),
+                            ("running", "Running"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="queued",
+                        max_length=20,
+                    ),
+                ),
+                ("attempts", models.IntegerField(default=0)),
+                ("max_attempts", models.IntegerField(default=3)),
+                ("run_after", models.DateTimeField(verbose_name="Run After")),
+                ("locked_by", models.CharField(blank=True, default="", max_length=100)),
+                ("progress_done", models.IntegerField(default=0)),
+                ("progress_total", models.IntegerField(default=0)),
+                (
+                    "progress_message",
+                    models.CharField(blank=True, default="", max_length=255),
+                ),
+                ("result", models.JSONField(blank=True, null=True)),
+                ("error", models.TextField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "Background Task",
+                "verbose_name_plural": "Background Tasks",
+                "db_table": "background_tasks",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "run_after"], name="task_status_run_after_idx"
+                    )
+                ],
+            },
+        ),
+    ]
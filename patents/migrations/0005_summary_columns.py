@@ -0,0 +1,110 @@
+# Generated by Django 5.1.5 on 2026-10-19 14:54
+
+from django.db import migrations, models
+
+from patents.summaries import backfill_summaries
+
+
+def fill_summaries(apps, schema_editor):
+    for model_name in [
+        "Copyright",
+        "PatentFiled",
+        "PatentGranted",
+        "IntellectualProperty",
+    ]:
+        backfill_summaries(apps.get_model("patents", model_name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patents", "0004_backgroundtask"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="copyright",
+            name="faculty_students_summary",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=255
+            ),
+        ),
+        migrations.AddField(
+            model_name="copyright",
+            name="filing_info_summary",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=255
+            ),
+        ),
+        migrations.AddField(
+            model_name="copyright",
+            name="inventors_summary",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=255
+            ),
+        ),
+        migrations.AddField(
+            model_name="copyright",
+            name="title_summary",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=255
+            ),
+        ),
+        migrations.AddField(
+            model_name="intellectualproperty",
+            name="data_summary",
+            field=models.JSONField(
+                default=dict,
+                editable=False,
+                help_text="Field values truncated for list display",
+                verbose_name="IP Data Summary",
+            ),
+        ),
+        migrations.AddField(
+            model_name="intellectualproperty",
+            name="display_title",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=50,
+                verbose_name="Display Title",
+            ),
+        ),
+        migrations.AddField(
+            model_name="patentfiled",
+            name="inventors_summary",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=255
+            ),
+        ),
+        migrations.AddField(
+            model_name="patentfiled",
+            name="title_summary",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=255
+            ),
+        ),
+        migrations.AddField(
+            model_name="patentgranted",
+            name="filing_institute_summary",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=255
+            ),
+        ),
+        migrations.AddField(
+            model_name="patentgranted",
+            name="inventors_summary",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=255
+            ),
+        ),
+        migrations.AddField(
+            model_name="patentgranted",
+            name="title_summary",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=255
+            ),
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.1.5 on 2026-10-19 14:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patents", "0005_summary_columns"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="copyright",
+            index=models.Index(fields=["year", "sl_no"], name="copyright_year_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="copyright",
+            index=models.Index(fields=["sl_no"], name="copyright_sl_no_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="copyright",
+            index=models.Index(fields=["title_summary"], name="copyright_title_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="intellectualproperty",
+            index=models.Index(
+                fields=["category", "created_at"], name="ip_category_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="intellectualproperty",
+            index=models.Index(
+                fields=["category", "display_title"], name="ip_category_title_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentfiled",
+            index=models.Index(
+                fields=["date_of_filing", "sl_no"], name="filed_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentfiled",
+            index=models.Index(fields=["sl_no"], name="filed_sl_no_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="patentfiled",
+            index=models.Index(fields=["title_summary"], name="filed_title_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="patentfiled",
+            index=models.Index(
+                fields=["application_number"], name="filed_app_number_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentfiled",
+            index=models.Index(
+                fields=["date_of_publication"], name="filed_publication_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentgranted",
+            index=models.Index(
+                fields=["date_of_grant", "sl_no"], name="granted_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentgranted",
+            index=models.Index(fields=["sl_no"], name="granted_sl_no_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="patentgranted",
+            index=models.Index(
+                fields=["granted_patent_no"], name="granted_patent_no_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentgranted",
+            index=models.Index(fields=["title_summary"], name="granted_title_idx"),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.5 on 2026-10-19 14:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patents", "0006_table_sort_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SuggestTerm",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("scope", models.CharField(max_length=20, verbose_name="Table")),
+                ("field", models.CharField(max_length=50, verbose_name="Field")),
+                (
+                    "term",
+                    models.CharField(max_length=100, verbose_name="Normalized Term"),
+                ),
+                (
+                    "display",
+                    models.CharField(max_length=255, verbose_name="Suggestion"),
+                ),
+                (
+                    "weight",
+                    models.IntegerField(default=0, verbose_name="Matching Records"),
+                ),
+            ],
+            options={
+                "verbose_name": "Suggest Term",
+                "verbose_name_plural": "Suggest Terms",
+                "db_table": "suggest_terms",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("scope", "field", "term"), name="suggest_term_unique"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.1.5 on 2026-10-19 15:05
+
+from django.db import migrations, models
+
+from patents.facets import backfill_facets
+
+
+def fill_facets(apps, schema_editor):
+    for model_name in ["PatentFiled", "PatentGranted"]:
+        backfill_facets(apps.get_model("patents", model_name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patents", "0007_suggestterm"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="patentfiled",
+            name="applicant_facet",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=100
+            ),
+        ),
+        migrations.AddField(
+            model_name="patentfiled",
+            name="filing_year",
+            field=models.PositiveSmallIntegerField(
+                blank=True, editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="patentgranted",
+            name="grant_year",
+            field=models.PositiveSmallIntegerField(
+                blank=True, editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="patentgranted",
+            name="institute_facet",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=100
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentfiled",
+            index=models.Index(fields=["filing_year"], name="filed_year_facet_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="patentfiled",
+            index=models.Index(
+                fields=["applicant_facet"], name="filed_applicant_facet_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentgranted",
+            index=models.Index(
+                fields=["application_number"], name="granted_app_number_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentgranted",
+            index=models.Index(fields=["grant_year"], name="granted_year_facet_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="patentgranted",
+            index=models.Index(
+                fields=["institute_facet"], name="granted_institute_facet_idx"
+            ),
+        ),
+        migrations.RunPython(fill_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,129 @@
+# Generated by Django 5.1.5 on 2026-10-19 15:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from patents.lifecycle import backfill_application_keys, build_link
+
+
+def _first_by_key(queryset):
+    records = {}
+    for record in queryset.order_by("-pk"):
+        records[record.application_key] = record
+    return records
+
+
+def fill_lifecycle(apps, schema_editor):
+    # Rows are keyed on the application key alone here; tenants come in 0011,
+    # so lifecycle.rebuild_links cannot run on these historical models
+    filed_model = apps.get_model("patents", "PatentFiled")
+    granted_model = apps.get_model("patents", "PatentGranted")
+    link_model = apps.get_model("patents", "PatentLifecycle")
+    backfill_application_keys(filed_model)
+    backfill_application_keys(granted_model)
+    filed = _first_by_key(filed_model.objects.exclude(application_key=""))
+    granted = _first_by_key(granted_model.objects.exclude(application_key=""))
+    link_model.objects.bulk_create(
+        [
+            link_model(
+                application_key=key, **build_link(key, filed.get(key), granted.get(key))
+            )
+            for key in sorted(set(filed) | set(granted))
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patents", "0008_search_facets"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PatentLifecycle",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "application_key",
+                    models.CharField(
+                        max_length=50, unique=True, verbose_name="Application Number"
+                    ),
+                ),
+                ("filing_date", models.DateField(blank=True, null=True)),
+                ("grant_date", models.DateField(blank=True, null=True)),
+                (
+                    "filing_year",
+                    models.PositiveSmallIntegerField(blank=True, null=True),
+                ),
+                ("days_to_grant", models.PositiveIntegerField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Patent Lifecycle",
+                "verbose_name_plural": "Patent Lifecycles",
+                "db_table": "patent_lifecycle",
+                "ordering": ["-filing_year", "application_key"],
+            },
+        ),
+        migrations.AddField(
+            model_name="patentfiled",
+            name="application_key",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=50
+            ),
+        ),
+        migrations.AddField(
+            model_name="patentgranted",
+            name="application_key",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=50
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentfiled",
+            index=models.Index(fields=["application_key"], name="filed_app_key_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="patentgranted",
+            index=models.Index(fields=["application_key"], name="granted_app_key_idx"),
+        ),
+        migrations.AddField(
+            model_name="patentlifecycle",
+            name="filed",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="lifecycle_links",
+                to="patents.patentfiled",
+            ),
+        ),
+        migrations.AddField(
+            model_name="patentlifecycle",
+            name="granted",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="lifecycle_links",
+                to="patents.patentgranted",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentlifecycle",
+            index=models.Index(
+                fields=["filing_year", "days_to_grant"], name="lifecycle_year_idx"
+            ),
+        ),
+        migrations.RunPython(fill_lifecycle, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.5 on 2026-10-19 15:09
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patents", "0009_patent_lifecycle"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeLogEntry",
+            fields=[
+                (
+                    "seq",
+                    models.BigAutoField(
+                        primary_key=True, serialize=False, verbose_name="Sequence"
+                    ),
+                ),
+                ("table", models.CharField(max_length=20, verbose_name="Table")),
+                ("object_id", models.BigIntegerField(verbose_name="Record ID")),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("upsert", "Created or updated"),
+                            ("delete", "Deleted"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "data",
+                    models.JSONField(
+                        blank=True,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        help_text="Row values after the change",
+                        null=True,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "verbose_name": "Change Log Entry",
+                "verbose_name_plural": "Change Log",
+                "db_table": "change_log",
+                "ordering": ["seq"],
+                "indexes": [
+                    models.Index(
+                        fields=["table", "seq"], name="change_log_table_seq_idx"
+                    )
+                ],
+            },
+        ),
+    ]
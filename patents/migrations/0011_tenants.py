@@ -0,0 +1,542 @@
+# Generated by Django 5.1.5 on 2026-10-19 15:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SCOPED_MODELS = [
+    "IPCategory",
+    "IntellectualProperty",
+    "Copyright",
+    "PatentFiled",
+    "PatentGranted",
+    "PatentLifecycle",
+    "SuggestTerm",
+    "ChangeLogEntry",
+    "BackgroundTask",
+]
+
+
+def assign_default_tenant(apps, schema_editor):
+    # Existing data belongs to the institute the app was built for
+    tenant_model = apps.get_model("patents", "Tenant")
+    tenant, created = tenant_model.objects.get_or_create(
+        slug="iiest", defaults={"name": "IIEST Shibpur"}
+    )
+    for name in SCOPED_MODELS:
+        apps.get_model("patents", name).objects.filter(tenant__isnull=True).update(
+            tenant=tenant
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patents", "0010_change_log"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Tenant",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(max_length=200, verbose_name="Institute Name"),
+                ),
+                (
+                    "slug",
+                    models.SlugField(
+                        help_text="Also matched as the subdomain", unique=True
+                    ),
+                ),
+                (
+                    "domain",
+                    models.CharField(
+                        blank=True,
+                        max_length=255,
+                        null=True,
+                        unique=True,
+                        verbose_name="Host Name",
+                    ),
+                ),
+                (
+                    "max_records",
+                    models.PositiveIntegerField(
+                        blank=True,
+                        help_text="Copyrights, patents and IP items allowed; empty for no limit",
+                        null=True,
+                    ),
+                ),
+                (
+                    "max_categories",
+                    models.PositiveIntegerField(
+                        blank=True,
+                        help_text="IP categories allowed; empty for no limit",
+                        null=True,
+                    ),
+                ),
+                ("is_active", models.BooleanField(default=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Tenant",
+                "verbose_name_plural": "Tenants",
+                "db_table": "tenants",
+                "ordering": ["name"],
+            },
+        ),
+        migrations.RemoveConstraint(
+            model_name="suggestterm",
+            name="suggest_term_unique",
+        ),
+        migrations.RemoveIndex(
+            model_name="changelogentry",
+            name="change_log_table_seq_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="copyright",
+            name="copyright_year_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="copyright",
+            name="copyright_sl_no_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="copyright",
+            name="copyright_title_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="patentfiled",
+            name="filed_date_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="patentfiled",
+            name="filed_sl_no_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="patentfiled",
+            name="filed_title_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="patentfiled",
+            name="filed_app_number_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="patentfiled",
+            name="filed_publication_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="patentfiled",
+            name="filed_year_facet_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="patentfiled",
+            name="filed_applicant_facet_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="patentfiled",
+            name="filed_app_key_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="patentgranted",
+            name="granted_date_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="patentgranted",
+            name="granted_sl_no_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="patentgranted",
+            name="granted_patent_no_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="patentgranted",
+            name="granted_title_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="patentgranted",
+            name="granted_app_number_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="patentgranted",
+            name="granted_year_facet_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="patentgranted",
+            name="granted_institute_facet_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="patentgranted",
+            name="granted_app_key_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="patentlifecycle",
+            name="lifecycle_year_idx",
+        ),
+        migrations.AlterField(
+            model_name="ipcategory",
+            name="name",
+            field=models.CharField(max_length=100, verbose_name="Category Name"),
+        ),
+        migrations.AlterField(
+            model_name="ipcategory",
+            name="slug",
+            field=models.SlugField(blank=True, db_index=False, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name="patentlifecycle",
+            name="application_key",
+            field=models.CharField(max_length=50, verbose_name="Application Number"),
+        ),
+        migrations.AddField(
+            model_name="backgroundtask",
+            name="tenant",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="patents.tenant",
+            ),
+        ),
+        migrations.AddField(
+            model_name="changelogentry",
+            name="tenant",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="patents.tenant",
+            ),
+        ),
+        migrations.AddField(
+            model_name="copyright",
+            name="tenant",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="patents.tenant",
+            ),
+        ),
+        migrations.AddField(
+            model_name="intellectualproperty",
+            name="tenant",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="patents.tenant",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ipcategory",
+            name="tenant",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="patents.tenant",
+            ),
+        ),
+        migrations.AddField(
+            model_name="patentfiled",
+            name="tenant",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="patents.tenant",
+            ),
+        ),
+        migrations.AddField(
+            model_name="patentgranted",
+            name="tenant",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="patents.tenant",
+            ),
+        ),
+        migrations.AddField(
+            model_name="patentlifecycle",
+            name="tenant",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="patents.tenant",
+            ),
+        ),
+        migrations.AddField(
+            model_name="suggestterm",
+            name="tenant",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="patents.tenant",
+            ),
+        ),
+        migrations.RunPython(assign_default_tenant, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="ipcategory",
+            name="tenant",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="patents.tenant",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="intellectualproperty",
+            name="tenant",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="patents.tenant",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="copyright",
+            name="tenant",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="patents.tenant",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="patentfiled",
+            name="tenant",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="patents.tenant",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="patentgranted",
+            name="tenant",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="patents.tenant",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="patentlifecycle",
+            name="tenant",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="patents.tenant",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="suggestterm",
+            name="tenant",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="patents.tenant",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="changelogentry",
+            name="tenant",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="patents.tenant",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="backgroundtask",
+            index=models.Index(
+                fields=["tenant", "created_at"], name="task_tenant_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="changelogentry",
+            index=models.Index(
+                fields=["tenant", "seq"], name="change_log_tenant_seq_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="changelogentry",
+            index=models.Index(
+                fields=["tenant", "table", "seq"], name="change_log_table_seq_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="copyright",
+            index=models.Index(
+                fields=["tenant", "year", "sl_no"], name="copyright_year_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="copyright",
+            index=models.Index(fields=["tenant", "sl_no"], name="copyright_sl_no_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="copyright",
+            index=models.Index(
+                fields=["tenant", "title_summary"], name="copyright_title_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="intellectualproperty",
+            index=models.Index(fields=["tenant"], name="ip_tenant_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="patentfiled",
+            index=models.Index(
+                fields=["tenant", "date_of_filing", "sl_no"], name="filed_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentfiled",
+            index=models.Index(fields=["tenant", "sl_no"], name="filed_sl_no_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="patentfiled",
+            index=models.Index(
+                fields=["tenant", "title_summary"], name="filed_title_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentfiled",
+            index=models.Index(
+                fields=["tenant", "application_number"], name="filed_app_number_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentfiled",
+            index=models.Index(
+                fields=["tenant", "date_of_publication"], name="filed_publication_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentfiled",
+            index=models.Index(
+                fields=["tenant", "filing_year"], name="filed_year_facet_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentfiled",
+            index=models.Index(
+                fields=["tenant", "applicant_facet"], name="filed_applicant_facet_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentfiled",
+            index=models.Index(
+                fields=["tenant", "application_key"], name="filed_app_key_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentgranted",
+            index=models.Index(
+                fields=["tenant", "date_of_grant", "sl_no"], name="granted_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentgranted",
+            index=models.Index(fields=["tenant", "sl_no"], name="granted_sl_no_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="patentgranted",
+            index=models.Index(
+                fields=["tenant", "granted_patent_no"], name="granted_patent_no_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentgranted",
+            index=models.Index(
+                fields=["tenant", "title_summary"], name="granted_title_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentgranted",
+            index=models.Index(
+                fields=["tenant", "application_number"], name="granted_app_number_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentgranted",
+            index=models.Index(
+                fields=["tenant", "grant_year"], name="granted_year_facet_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentgranted",
+            index=models.Index(
+                fields=["tenant", "institute_facet"], name="granted_institute_facet_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentgranted",
+            index=models.Index(
+                fields=["tenant", "application_key"], name="granted_app_key_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentlifecycle",
+            index=models.Index(
+                fields=["tenant", "filing_year", "days_to_grant"],
+                name="lifecycle_year_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="ipcategory",
+            constraint=models.UniqueConstraint(
+                fields=("tenant", "name"), name="category_tenant_name_unique"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="ipcategory",
+            constraint=models.UniqueConstraint(
+                fields=("tenant", "slug"), name="category_tenant_slug_unique"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="patentlifecycle",
+            constraint=models.UniqueConstraint(
+                fields=("tenant", "application_key"), name="lifecycle_tenant_key_unique"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="suggestterm",
+            constraint=models.UniqueConstraint(
+                fields=("tenant", "scope", "field", "term"), name="suggest_term_unique"
+            ),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.5 on 2026-10-19 15:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patents", "0011_tenants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SimilarityDelta",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("scope", models.CharField(max_length=20, verbose_name="Table")),
+                ("object_id", models.BigIntegerField(verbose_name="Record ID")),
+                (
+                    "terms",
+                    models.JSONField(
+                        blank=True,
+                        help_text="Term counts of the record; empty once deleted",
+                        null=True,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="patents.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Similarity Delta",
+                "verbose_name_plural": "Similarity Deltas",
+                "db_table": "similarity_deltas",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("tenant", "scope", "object_id"),
+                        name="similarity_delta_unique",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 5.1.5 on 2026-10-19 15:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patents", "0012_similarity_deltas"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Topic",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("number", models.PositiveSmallIntegerField(verbose_name="Cluster")),
+                ("label", models.CharField(max_length=255, verbose_name="Label")),
+                (
+                    "terms",
+                    models.JSONField(
+                        blank=True,
+                        default=list,
+                        help_text="Strongest terms of the cluster centre",
+                    ),
+                ),
+                (
+                    "records",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Records at Clustering"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="patents.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Topic",
+                "verbose_name_plural": "Topics",
+                "db_table": "topics",
+                "ordering": ["number"],
+            },
+        ),
+        migrations.AddField(
+            model_name="patentfiled",
+            name="topic",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="patents.topic",
+            ),
+        ),
+        migrations.AddField(
+            model_name="patentgranted",
+            name="topic",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="patents.topic",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patentfiled",
+            index=models.Index(fields=["tenant", "topic"], name="filed_topic_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="patentfiled",
+            index=models.Index(fields=["tenant", "id"], name="filed_tenant_pk_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="patentgranted",
+            index=models.Index(fields=["tenant", "topic"], name="granted_topic_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="patentgranted",
+            index=models.Index(fields=["tenant", "id"], name="granted_tenant_pk_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="topic",
+            constraint=models.UniqueConstraint(
+                fields=("tenant", "number"), name="topic_tenant_number_unique"
+            ),
+        ),
+    ]
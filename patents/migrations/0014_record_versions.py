@@ -0,0 +1,73 @@
+# Generated by Django 5.1.5 on 2026-10-19 15:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patents", "0013_topics"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecordVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("table", models.CharField(max_length=20, verbose_name="Table")),
+                ("object_id", models.BigIntegerField(verbose_name="Record ID")),
+                ("version", models.PositiveIntegerField(verbose_name="Version")),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("checkpoint", "Checkpoint"),
+                            ("delta", "Changes"),
+                            ("delete", "Deleted"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "data",
+                    models.BinaryField(
+                        blank=True,
+                        help_text="zlib-compressed JSON: all values or only the changes",
+                        null=True,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="patents.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Record Version",
+                "verbose_name_plural": "Record Versions",
+                "db_table": "record_versions",
+                "ordering": ["table", "object_id", "version"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("tenant", "table", "object_id", "version"),
+                        name="record_version_unique",
+                    )
+                ],
+            },
+        ),
+    ]
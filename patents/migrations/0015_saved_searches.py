@@ -0,0 +1,161 @@
+# Generated by Django 5.1.5 on 2026-10-19 15:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patents", "0014_record_versions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SavedSearch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=200, verbose_name="Name")),
+                ("scope", models.CharField(max_length=20, verbose_name="Table")),
+                (
+                    "params",
+                    models.JSONField(
+                        default=dict,
+                        help_text="Search form fields and facets, as in the search URL",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="patents.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Saved Search",
+                "verbose_name_plural": "Saved Searches",
+                "db_table": "saved_searches",
+                "ordering": ["name"],
+            },
+        ),
+        migrations.CreateModel(
+            name="SavedSearchKey",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("scope", models.CharField(max_length=20, verbose_name="Table")),
+                ("field", models.CharField(max_length=50, verbose_name="Field")),
+                (
+                    "term",
+                    models.CharField(
+                        max_length=100, verbose_name="Trigram or Facet Value"
+                    ),
+                ),
+                (
+                    "search",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="keys",
+                        to="patents.savedsearch",
+                    ),
+                ),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="patents.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Saved Search Key",
+                "verbose_name_plural": "Saved Search Keys",
+                "db_table": "saved_search_keys",
+                "indexes": [
+                    models.Index(
+                        fields=["tenant", "scope", "field", "term"],
+                        name="saved_search_key_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="SearchAlert",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("object_id", models.BigIntegerField(verbose_name="Record ID")),
+                (
+                    "created",
+                    models.BooleanField(
+                        default=True, help_text="New record rather than an edit"
+                    ),
+                ),
+                ("seen", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "search",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="alerts",
+                        to="patents.savedsearch",
+                    ),
+                ),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="patents.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Search Alert",
+                "verbose_name_plural": "Search Alerts",
+                "db_table": "search_alerts",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["search", "seen", "created_at"],
+                        name="search_alert_seen_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("search", "object_id"), name="search_alert_unique"
+                    )
+                ],
+            },
+        ),
+    ]
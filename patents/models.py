@@ -1,8 +1,75 @@
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.utils import timezone
 from django.utils.text import slugify
 
+from .facets import update_record_facets
+from .lifecycle import update_application_key
+from .summaries import update_item_summaries, update_record_summaries
+from .tenants import TenantManager, default_tenant, get_current_tenant
 
-class IPCategory(models.Model):
+
+class Tenant(models.Model):
+    """An institute served by this deployment; every record belongs to one"""
+    name = models.CharField(max_length=200, verbose_name="Institute Name")
+    slug = models.SlugField(max_length=50, unique=True, help_text="Also matched as the subdomain")
+    domain = models.CharField(max_length=255, unique=True, null=True, blank=True, verbose_name="Host Name")
+    max_records = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Copyrights, patents and IP items allowed; empty for no limit"
+    )
+    max_categories = models.PositiveIntegerField(
+        null=True, blank=True, help_text="IP categories allowed; empty for no limit"
+    )
+    is_active = models.BooleanField(default=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'tenants'
+        ordering = ['name']
+        verbose_name = 'Tenant'
+        verbose_name_plural = 'Tenants'
+    
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = slugify(self.name)[:50]
+        self.domain = self.domain.strip().lower() if self.domain else None
+        super().save(*args, **kwargs)
+    
+    def __str__(self):
+        return self.name
+
+
+class TenantScopedModel(models.Model):
+    """Base of tenant-owned models: queries are scoped to the active tenant (see tenants.py)"""
+    # Indexed through the composite indexes of each model, which all lead with tenant
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='+', db_index=False)
+    
+    objects = TenantManager()
+    
+    class Meta:
+        abstract = True
+    
+    def save(self, *args, **kwargs):
+        if self.tenant_id is None:
+            self.tenant = get_current_tenant() or default_tenant()
+        super().save(*args, **kwargs)
+
+
+class VersionedModel(TenantScopedModel):
+    """Tenant-owned model whose every save also adds to its version history (see history.py)"""
+    
+    class Meta:
+        abstract = True
+    
+    def save(self, *args, **kwargs):
+        # post_save writes the version; one transaction keeps the row and its history in step
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class IPCategory(TenantScopedModel):
     """Model for defining custom IP categories"""
     FIELD_TYPES = [
         ('text', 'Text (single line)'),
@@ -12,8 +79,8 @@ class IPCategory(models.Model):
         ('select', 'Dropdown/Select'),
     ]
     
-    name = models.CharField(max_length=100, unique=True, verbose_name="Category Name")
-    slug = models.SlugField(max_length=100, unique=True, blank=True)
+    name = models.CharField(max_length=100, verbose_name="Category Name")
+    slug = models.SlugField(max_length=100, blank=True, db_index=False)
     description = models.TextField(null=True, blank=True, verbose_name="Description")
     field_definitions = models.JSONField(
         default=list,
@@ -27,6 +94,10 @@ class IPCategory(models.Model):
     class Meta:
         db_table = 'ip_categories'
         ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'name'], name='category_tenant_name_unique'),
+            models.UniqueConstraint(fields=['tenant', 'slug'], name='category_tenant_slug_unique'),
+        ]
         verbose_name = 'IP Category'
         verbose_name_plural = 'IP Categories'
     
@@ -39,7 +110,7 @@ class IPCategory(models.Model):
         return self.name
 
 
-class IntellectualProperty(models.Model):
+class IntellectualProperty(VersionedModel):
     """Model for storing dynamic IP data"""
     category = models.ForeignKey(
         IPCategory,
@@ -53,28 +124,376 @@ class IntellectualProperty(models.Model):
         help_text="JSON object storing field values"
     )
     
+    # Denormalized for list pages, computed on save and bulk import
+    display_title = models.CharField(max_length=50, blank=True, default='', editable=False, verbose_name="Display Title")
+    data_summary = models.JSONField(
+        default=dict,
+        editable=False,
+        verbose_name="IP Data Summary",
+        help_text="Field values truncated for list display"
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'intellectual_properties'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['category', 'created_at'], name='ip_category_created_idx'),
+            models.Index(fields=['category', 'display_title'], name='ip_category_title_idx'),
+            models.Index(fields=['tenant'], name='ip_tenant_idx'),
+        ]
         verbose_name = 'Intellectual Property'
         verbose_name_plural = 'Intellectual Properties'
     
     def __str__(self):
         return f"{self.category.name} - {self.pk}"
     
+    def save(self, *args, **kwargs):
+        if self.tenant_id is None:
+            self.tenant_id = self.category.tenant_id
+        self.update_summaries()
+        super().save(*args, **kwargs)
+    
+    def update_summaries(self, field_definitions=None):
+        """Recompute display_title/data_summary from data"""
+        if field_definitions is None and IntellectualProperty.category.is_cached(self):
+            field_definitions = self.category.field_definitions
+        update_item_summaries(self, field_definitions)
+    
     def get_display_title(self):
         """Get a display title from the first text field or ID"""
-        if self.data:
-            for key, value in self.data.items():
-                if value and isinstance(value, str) and len(value) > 0:
-                    return f"{value[:50]}" if len(value) > 50 else value
-        return f"Item #{self.pk}"
+        return self.display_title or f"Item #{self.pk}"
 
 
-class Copyright(models.Model):
+class CategorySchemaMigration(models.Model):
+    """Rewrite of existing IP data after a category's field definitions change"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    category = models.ForeignKey(
+        IPCategory,
+        on_delete=models.CASCADE,
+        related_name='schema_migrations',
+        verbose_name="Category"
+    )
+    operations = models.JSONField(
+        default=list,
+        verbose_name="Operations",
+        help_text="Field removes, renames and retypes to apply to item data"
+    )
+    field_definitions = models.JSONField(
+        default=list,
+        verbose_name="Field Definitions",
+        help_text="Field definitions the data is migrated to"
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    total_items = models.IntegerField(default=0)
+    processed_items = models.IntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'category_schema_migrations'
+        ordering = ['-created_at']
+        verbose_name = 'Category Schema Migration'
+        verbose_name_plural = 'Category Schema Migrations'
+
+    def __str__(self):
+        return f"{self.category.name} - {self.get_status_display()}"
+
+    @property
+    def progress_percent(self):
+        if self.status == 'done':
+            return 100
+        if not self.total_items:
+            return 0
+        return int(self.processed_items * 100 / self.total_items)
+
+
+class BackgroundTask(models.Model):
+    """Queued unit of work run by ``manage.py run_worker``"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    # Tenant the task was queued for; None for deployment-wide tasks
+    tenant = models.ForeignKey(
+        Tenant, null=True, blank=True, on_delete=models.CASCADE, related_name='+', db_index=False
+    )
+    name = models.CharField(max_length=100, verbose_name="Task Name")
+    kwargs = models.JSONField(default=dict, verbose_name="Arguments")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    run_after = models.DateTimeField(verbose_name="Run After")
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    progress_done = models.IntegerField(default=0)
+    progress_total = models.IntegerField(default=0)
+    progress_message = models.CharField(max_length=255, blank=True, default='')
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    objects = TenantManager()
+
+    class Meta:
+        db_table = 'background_tasks'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='task_status_run_after_idx'),
+            models.Index(fields=['tenant', 'created_at'], name='task_tenant_created_idx'),
+        ]
+        verbose_name = 'Background Task'
+        verbose_name_plural = 'Background Tasks'
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} - {self.get_status_display()}"
+
+    @property
+    def progress_percent(self):
+        if self.status == 'done':
+            return 100
+        if not self.progress_total:
+            return 0
+        return int(self.progress_done * 100 / self.progress_total)
+
+    def set_progress(self, done, total=None, message=None):
+        """Record progress without touching other columns (also acts as a heartbeat)"""
+        self.progress_done = done
+        if total is not None:
+            self.progress_total = total
+        if message is not None:
+            self.progress_message = message[:255]
+        BackgroundTask.objects.filter(pk=self.pk).update(
+            progress_done=self.progress_done,
+            progress_total=self.progress_total,
+            progress_message=self.progress_message,
+            updated_at=timezone.now(),
+        )
+
+    def as_dict(self):
+        return {
+            'id': self.pk,
+            'name': self.name,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'progress_done': self.progress_done,
+            'progress_total': self.progress_total,
+            'progress_percent': self.progress_percent,
+            'progress_message': self.progress_message,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class SuggestTerm(TenantScopedModel):
+    """Prefix index entry behind the search-as-you-type suggestions"""
+    scope = models.CharField(max_length=20, verbose_name="Table")
+    field = models.CharField(max_length=50, verbose_name="Field")
+    term = models.CharField(max_length=100, verbose_name="Normalized Term")
+    display = models.CharField(max_length=255, verbose_name="Suggestion")
+    weight = models.IntegerField(default=0, verbose_name="Matching Records")
+    
+    class Meta:
+        db_table = 'suggest_terms'
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'scope', 'field', 'term'], name='suggest_term_unique'),
+        ]
+        verbose_name = 'Suggest Term'
+        verbose_name_plural = 'Suggest Terms'
+    
+    def __str__(self):
+        return f"{self.scope}.{self.field}: {self.term}"
+
+
+class ChangeLogEntry(TenantScopedModel):
+    """Append-only record of one insert/update/delete, read by incremental sync consumers"""
+    ACTION_CHOICES = [
+        ('upsert', 'Created or updated'),
+        ('delete', 'Deleted'),
+    ]
+    
+    # AUTOINCREMENT on SQLite, so sequence numbers are never reused
+    seq = models.BigAutoField(primary_key=True, verbose_name="Sequence")
+    table = models.CharField(max_length=20, verbose_name="Table")
+    object_id = models.BigIntegerField(verbose_name="Record ID")
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    data = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder, help_text="Row values after the change")
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'change_log'
+        ordering = ['seq']
+        indexes = [
+            models.Index(fields=['tenant', 'seq'], name='change_log_tenant_seq_idx'),
+            models.Index(fields=['tenant', 'table', 'seq'], name='change_log_table_seq_idx'),
+        ]
+        verbose_name = 'Change Log Entry'
+        verbose_name_plural = 'Change Log'
+    
+    def __str__(self):
+        return f"#{self.seq} {self.action} {self.table}:{self.object_id}"
+    
+    def as_dict(self):
+        return {
+            'seq': self.seq,
+            'table': self.table,
+            'id': self.object_id,
+            'action': self.action,
+            'data': self.data,
+            'at': self.created_at.isoformat(),
+        }
+
+
+class RecordVersion(TenantScopedModel):
+    """One version of a record or IP item: a full checkpoint or the changes since the version before"""
+    KIND_CHOICES = [
+        ('checkpoint', 'Checkpoint'),
+        ('delta', 'Changes'),
+        ('delete', 'Deleted'),
+    ]
+    
+    table = models.CharField(max_length=20, verbose_name="Table")
+    object_id = models.BigIntegerField(verbose_name="Record ID")
+    version = models.PositiveIntegerField(verbose_name="Version")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    data = models.BinaryField(null=True, blank=True, help_text="zlib-compressed JSON: all values or only the changes")
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'record_versions'
+        ordering = ['table', 'object_id', 'version']
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'table', 'object_id', 'version'], name='record_version_unique'),
+        ]
+        verbose_name = 'Record Version'
+        verbose_name_plural = 'Record Versions'
+    
+    def __str__(self):
+        return f"{self.table}:{self.object_id} v{self.version} ({self.kind})"
+
+
+class SavedSearch(TenantScopedModel):
+    """Search of filed or granted patents kept to be alerted of new matching records (see alerts.py)"""
+    name = models.CharField(max_length=200, verbose_name="Name")
+    scope = models.CharField(max_length=20, verbose_name="Table")
+    params = models.JSONField(default=dict, help_text="Search form fields and facets, as in the search URL")
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'saved_searches'
+        ordering = ['name']
+        verbose_name = 'Saved Search'
+        verbose_name_plural = 'Saved Searches'
+    
+    def __str__(self):
+        return self.name
+
+
+class SavedSearchKey(TenantScopedModel):
+    """Reverse index entry: a value every record matching the search must contain in one field"""
+    search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='keys')
+    scope = models.CharField(max_length=20, verbose_name="Table")
+    field = models.CharField(max_length=50, verbose_name="Field")
+    term = models.CharField(max_length=100, verbose_name="Trigram or Facet Value")
+    
+    class Meta:
+        db_table = 'saved_search_keys'
+        indexes = [
+            models.Index(fields=['tenant', 'scope', 'field', 'term'], name='saved_search_key_idx'),
+        ]
+        verbose_name = 'Saved Search Key'
+        verbose_name_plural = 'Saved Search Keys'
+    
+    def __str__(self):
+        return f"{self.scope}.{self.field}:{self.term}"
+
+
+class SearchAlert(TenantScopedModel):
+    """Record that started to match, or changed while matching, a saved search"""
+    search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='alerts')
+    object_id = models.BigIntegerField(verbose_name="Record ID")
+    created = models.BooleanField(default=True, help_text="New record rather than an edit")
+    seen = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'search_alerts'
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['search', 'object_id'], name='search_alert_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['search', 'seen', 'created_at'], name='search_alert_seen_idx'),
+        ]
+        verbose_name = 'Search Alert'
+        verbose_name_plural = 'Search Alerts'
+    
+    def __str__(self):
+        return f"{self.search} <- {self.object_id}"
+
+
+class SimilarityDelta(TenantScopedModel):
+    """Record saved or deleted since the similarity index was last built"""
+    scope = models.CharField(max_length=20, verbose_name="Table")
+    object_id = models.BigIntegerField(verbose_name="Record ID")
+    terms = models.JSONField(null=True, blank=True, help_text="Term counts of the record; empty once deleted")
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'similarity_deltas'
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'scope', 'object_id'], name='similarity_delta_unique'),
+        ]
+        verbose_name = 'Similarity Delta'
+        verbose_name_plural = 'Similarity Deltas'
+    
+    def __str__(self):
+        return f"{self.scope}:{self.object_id}"
+
+
+class Topic(TenantScopedModel):
+    """Technology area found by clustering patent titles and abstracts (see topics.py)"""
+    number = models.PositiveSmallIntegerField(verbose_name="Cluster")
+    label = models.CharField(max_length=255, verbose_name="Label")
+    terms = models.JSONField(default=list, blank=True, help_text="Strongest terms of the cluster centre")
+    records = models.PositiveIntegerField(default=0, verbose_name="Records at Clustering")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'topics'
+        ordering = ['number']
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'number'], name='topic_tenant_number_unique'),
+        ]
+        verbose_name = 'Topic'
+        verbose_name_plural = 'Topics'
+    
+    def __str__(self):
+        return self.label
+
+
+class Copyright(VersionedModel):
     """Model for Copyright data"""
     sl_no = models.IntegerField(null=True, blank=True, verbose_name="Serial Number")
     year = models.CharField(max_length=10, null=True, blank=True, verbose_name="Year")
@@ -83,20 +502,35 @@ class Copyright(models.Model):
     filing_info = models.TextField(null=True, blank=True, verbose_name="Filing Informations")
     inventors = models.TextField(null=True, blank=True, verbose_name="Inventor(s)")
     
+    # Truncated copies shown on list/search pages, computed on save
+    faculty_students_summary = models.CharField(max_length=255, blank=True, default='', editable=False)
+    title_summary = models.CharField(max_length=255, blank=True, default='', editable=False)
+    filing_info_summary = models.CharField(max_length=255, blank=True, default='', editable=False)
+    inventors_summary = models.CharField(max_length=255, blank=True, default='', editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'copyrights'
         ordering = ['-year', '-sl_no']
+        indexes = [
+            models.Index(fields=['tenant', 'year', 'sl_no'], name='copyright_year_idx'),
+            models.Index(fields=['tenant', 'sl_no'], name='copyright_sl_no_idx'),
+            models.Index(fields=['tenant', 'title_summary'], name='copyright_title_idx'),
+        ]
         verbose_name = 'Copyright'
         verbose_name_plural = 'Copyrights'
     
     def __str__(self):
         return f"{self.year} - {self.title[:50] if self.title else 'N/A'}"
+    
+    def save(self, *args, **kwargs):
+        update_record_summaries(self)
+        super().save(*args, **kwargs)
 
 
-class PatentFiled(models.Model):
+class PatentFiled(VersionedModel):
     """Model for Filed Patents"""
     sl_no = models.IntegerField(null=True, blank=True, verbose_name="Serial Number")
     date_of_filing = models.CharField(max_length=50, null=True, blank=True, verbose_name="Date of Filing")
@@ -107,20 +541,53 @@ class PatentFiled(models.Model):
     abstract = models.TextField(null=True, blank=True, verbose_name="Abstract")
     applicant_name = models.TextField(null=True, blank=True, verbose_name="Applicant Name")
     
+    # Truncated copies shown on list/search pages, computed on save
+    inventors_summary = models.CharField(max_length=255, blank=True, default='', editable=False)
+    title_summary = models.CharField(max_length=255, blank=True, default='', editable=False)
+    
+    # Search facets, computed on save
+    filing_year = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    applicant_facet = models.CharField(max_length=100, blank=True, default='', editable=False)
+    # Normalized application number linking filed and granted records (see lifecycle.py)
+    application_key = models.CharField(max_length=50, blank=True, default='', editable=False)
+    # Technology area, assigned on save from the last clustering (see topics.py)
+    topic = models.ForeignKey(
+        Topic, null=True, blank=True, on_delete=models.SET_NULL, related_name='+', db_index=False, editable=False
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'patents_filed'
         ordering = ['-date_of_filing', '-sl_no']
+        indexes = [
+            models.Index(fields=['tenant', 'date_of_filing', 'sl_no'], name='filed_date_idx'),
+            models.Index(fields=['tenant', 'sl_no'], name='filed_sl_no_idx'),
+            models.Index(fields=['tenant', 'title_summary'], name='filed_title_idx'),
+            models.Index(fields=['tenant', 'application_number'], name='filed_app_number_idx'),
+            models.Index(fields=['tenant', 'date_of_publication'], name='filed_publication_idx'),
+            models.Index(fields=['tenant', 'filing_year'], name='filed_year_facet_idx'),
+            models.Index(fields=['tenant', 'applicant_facet'], name='filed_applicant_facet_idx'),
+            models.Index(fields=['tenant', 'application_key'], name='filed_app_key_idx'),
+            models.Index(fields=['tenant', 'topic'], name='filed_topic_idx'),
+            # Keyset pagination of one tenant's rows in pk order (topics.py)
+            models.Index(fields=['tenant', 'id'], name='filed_tenant_pk_idx'),
+        ]
         verbose_name = 'Patent (Filed)'
         verbose_name_plural = 'Patents (Filed)'
     
     def __str__(self):
         return f"{self.date_of_filing} - {self.title[:50] if self.title else 'N/A'}"
+    
+    def save(self, *args, **kwargs):
+        update_record_summaries(self)
+        update_record_facets(self)
+        update_application_key(self)
+        super().save(*args, **kwargs)
 
 
-class PatentGranted(models.Model):
+class PatentGranted(VersionedModel):
     """Model for Granted Patents"""
     sl_no = models.IntegerField(null=True, blank=True, verbose_name="Serial Number")
     granted_patent_no = models.CharField(max_length=100, null=True, blank=True, verbose_name="Granted Patent No.")
@@ -132,14 +599,80 @@ class PatentGranted(models.Model):
     filing_institute = models.TextField(null=True, blank=True, verbose_name="Patent Filing Institute/Individual(s)")
     abstract = models.TextField(null=True, blank=True, verbose_name="Abstract")
     
+    # Truncated copies shown on list/search pages, computed on save
+    inventors_summary = models.CharField(max_length=255, blank=True, default='', editable=False)
+    title_summary = models.CharField(max_length=255, blank=True, default='', editable=False)
+    filing_institute_summary = models.CharField(max_length=255, blank=True, default='', editable=False)
+    
+    # Search facets, computed on save
+    grant_year = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    institute_facet = models.CharField(max_length=100, blank=True, default='', editable=False)
+    # Normalized application number linking filed and granted records (see lifecycle.py)
+    application_key = models.CharField(max_length=50, blank=True, default='', editable=False)
+    # Technology area, assigned on save from the last clustering (see topics.py)
+    topic = models.ForeignKey(
+        Topic, null=True, blank=True, on_delete=models.SET_NULL, related_name='+', db_index=False, editable=False
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'patents_granted'
         ordering = ['-date_of_grant', '-sl_no']
+        indexes = [
+            models.Index(fields=['tenant', 'date_of_grant', 'sl_no'], name='granted_date_idx'),
+            models.Index(fields=['tenant', 'sl_no'], name='granted_sl_no_idx'),
+            models.Index(fields=['tenant', 'granted_patent_no'], name='granted_patent_no_idx'),
+            models.Index(fields=['tenant', 'title_summary'], name='granted_title_idx'),
+            models.Index(fields=['tenant', 'application_number'], name='granted_app_number_idx'),
+            models.Index(fields=['tenant', 'grant_year'], name='granted_year_facet_idx'),
+            models.Index(fields=['tenant', 'institute_facet'], name='granted_institute_facet_idx'),
+            models.Index(fields=['tenant', 'application_key'], name='granted_app_key_idx'),
+            models.Index(fields=['tenant', 'topic'], name='granted_topic_idx'),
+            # Keyset pagination of one tenant's rows in pk order (topics.py)
+            models.Index(fields=['tenant', 'id'], name='granted_tenant_pk_idx'),
+        ]
         verbose_name = 'Patent (Granted)'
         verbose_name_plural = 'Patents (Granted)'
     
     def __str__(self):
         return f"{self.granted_patent_no} - {self.title[:50] if self.title else 'N/A'}"
+    
+    def save(self, *args, **kwargs):
+        update_record_summaries(self)
+        update_record_facets(self)
+        update_application_key(self)
+        super().save(*args, **kwargs)
+
+
+class PatentLifecycle(TenantScopedModel):
+    """Filed and granted records of one application, matched on the normalized application number"""
+    application_key = models.CharField(max_length=50, verbose_name="Application Number")
+    filed = models.ForeignKey(
+        PatentFiled, null=True, blank=True, on_delete=models.SET_NULL, related_name='lifecycle_links'
+    )
+    granted = models.ForeignKey(
+        PatentGranted, null=True, blank=True, on_delete=models.SET_NULL, related_name='lifecycle_links'
+    )
+    filing_date = models.DateField(null=True, blank=True)
+    grant_date = models.DateField(null=True, blank=True)
+    filing_year = models.PositiveSmallIntegerField(null=True, blank=True)
+    days_to_grant = models.PositiveIntegerField(null=True, blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'patent_lifecycle'
+        ordering = ['-filing_year', 'application_key']
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'application_key'], name='lifecycle_tenant_key_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['tenant', 'filing_year', 'days_to_grant'], name='lifecycle_year_idx'),
+        ]
+        verbose_name = 'Patent Lifecycle'
+        verbose_name_plural = 'Patent Lifecycles'
+    
+    def __str__(self):
+        return f"{self.application_key} ({'granted' if self.granted_id else 'filed'})"
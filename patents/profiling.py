@@ -0,0 +1,179 @@
+"""
+Where the time of a page goes: used by the profile_view command and by
+ProfileMiddleware for single production requests.
+
+Three views of the same requests:
+
+- a cProfile dump (``.prof``), readable with pstats, snakeviz or
+  ``flameprof``;
+- stacks of the request thread sampled every SAMPLE_INTERVAL seconds,
+  written in the collapsed format (``.folded``: one ``a;b;c count`` line
+  per distinct stack) that flamegraph.pl, speedscope and inferno read;
+- the SQL statements run, grouped by shape (literals replaced with ``?``)
+  with their count and total time (``-sql.txt``).
+"""
+import cProfile
+import io
+import pstats
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+SAMPLE_INTERVAL = 0.001
+PROFILE_HEADER = 'HTTP_X_PROFILE_TOKEN'
+TOP_STATEMENTS = 20
+
+_literals = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_placeholders = re.compile(r'\?(?:\s*,\s*\?)+')
+
+
+class Sampler:
+    """Sample the stack of one thread (default: the calling one) until stopped"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self._switch_interval = None
+        # Paths are shown relative to the project or the import path entry holding them
+        roots = {Path(settings.BASE_DIR), *(Path(entry) for entry in sys.path if entry)}
+        self._roots = sorted(roots, key=lambda root: len(root.parts), reverse=True)
+        self._names = {}
+
+    def _frame_name(self, code):
+        name = self._names.get(code)
+        if name is None:
+            path = Path(code.co_filename)
+            for root in self._roots:
+                if path.is_relative_to(root):
+                    path = path.relative_to(root)
+                    break
+            name = self._names[code] = f'{code.co_name} ({path.as_posix()}:{code.co_firstlineno})'
+        return name
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(self._frame_name(frame.f_code))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def __enter__(self):
+        # The sampler only runs when the profiled thread hands over the GIL,
+        # by default every 5 ms
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, self.interval))
+        self._thread = threading.Thread(target=self._sample, name='profile-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        sys.setswitchinterval(self._switch_interval)
+
+    @property
+    def samples(self):
+        return sum(self.stacks.values())
+
+    def folded(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def statement_shape(sql):
+    """SQL with literals replaced by ? and IN lists collapsed, to group repeats of a query"""
+    return _placeholders.sub('?, ...', _literals.sub('?', sql))
+
+
+def query_breakdown(queries):
+    """[(shape, count, seconds)] of captured queries, most total time first"""
+    totals = {}
+    for query in queries:
+        shape = statement_shape(query['sql'])
+        count, seconds = totals.get(shape, (0, 0.0))
+        totals[shape] = (count + 1, seconds + float(query['time']))
+    return sorted(((shape, count, seconds) for shape, (count, seconds) in totals.items()), key=lambda item: -item[2])
+
+
+def format_breakdown(breakdown, runs=1, limit=TOP_STATEMENTS):
+    lines = [f'{"calls/run":>9} {"ms/run":>8}  statement']
+    for shape, count, seconds in breakdown[:limit]:
+        lines.append(f'{count / runs:9.1f} {seconds * 1000 / runs:8.2f}  {shape}')
+    return '\n'.join(lines) + '\n'
+
+
+def format_stats(profile, sort='cumulative', limit=30):
+    stream = io.StringIO()
+    pstats.Stats(profile, stream=stream).strip_dirs().sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+class Report:
+    """What one profiled block recorded"""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.sampler = None
+        self.queries = []
+        self.seconds = 0.0
+
+    def write(self, directory, name, runs=1):
+        """Write the .prof, .folded and -sql.txt files; returns their paths"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        paths = [directory / f'{name}.prof', directory / f'{name}.folded', directory / f'{name}-sql.txt']
+        self.profile.dump_stats(paths[0])
+        paths[1].write_text(self.sampler.folded() if self.sampler else '', encoding='utf-8')
+        paths[2].write_text(format_breakdown(query_breakdown(self.queries), runs), encoding='utf-8')
+        return paths
+
+
+@contextmanager
+def profiled(sample=True, instrument=True):
+    """Record the block under cProfile (``instrument``), the sampler (``sample``) and a query log"""
+    report = Report()
+    started = time.perf_counter()
+    with CaptureQueriesContext(connection) as captured:
+        sampler = Sampler() if sample else None
+        if sampler:
+            sampler.__enter__()
+        if instrument:
+            report.profile.enable()
+        try:
+            yield report
+        finally:
+            if instrument:
+                report.profile.disable()
+            if sampler:
+                sampler.__exit__(None, None, None)
+    report.sampler = sampler
+    report.queries = captured.captured_queries
+    report.seconds = time.perf_counter() - started
+
+
+def report_name(label):
+    """File name stem for a profile of ``label`` (a URL path)"""
+    slug = re.sub(r'[^a-z0-9]+', '-', label.lower()).strip('-') or 'home'
+    return f'{time.strftime("%Y%m%d-%H%M%S")}-{slug[:60]}'
+
+
+def requested(request):
+    """Whether a request asks to be profiled with the configured token (never if none is set)"""
+    token = getattr(settings, 'PATENTS_PROFILE_TOKEN', '')
+    sent = request.META.get(PROFILE_HEADER, '')
+    return bool(token) and bool(sent) and secrets.compare_digest(sent.encode(), token.encode())
@@ -0,0 +1,267 @@
+"""
+Optional in-process copy of the record tables for list and search pages.
+
+With PATENTS_READ_STORE on, each institute's copyrights, filed and granted
+patents are held in column tuples: the columns the row templates print,
+lowercased copies of the searched columns, the facet columns and a row
+order per sortable column, all built when the table is loaded. List and
+search pages, the table_rows endpoint and the dashboard then filter, sort,
+count and page in Python, and build row objects only for the rows they
+render. IP items are still read from the database.
+
+Searched columns are lowercased the way SQLite's LIKE compares (ASCII
+letters only), so a substring test gives the same rows as icontains.
+
+A table is current while the institute's change log head and the store's
+version token are unchanged; every request checks both (one indexed query
+and one cache read). When the head moves, a table is reloaded only if the
+change log has new entries for it (filed patents also reload when granted
+ones change, for the status facet). Writes that bypass the change log -
+topic clustering, backfill_summaries, rebuild_lifecycle and restore_db -
+call invalidate().
+
+gunicorn loads every table in the master during warm-up (warmup.py), so
+workers are forked with the store filled and share it copy-on-write until
+a table changes.
+"""
+import threading
+import uuid
+from array import array
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import changelog
+from .facets import facet_results
+from .models import ChangeLogEntry, Tenant
+from .tenants import get_current_tenant
+
+
+VERSION_KEY = 'patents:readstore:version:{}'
+LOAD_CHUNK_SIZE = 2000
+# stored table -> change log tables its columns are read from
+DEPENDENCIES = {
+    'filed': ('filed', 'granted'),
+}
+
+_ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+# (tenant id, change log table) -> StoredTable
+_tables = {}
+_lock = threading.Lock()
+
+
+def enabled():
+    return getattr(settings, 'PATENTS_READ_STORE', False)
+
+
+def ascii_lower(text):
+    """Lowercase ASCII letters only, as SQLite's LIKE compares"""
+    return text.translate(_ASCII_LOWER)
+
+
+def sqlite_sort_key(value):
+    """
+    Key ordering values as SQLite's ORDER BY does: NULL first, then numbers,
+    text (compared by code point, as the BINARY collation compares UTF-8)
+    and blobs. Descending sorts reverse the whole key, so NULLs come last.
+    """
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, bytes(value))
+
+
+def invalidate(tenant_id=None):
+    """Reload the stored tables of an institute (None: of every institute) on their next use"""
+    tenant_ids = [tenant_id] if tenant_id is not None else Tenant.objects.values_list('pk', flat=True)
+    for pk in tenant_ids:
+        cache.set(VERSION_KEY.format(pk), uuid.uuid4().hex, None)
+
+
+def _current_version(tenant_id):
+    key = VERSION_KEY.format(tenant_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+class StoredTable:
+    """One institute's copy of a record table, rows in the model's default order"""
+
+    __slots__ = ('spec', 'version', 'head', 'row_type', 'pks', 'columns', 'search', 'facets', 'sort_values', 'orders')
+
+    def __init__(self, spec, tenant_id, version, head):
+        self.spec = spec
+        self.version = version
+        self.head = head
+        model = spec.model
+        search_columns = {param: lookup.split('__', 1)[0] for param, lookup in spec.search_fields.items()}
+        facet_columns = [facet.column for facet in spec.facets]
+        names = list(dict.fromkeys([
+            *spec.list_fields, *search_columns.values(), *facet_columns, *spec.sort_fields.values(),
+        ]))
+
+        queryset = model.objects.unscoped().filter(tenant_id=tenant_id)
+        for facet in spec.facets:
+            queryset = facet.annotate(queryset)
+        rows = (
+            queryset.order_by(*model._meta.ordering, 'pk')
+            .values_list('pk', *names).iterator(chunk_size=LOAD_CHUNK_SIZE)
+        )
+        loaded = list(zip(*rows)) or [()] * (len(names) + 1)
+        self.pks = array('q', loaded[0])
+        column = dict(zip(names, loaded[1:]))
+
+        self.row_type = namedtuple(f'{model.__name__}Row', ['pk', *spec.list_fields])
+        self.columns = [column[name] for name in spec.list_fields]
+        self.search = {
+            param: tuple(ascii_lower(str(value)) if value is not None else None for value in column[name])
+            for param, name in search_columns.items()
+        }
+        self.facets = {name: column[name] for name in facet_columns}
+        # (column, descending) -> row indexes; ascending ones are built here, descending on first use
+        self.sort_values = {name: column[name] for name in spec.sort_fields.values()}
+        self.orders = {}
+        for name in spec.sort_fields.values():
+            self.order(name, False)
+
+    def __len__(self):
+        return len(self.pks)
+
+    def order(self, name, descending):
+        """
+        Row indexes sorted as ORDER BY the column then pk, both ascending or
+        both descending, as TableSpec.order asks the database
+        """
+        order = self.orders.get((name, descending))
+        if order is None:
+            values, pks = self.sort_values[name], self.pks
+            order = self.orders[(name, descending)] = array('l', sorted(
+                range(len(pks)), key=lambda i: (sqlite_sort_key(values[i]), pks[i]), reverse=descending,
+            ))
+        return order
+
+    def row(self, index):
+        return self.row_type(self.pks[index], *[column[index] for column in self.columns])
+
+    def select(self, indexes, params):
+        """The indexes matching the search form parameters and selected facets"""
+        for param in self.spec.search_fields:
+            value = params.get(param, '').strip()
+            if value:
+                needle, column = ascii_lower(value), self.search[param]
+                indexes = [i for i in indexes if column[i] is not None and needle in column[i]]
+        for facet in self.spec.facets:
+            raw = params.get(facet.param, '').strip()
+            value = facet.from_param(raw) if raw else None
+            if value is not None:
+                token, column = facet.to_param(value), self.facets[facet.column]
+                indexes = [i for i in indexes if column[i] is not None and facet.to_param(column[i]) == token]
+        return indexes
+
+
+class StoredRows:
+    """
+    Rows of a StoredTable standing in for the table's queryset: sliced,
+    counted and iterated the same way, and filtered, ordered and
+    facet-counted through TableSpec.
+    """
+
+    __slots__ = ('table', 'indexes')
+
+    def __init__(self, table, indexes):
+        self.table = table
+        self.indexes = indexes
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.table.row(i) for i in self.indexes[key]]
+        return self.table.row(self.indexes[key])
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def __iter__(self):
+        return self.iterator()
+
+    def count(self):
+        return len(self.indexes)
+
+    def iterator(self, chunk_size=None):
+        return (self.table.row(i) for i in self.indexes)
+
+    def search(self, params):
+        return StoredRows(self.table, self.table.select(self.indexes, params))
+
+    def ordered(self, column, descending):
+        order = self.table.order(column, descending)
+        if len(self.indexes) < len(self.table):
+            selected = set(self.indexes)
+            order = [i for i in order if i in selected]
+        return StoredRows(self.table, order)
+
+    def facet_counts(self, params):
+        """(facets, total) as facets.facet_counts gives for the same rows"""
+        facets = self.table.spec.facets
+        totals = []
+        for facet in facets:
+            column, counts = self.table.facets[facet.column], {}
+            for i in self.indexes:
+                value = column[i]
+                if value not in (None, ''):
+                    counts[value] = counts.get(value, 0) + 1
+            totals.append(counts)
+        return facet_results(facets, totals, params), len(self.indexes)
+
+
+def _changed(tenant_id, name, since, head):
+    tables = DEPENDENCIES.get(name, (name,))
+    entries = ChangeLogEntry.objects.filter(tenant_id=tenant_id, seq__gt=since, seq__lte=head, table__in=tables)
+    return entries.exists()
+
+
+def stored_table(spec, tenant_id):
+    """An institute's current StoredTable of a table, loaded or reloaded if needed"""
+    name = changelog.TRACKED_MODELS[spec.model]
+    version = _current_version(tenant_id)
+    # Read before the rows, so rows written meanwhile cause a reload rather than being missed
+    head = changelog.head(tenant_id)
+    table = _tables.get((tenant_id, name))
+    if table is not None and table.version == version:
+        if table.head == head:
+            return table
+        if not _changed(tenant_id, name, table.head, head):
+            table.head = head
+            return table
+    table = StoredTable(spec, tenant_id, version, head)
+    with _lock:
+        _tables[(tenant_id, name)] = table
+    return table
+
+
+def rows(spec):
+    """StoredRows of a table for the active institute; None when the store is off or no institute is active"""
+    if not enabled():
+        return None
+    tenant = get_current_tenant()
+    if tenant is None:
+        return None
+    table = stored_table(spec, tenant.pk)
+    return StoredRows(table, range(len(table)))
+
+
+def load_all(specs):
+    """Load every active institute's tables; returns the number loaded"""
+    loaded = 0
+    for tenant_id in Tenant.objects.filter(is_active=True).values_list('pk', flat=True):
+        for spec in specs:
+            stored_table(spec, tenant_id)
+            loaded += 1
+    return loaded
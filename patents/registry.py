@@ -0,0 +1,67 @@
+"""
+In-process cache of IP categories, keyed by slug.
+
+Every dynamic IP page needs its category (including field_definitions)
+before it can do anything else. Categories change rarely, so each worker
+keeps them in memory and only re-reads one when the shared version token
+in Django's cache changes. Each tenant has its own token, replaced whenever
+one of its categories is saved or deleted (see signals.py), which
+invalidates that tenant's categories in every worker at once.
+"""
+import threading
+import uuid
+
+from django.core.cache import cache
+from django.http import Http404
+
+from .models import IPCategory
+from .tenants import get_current_tenant
+
+
+VERSION_KEY = 'patents:category_registry_version:{}'
+
+# (tenant id, slug) -> (version, category)
+_categories = {}
+_lock = threading.Lock()
+
+
+def current_version(tenant_id):
+    """Shared version token of a tenant; a lost cache entry simply starts a new version"""
+    key = VERSION_KEY.format(tenant_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate(tenant_id):
+    """Make every worker reload the tenant's categories on their next lookup"""
+    cache.set(VERSION_KEY.format(tenant_id), uuid.uuid4().hex, None)
+
+
+def get_category(slug):
+    """Return the active tenant's category for a slug, raising IPCategory.DoesNotExist"""
+    tenant = get_current_tenant()
+    if tenant is None:
+        return IPCategory.objects.get(slug=slug)
+    tenant_id = tenant.pk
+    version = current_version(tenant_id)
+    entry = _categories.get((tenant_id, slug))
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    category = IPCategory.objects.get(slug=slug)
+    with _lock:
+        stale = [key for key, (v, _) in _categories.items() if key[0] == tenant_id and v != version]
+        for key in stale:
+            del _categories[key]
+        _categories[(tenant_id, slug)] = (version, category)
+    return category
+
+
+def get_category_or_404(slug):
+    try:
+        return get_category(slug)
+    except IPCategory.DoesNotExist:
+        raise Http404('No IP category matches the given query.')
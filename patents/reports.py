@@ -0,0 +1,71 @@
+"""
+Aggregate reports over the analytics snapshot (analytics.py).
+
+Every report is a vectorized group-by over memory-mapped Arrow columns:
+no rows are fetched from the database and no model instances are built,
+so the cost grows with the number of groups rather than the number of
+records. Results are plain lists of dicts for the templates.
+"""
+import pyarrow.compute as pc
+
+
+def _counts(table, column):
+    """{value: rows} of one column, nulls included under None"""
+    grouped = table.group_by(column).aggregate([([], 'count_all')])
+    return dict(zip(grouped[column].to_pylist(), grouped['count_all'].to_pylist()))
+
+
+def _year(value):
+    """Leading four-digit year of a copyright's free-text year, or None"""
+    value = (value or '').strip()[:4]
+    return int(value) if value.isdigit() else None
+
+
+def records_per_year(snapshot):
+    """Copyrights, filed and granted patents per year, newest first"""
+    years = {}
+    copyrights = _counts(snapshot.table('copyrights', ['year']), 'year')
+    for value, rows in copyrights.items():
+        year = years.setdefault(_year(value), {'copyrights': 0, 'filed': 0, 'granted': 0})
+        year['copyrights'] += rows
+    for name, column in (('filed', 'filing_year'), ('granted', 'grant_year')):
+        for value, rows in _counts(snapshot.table(name, [column]), column).items():
+            years.setdefault(value, {'copyrights': 0, 'filed': 0, 'granted': 0})[name] = rows
+    return [
+        {'year': year, **counts}
+        for year, counts in sorted(years.items(), key=lambda item: (item[0] is None, -(item[0] or 0)))
+    ]
+
+
+def top_values(snapshot, table, column, limit=10):
+    """Most frequent non-blank values of a column as [{'value', 'records'}]"""
+    values = snapshot.table(table, [column]).column(column)
+    values = values.filter(pc.invert(pc.equal(pc.fill_null(values, ''), '')))
+    counts = pc.value_counts(values)
+    if not len(counts):
+        return []
+    top = counts.take(pc.array_sort_indices(counts.field('counts'), order='descending')[:limit])
+    return [{'value': row['values'], 'records': row['counts']} for row in top.to_pylist()]
+
+
+def topic_counts(snapshot):
+    """Filed and granted patents per topic, largest first"""
+    topics = snapshot.table('topics', ['id', 'label'])
+    labels = dict(zip(topics.column('id').to_pylist(), topics.column('label').to_pylist()))
+    filed = _counts(snapshot.table('filed', ['topic_id']), 'topic_id')
+    granted = _counts(snapshot.table('granted', ['topic_id']), 'topic_id')
+    topics = [
+        {
+            'label': labels.get(topic_id, 'Unclustered') if topic_id is not None else 'Unclustered',
+            'filed': filed.get(topic_id, 0),
+            'granted': granted.get(topic_id, 0),
+        }
+        for topic_id in set(filed) | set(granted)
+    ]
+    return sorted(topics, key=lambda topic: -(topic['filed'] + topic['granted']))
+
+
+def ip_counts(snapshot):
+    """Items per IP category"""
+    tables = snapshot.manifest['tables']
+    return [{'category': name, 'items': tables[table]} for table, name in snapshot.categories.items()]
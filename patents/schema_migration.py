@@ -0,0 +1,212 @@
+"""
+Rewrite of IntellectualProperty.data after a category edit.
+
+Removes and renames are done with one UPDATE per operation using the
+database's JSON functions where available. Retypes need Python coercion
+and are applied in chunks with bulk_update. Migrations are run by the
+``category_schema_migration`` background task, never inside a request.
+
+Each migration is claimed with a conditional UPDATE before it runs, which
+fails while another migration of the same category is running or an older
+one is still pending or failed. Workers and ``migrate_category_data`` runs
+in other processes therefore never apply a migration twice, nor a category's
+migrations out of order: a failed migration holds back the later edits of
+its category until it is retried. A running migration touches ``updated_at``
+after every chunk; only one that has not done so for RUNNING_LEASE seconds
+is taken to be interrupted and can be re-queued.
+"""
+import logging
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from . import history
+from .changelog import record_queryset
+from .ip_schema import apply_operations
+from .models import CategorySchemaMigration, IntellectualProperty
+from .tenants import tenant_context
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+# Seconds without progress before a running migration counts as interrupted
+RUNNING_LEASE = 600
+
+
+def _json_path(name):
+    return f'$."{name}"'
+
+
+def _can_use_sql(operations):
+    """Only plain field names and non-overlapping renames go through SQL"""
+    if connection.vendor == 'sqlite':
+        if connection.Database.sqlite_version_info < (3, 38):
+            return False
+    elif connection.vendor != 'postgresql':
+        return False
+
+    names = [op['field'] for op in operations] + [op['to'] for op in operations if op['op'] == 'rename']
+    if any('"' in name or '\\' in name for name in names):
+        return False
+    sources = {op['field'] for op in operations if op['op'] == 'rename'}
+    targets = {op['to'] for op in operations if op['op'] == 'rename'}
+    return not (sources & targets)
+
+
+def _sql_for(op, column):
+    """Return (sql, params) for a remove/rename operation on a JSON column, without the category filter"""
+    table = IntellectualProperty._meta.db_table
+    if connection.vendor == 'sqlite':
+        path = _json_path(op['field'])
+        if op['op'] == 'remove':
+            return (
+                f'UPDATE {table} SET {column} = json_remove({column}, %s) '
+                f'WHERE category_id = %s AND json_type({column}, %s) IS NOT NULL',
+                [path],
+            )
+        return (
+            f'UPDATE {table} SET {column} = json_set(json_remove({column}, %s), %s, {column} -> %s) '
+            f'WHERE category_id = %s AND json_type({column}, %s) IS NOT NULL',
+            [path, _json_path(op['to']), path],
+        )
+
+    if op['op'] == 'remove':
+        return (
+            f'UPDATE {table} SET {column} = {column} - %s '
+            f'WHERE category_id = %s AND jsonb_exists({column}, %s)',
+            [op['field']],
+        )
+    return (
+        f'UPDATE {table} SET {column} = ({column} - %s) || jsonb_build_object(%s, {column} -> %s) '
+        f'WHERE category_id = %s AND jsonb_exists({column}, %s)',
+        [op['field'], op['to'], op['field']],
+    )
+
+
+def _apply_sql(migration, operations):
+    """Apply the operations to data and to the data_summary copy of it"""
+    with transaction.atomic(), connection.cursor() as cursor:
+        for column in ('data', 'data_summary'):
+            for op in operations:
+                sql, params = _sql_for(op, column)
+                cursor.execute(sql, params + [migration.category_id, params[-1]])
+
+
+def _apply_chunked(migration, operations, progress=None, refresh_summaries=False):
+    """
+    Rewrite items in primary key order, CHUNK_SIZE rows at a time.
+    With ``refresh_summaries`` every item's display columns are recomputed,
+    even when its data does not change.
+    """
+    items = IntellectualProperty.objects.filter(category_id=migration.category_id).order_by('pk')
+    last_pk = 0
+    processed = 0
+    while True:
+        chunk = list(items.filter(pk__gt=last_pk).only('pk', 'data')[:CHUNK_SIZE])
+        if not chunk:
+            break
+
+        changed = []
+        for item in chunk:
+            data = apply_operations(item.data or {}, operations, migration.field_definitions)
+            if data != item.data or refresh_summaries:
+                item.data = data
+                item.update_summaries(migration.field_definitions)
+                changed.append(item)
+        if changed:
+            with transaction.atomic():
+                IntellectualProperty.objects.bulk_update(changed, ['data', 'display_title', 'data_summary'])
+
+        last_pk = chunk[-1].pk
+        processed += len(chunk)
+        CategorySchemaMigration.objects.filter(pk=migration.pk).update(
+            processed_items=processed, updated_at=timezone.now(),
+        )
+        if progress:
+            progress(processed, migration.total_items)
+
+
+def apply_migration(migration, progress=None):
+    """
+    Apply one schema migration, recording progress and failures on the row.
+    ``progress(done, total)`` is called after every chunk.
+    """
+    operations = migration.operations
+    migration.status = 'running'
+    migration.processed_items = 0
+    migration.total_items = IntellectualProperty.objects.filter(category_id=migration.category_id).count()
+    migration.save(update_fields=['status', 'processed_items', 'total_items', 'updated_at'])
+
+    try:
+        # Items saved before history was kept keep their values from before the rewrite
+        history.record_baseline(IntellectualProperty.objects.filter(category_id=migration.category_id))
+        refresh_summaries = False
+        if _can_use_sql(operations):
+            _apply_sql(migration, [op for op in operations if op['op'] != 'retype'])
+            # A removed field may have been the source of an item's display title
+            refresh_summaries = any(op['op'] == 'remove' for op in operations)
+            operations = [op for op in operations if op['op'] == 'retype']
+        if operations or refresh_summaries:
+            _apply_chunked(migration, operations, progress, refresh_summaries)
+        # Every item's data may have changed; let sync consumers re-read them
+        record_queryset(IntellectualProperty.objects.filter(category_id=migration.category_id))
+        history.record_queryset(IntellectualProperty.objects.filter(category_id=migration.category_id))
+    except Exception as e:
+        logger.exception('Schema migration %s failed', migration.pk)
+        migration.status = 'failed'
+        migration.error = str(e)
+        migration.save(update_fields=['status', 'error', 'updated_at'])
+        return migration
+
+    migration.status = 'done'
+    migration.processed_items = migration.total_items
+    migration.error = None
+    migration.save(update_fields=['status', 'processed_items', 'error', 'updated_at'])
+    return migration
+
+
+def _claim(migration):
+    """
+    Mark a pending migration running, unless another process may be applying
+    its category or an older one of the category has not been applied
+    """
+    same_category = CategorySchemaMigration.objects.filter(category_id=OuterRef('category_id'))
+    return CategorySchemaMigration.objects.filter(pk=migration.pk, status='pending').filter(
+        ~Exists(same_category.filter(status='running')),
+        ~Exists(same_category.filter(status__in=['pending', 'failed'], pk__lt=OuterRef('pk'))),
+    ).update(status='running', updated_at=timezone.now())
+
+
+def requeue(lease=RUNNING_LEASE):
+    """
+    Put failed migrations and running ones without progress for ``lease``
+    seconds back in the queue; returns how many were re-queued.
+    """
+    cutoff = timezone.now() - timedelta(seconds=lease)
+    return CategorySchemaMigration.objects.filter(
+        Q(status='failed') | Q(status='running', updated_at__lt=cutoff)
+    ).update(status='pending', error=None, updated_at=timezone.now())
+
+
+def run_pending_migrations(progress=None):
+    """
+    Apply pending migrations oldest first, so successive edits stay in order.
+    Pending rows are read again until none can be claimed, which picks up
+    edits made while earlier migrations ran.
+    """
+    applied = []
+    pending = CategorySchemaMigration.objects.filter(status='pending').select_related('category__tenant')
+    while True:
+        ran = False
+        for migration in pending.order_by('pk'):
+            if not _claim(migration):
+                continue
+            # The queue is shared by all tenants; run each in its category's scope
+            with tenant_context(migration.category.tenant):
+                applied.append(apply_migration(migration, progress))
+            ran = True
+        if not ran:
+            return applied
@@ -0,0 +1,133 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import alerts, changelog, history, lifecycle, registry, similarity, suggest, tenants, topics
+from .models import Copyright, IPCategory, PatentFiled, PatentGranted, PatentLifecycle, SavedSearchKey, Tenant
+from .tasks import queue_similarity_rebuild
+
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+def invalidate_tenant_hosts(sender, **kwargs):
+    # After the commit, or another worker could cache the old row under the new token
+    transaction.on_commit(tenants.invalidate)
+
+
+@receiver(post_save, sender=IPCategory)
+@receiver(post_delete, sender=IPCategory)
+def invalidate_category_registry(sender, instance, **kwargs):
+    tenant_id = instance.tenant_id
+    transaction.on_commit(lambda: registry.invalidate(tenant_id))
+
+
+def remember_stored_version(sender, instance, **kwargs):
+    history.remember_stored(instance)
+
+
+# Connected first: it loads the stored row the other pre_save signals read
+for model in history.TRACKED_MODELS:
+    pre_save.connect(remember_stored_version, sender=model, dispatch_uid=f'history_stored_{model.__name__}')
+
+
+@receiver(post_save, sender=SavedSearchKey)
+@receiver(post_delete, sender=SavedSearchKey)
+def invalidate_saved_search_fields(sender, instance, **kwargs):
+    tenant_id = instance.tenant_id
+    transaction.on_commit(lambda: alerts.invalidate(tenant_id))
+
+
+@receiver(pre_save, sender=Copyright)
+@receiver(pre_save, sender=PatentFiled)
+@receiver(pre_save, sender=PatentGranted)
+def remember_previous_values(sender, instance, **kwargs):
+    # Suggestion terms and application key of the stored row, so post_save
+    # can update only what changed
+    scope, fields = suggest.scope_for_model(sender)
+    old = instance._stored_row
+    instance._suggest_old_terms = suggest.row_terms(old, fields) if old else {}
+    instance._old_application_key = old.get('application_key', '') if old else ''
+
+
+@receiver(pre_save, sender=PatentFiled)
+@receiver(pre_save, sender=PatentGranted)
+def assign_topic(sender, instance, **kwargs):
+    # Nearest topic of the last clustering; the corpus is re-clustered only by cluster_topics
+    instance.topic_id = topics.assign(instance)
+
+
+@receiver(post_save, sender=Copyright)
+@receiver(post_save, sender=PatentFiled)
+@receiver(post_save, sender=PatentGranted)
+def update_suggest_terms(sender, instance, **kwargs):
+    scope, fields = suggest.scope_for_model(sender)
+    old_terms = getattr(instance, '_suggest_old_terms', {})
+    new_terms = suggest.record_terms(instance, fields)
+    suggest.apply_changes(
+        instance.tenant_id,
+        scope,
+        added={key: display for key, display in new_terms.items() if key not in old_terms},
+        removed={key: display for key, display in old_terms.items() if key not in new_terms},
+    )
+
+
+@receiver(post_delete, sender=Copyright)
+@receiver(post_delete, sender=PatentFiled)
+@receiver(post_delete, sender=PatentGranted)
+def remove_suggest_terms(sender, instance, **kwargs):
+    scope, fields = suggest.scope_for_model(sender)
+    suggest.apply_changes(instance.tenant_id, scope, added={}, removed=suggest.record_terms(instance, fields))
+
+
+@receiver(post_save, sender=PatentFiled)
+@receiver(post_save, sender=PatentGranted)
+@receiver(post_delete, sender=PatentFiled)
+@receiver(post_delete, sender=PatentGranted)
+def refresh_lifecycle_links(sender, instance, **kwargs):
+    if kwargs.get('created') is False and not lifecycle.link_inputs_changed(instance, instance._stored_row):
+        return
+    keys = {instance.application_key, getattr(instance, '_old_application_key', '')}
+    lifecycle.refresh_links(instance.tenant_id, keys, PatentFiled, PatentGranted, PatentLifecycle)
+
+
+@receiver(post_save, sender=Copyright)
+@receiver(post_save, sender=PatentFiled)
+@receiver(post_save, sender=PatentGranted)
+@receiver(post_delete, sender=Copyright)
+@receiver(post_delete, sender=PatentFiled)
+@receiver(post_delete, sender=PatentGranted)
+def update_similarity_index(sender, instance, **kwargs):
+    similarity.record_changed(instance, deleted='created' not in kwargs)
+    queue_similarity_rebuild(instance.tenant_id)
+
+
+@receiver(post_save, sender=PatentFiled)
+@receiver(post_save, sender=PatentGranted)
+def match_saved_searches(sender, instance, created, **kwargs):
+    alerts.percolate(alerts.scope_for_model(sender), instance, created)
+
+
+def log_saved(sender, instance, **kwargs):
+    changelog.record_change(instance, 'upsert')
+
+
+def log_deleted(sender, instance, **kwargs):
+    changelog.record_change(instance, 'delete')
+
+
+for model in changelog.TRACKED_MODELS:
+    post_save.connect(log_saved, sender=model, dispatch_uid=f'changelog_save_{model.__name__}')
+    post_delete.connect(log_deleted, sender=model, dispatch_uid=f'changelog_delete_{model.__name__}')
+
+
+def add_version(sender, instance, **kwargs):
+    history.record_saved(instance)
+
+
+def add_deleted_version(sender, instance, **kwargs):
+    history.record_deleted(instance)
+
+
+for model in history.TRACKED_MODELS:
+    post_save.connect(add_version, sender=model, dispatch_uid=f'history_save_{model.__name__}')
+    post_delete.connect(add_deleted_version, sender=model, dispatch_uid=f'history_delete_{model.__name__}')
@@ -0,0 +1,408 @@
+"""
+"More like this" lookups over copyrights and filed/granted patents.
+
+``manage.py rebuild_similarity_index`` builds one TF-IDF index per tenant
+from the title (counted twice) and abstract of every record: sublinear term
+frequencies times smoothed IDF, each document L2-normalized. The matrix is
+stored column-major (term -> postings) as plain .npy arrays, which every
+worker memory-maps, so the index is shared through the page cache rather
+than loaded per process. A lookup vectorizes the source record with the
+stored vocabulary, keeps its strongest QUERY_TERMS terms (skipping terms
+common to much of the corpus) and adds up their postings, so a lookup
+touches only the documents sharing a distinctive term with the record.
+
+Saves and deletes between rebuilds are written to SimilarityDelta as raw
+term counts (signals.py), and once there are many of them a rebuild is
+queued for the background worker; the deltas are counted only on every
+REBUILD_CHECK_EVERY-th save (tallied in the cache), not on each one. A
+loaded index remembers the change log sequence number it has seen;
+before a lookup it compares it with the tenant's change log head and
+reads only the deltas of records logged since, so a save costs other
+workers one small query rather than a reload.
+Deltas are kept as one sparse matrix scored with a single product, and
+their stale rows in the base index are masked. Each build is written to
+a new generation directory and published by replacing the CURRENT file,
+so readers never see a half-written index; a rebuild changes the version
+token, which makes workers load the new generation.
+"""
+import json
+import math
+import re
+import threading
+import uuid
+from array import array
+from collections import Counter
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from scipy import sparse
+
+from . import changelog
+from .generations import current_generation, new_generation, publish, store_dir
+from .models import ChangeLogEntry, Copyright, PatentFiled, PatentGranted, SimilarityDelta
+
+
+# scope -> (model, text fields); the first field is the title
+SOURCES = {
+    'copyrights': (Copyright, ['title']),
+    'filed': (PatentFiled, ['title', 'abstract']),
+    'granted': (PatentGranted, ['title', 'abstract']),
+}
+SCOPE_CODES = {scope: code for code, scope in enumerate(SOURCES)}
+TITLE_WEIGHT = 2
+
+# Documents are keyed scope code * KEY_BASE + pk, stored sorted
+KEY_BASE = 2 ** 40
+MAX_TERMS = 200000
+QUERY_TERMS = 50
+MAX_RESULTS = 50
+# Query terms found in more than this share of the documents are skipped
+COMMON_TERM_SHARE = 0.05
+MIN_COMMON_POSTINGS = 1000
+DEFAULT_RESULTS = 10
+# Queue a rebuild when deltas reach this share of the indexed documents
+REBUILD_RATIO = 0.1
+MIN_REBUILD_DELTAS = 500
+# Saves of a tenant between two counts of its deltas
+REBUILD_CHECK_EVERY = 100
+
+VERSION_KEY = 'patents:similarity_version:{}'
+SAVES_KEY = 'patents:similarity_saves:{}'
+
+STOP_WORDS = frozenset('''
+a an and are as at be based by for from has in into is it its of on or over that the their this to using via
+which with within without system method apparatus device thereof wherein said same one least first second
+plurality comprising comprises present invention provides disclosed also may can such other used use process
+'''.split())
+
+_token = re.compile(r'[a-z0-9]{2,}')
+_indexes = {}
+_lock = threading.Lock()
+
+
+def tokenize(text):
+    return [t for t in _token.findall((text or '').lower()) if t not in STOP_WORDS and not t.isdigit()]
+
+
+def text_counts(title, *texts):
+    """Term frequencies of a title (counted TITLE_WEIGHT times) and further text"""
+    counts = Counter(tokenize(title))
+    for term in counts:
+        counts[term] *= TITLE_WEIGHT
+    for text in texts:
+        counts.update(tokenize(text))
+    return counts
+
+
+def term_counts(record, fields):
+    """Term frequencies of a record; the first field is its title"""
+    return text_counts(*(getattr(record, field) for field in fields))
+
+
+def doc_key(scope, pk):
+    return SCOPE_CODES[scope] * KEY_BASE + pk
+
+
+def split_key(key):
+    code, pk = divmod(int(key), KEY_BASE)
+    return list(SOURCES)[code], pk
+
+
+# ===== BUILDING =====
+
+def build_index(tenant, progress=None):
+    """Write a new index generation for a tenant and publish it; returns the document count"""
+    vocabulary = {}
+    keys = array('q')
+    indptr = array('q', [0])
+    indices = array('i')
+    counts = array('f')
+
+    for scope, (model, fields) in SOURCES.items():
+        records = model.objects.unscoped().filter(tenant=tenant).order_by('pk').only('pk', *fields)
+        for record in records.iterator(chunk_size=2000):
+            terms = term_counts(record, fields)
+            if not terms:
+                continue
+            for term, count in terms.items():
+                indices.append(vocabulary.setdefault(term, len(vocabulary)))
+                counts.append(count)
+            indptr.append(len(indices))
+            keys.append(doc_key(scope, record.pk))
+            if progress and len(keys) % 10000 == 0:
+                progress(len(keys))
+
+    documents = len(keys)
+    matrix = sparse.csr_matrix(
+        (np.frombuffer(counts, dtype=np.float32), np.frombuffer(indices, dtype=np.int32),
+         np.frombuffer(indptr, dtype=np.int64)),
+        shape=(documents, len(vocabulary)),
+    )
+    terms = np.array(sorted(vocabulary, key=vocabulary.get), dtype=object)
+
+    # Drop terms seen in a single document of a large corpus, then cap the vocabulary by frequency
+    df = np.bincount(matrix.indices, minlength=len(vocabulary))
+    keep = df >= (2 if documents > 1000 else 1)
+    if keep.sum() > MAX_TERMS:
+        keep &= df >= np.sort(df[keep])[-MAX_TERMS]
+    matrix = matrix[:, keep]
+    terms = terms[keep]
+    df = df[keep]
+
+    idf = (np.log((1 + documents) / (1 + df)) + 1).astype(np.float32)
+    matrix.data = (1 + np.log(matrix.data)).astype(np.float32)
+    matrix = matrix.multiply(idf).tocsr()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    matrix = sparse.csr_matrix(sparse.diags(1 / norms) @ matrix, dtype=np.float32)
+    postings = matrix.tocsc()
+    postings.sort_indices()
+
+    directory = new_generation(store_dir(tenant.pk, 'similarity'))
+    np.save(directory / 'keys.npy', np.frombuffer(keys, dtype=np.int64))
+    np.save(directory / 'indptr.npy', postings.indptr.astype(np.int64))
+    np.save(directory / 'indices.npy', postings.indices.astype(np.int32))
+    np.save(directory / 'data.npy', postings.data.astype(np.float32))
+    np.save(directory / 'idf.npy', idf)
+    (directory / 'terms.json').write_text(json.dumps(terms.tolist()), encoding='utf-8')
+    (directory / 'manifest.json').write_text(json.dumps({
+        'documents': documents, 'terms': len(terms), 'built_at': timezone.now().isoformat(),
+    }), encoding='utf-8')
+
+    publish(directory)
+    return documents
+
+
+def rebuild(tenant, progress=None):
+    """Rebuild a tenant's index and clear the deltas it now contains"""
+    # Deltas written while the index builds are newer than it and are kept
+    started = timezone.now()
+    documents = build_index(tenant, progress)
+    SimilarityDelta.objects.unscoped().filter(tenant=tenant, created_at__lt=started).delete()
+    invalidate(tenant.pk)
+    return documents
+
+
+# ===== INCREMENTAL UPDATES =====
+
+def scope_for_model(model):
+    for scope, (source_model, fields) in SOURCES.items():
+        if source_model is model:
+            return scope, fields
+    return None, []
+
+
+def record_changed(instance, deleted=False):
+    """Remember a saved or deleted record until the next rebuild"""
+    scope, fields = scope_for_model(instance.__class__)
+    counts = None if deleted else dict(term_counts(instance, fields))
+    # One upsert; created_at moves forward so a rebuild already running keeps the delta
+    SimilarityDelta.objects.unscoped().bulk_create(
+        [SimilarityDelta(tenant_id=instance.tenant_id, scope=scope, object_id=instance.pk, terms=counts)],
+        update_conflicts=True, unique_fields=['tenant', 'scope', 'object_id'], update_fields=['terms', 'created_at'],
+    )
+
+
+def indexed_documents(tenant_id):
+    """Documents in the tenant's current index (0 if it has none)"""
+    directory = current_generation(store_dir(tenant_id, 'similarity'))
+    if directory is None:
+        return 0
+    return json.loads((directory / 'manifest.json').read_text(encoding='utf-8'))['documents']
+
+
+def rebuild_check_due(tenant_id):
+    """True on every REBUILD_CHECK_EVERY-th save of a tenant"""
+    key = SAVES_KEY.format(tenant_id)
+    cache.add(key, 0, None)
+    try:
+        saves = cache.incr(key)
+    except ValueError:
+        # Evicted since the add
+        return True
+    return saves % REBUILD_CHECK_EVERY == 0
+
+
+def needs_rebuild(tenant_id):
+    """True once the deltas are a large share of the index"""
+    deltas = SimilarityDelta.objects.unscoped().filter(tenant_id=tenant_id).count()
+    return deltas >= max(MIN_REBUILD_DELTAS, indexed_documents(tenant_id) * REBUILD_RATIO)
+
+
+def invalidate(tenant_id):
+    cache.set(VERSION_KEY.format(tenant_id), uuid.uuid4().hex, None)
+
+
+def _current_version(tenant_id):
+    key = VERSION_KEY.format(tenant_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+# ===== LOOKUPS =====
+
+class Index:
+    """One memory-mapped index generation plus the tenant's pending deltas"""
+
+    def __init__(self, directory, tenant_id):
+        load = lambda name: np.load(directory / f'{name}.npy', mmap_mode='r')
+        self.tenant_id = tenant_id
+        self.keys = load('keys')
+        self.indptr = load('indptr')
+        self.indices = load('indices')
+        self.data = load('data')
+        self.idf = load('idf')
+        terms = json.loads((directory / 'terms.json').read_text(encoding='utf-8'))
+        self.vocabulary = {term: i for i, term in enumerate(terms)}
+
+        # Change log head the deltas are current to; read first, so later saves are caught up
+        self.seq = changelog.head(tenant_id)
+        self.vectors = {}
+        self.stale_keys = set()
+        self._set_deltas(SimilarityDelta.objects.unscoped().filter(tenant_id=tenant_id))
+
+    def _set_deltas(self, deltas):
+        """Apply delta rows: base rows they supersede are masked, their vectors replace earlier ones"""
+        for delta in deltas:
+            key = doc_key(delta.scope, delta.object_id)
+            self.stale_keys.add(key)
+            vector = self.vectorize(delta.terms) if delta.terms else None
+            if vector:
+                self.vectors[key] = vector
+            else:
+                self.vectors.pop(key, None)
+
+        stale = np.array(sorted(self.stale_keys), dtype=np.int64)
+        positions = np.searchsorted(self.keys, stale)
+        found = positions < len(self.keys)
+        found[found] = self.keys[positions[found]] == stale[found]
+
+        keys = np.array(sorted(self.vectors), dtype=np.int64)
+        rows = [self.vectors[int(key)] for key in keys]
+        matrix = sparse.csr_matrix(
+            (
+                np.array([w for row in rows for w in row.values()], dtype=np.float32),
+                np.array([c for row in rows for c in row], dtype=np.int32),
+                np.cumsum([0] + [len(row) for row in rows], dtype=np.int64),
+            ),
+            shape=(len(rows), len(self.vocabulary)),
+        ).tocsc()
+        # Swapped together, so a lookup running meanwhile sees one state or the other
+        self.stale, self.delta_keys, self.delta_matrix = positions[found], keys, matrix
+
+    def catch_up(self):
+        """Apply the deltas of records logged since the index was last brought up to date"""
+        head = changelog.head(self.tenant_id)
+        if head <= self.seq:
+            return
+        changed = {}
+        entries = ChangeLogEntry.objects.unscoped().filter(
+            tenant_id=self.tenant_id, seq__gt=self.seq, seq__lte=head, table__in=list(SOURCES),
+        )
+        for table, object_id in entries.values_list('table', 'object_id'):
+            changed.setdefault(table, set()).add(object_id)
+        if changed:
+            condition = Q()
+            for scope, ids in changed.items():
+                condition |= Q(scope=scope, object_id__in=ids)
+            with _lock:
+                self._set_deltas(SimilarityDelta.objects.unscoped().filter(condition, tenant_id=self.tenant_id))
+        self.seq = head
+
+    def vectorize(self, counts):
+        """Normalized {column: weight} of term counts, using the index's vocabulary"""
+        vector = {}
+        for term, count in counts.items():
+            column = self.vocabulary.get(term)
+            if column is not None:
+                vector[column] = (1 + math.log(count)) * float(self.idf[column])
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1
+        return {column: weight / norm for column, weight in vector.items()}
+
+    def scores(self, vector):
+        """Cosine similarity of every base document to a query vector"""
+        scores = np.zeros(len(self.keys), dtype=np.float32)
+        # Near-stopwords cost a pass over most of the index for a tiny share of the score
+        common = max(COMMON_TERM_SHARE * len(self.keys), MIN_COMMON_POSTINGS)
+        rare = {c: w for c, w in vector.items() if self.indptr[c + 1] - self.indptr[c] <= common}
+        strongest = sorted((rare or vector).items(), key=lambda item: -item[1])[:QUERY_TERMS]
+        for column, weight in strongest:
+            start, end = self.indptr[column], self.indptr[column + 1]
+            scores[self.indices[start:end]] += weight * self.data[start:end]
+        scores[self.stale] = 0
+        return scores
+
+    def delta_scores(self, vector):
+        """(keys, scores) of the delta documents for a query vector, one sparse product"""
+        keys, matrix = self.delta_keys, self.delta_matrix
+        if not len(keys):
+            return keys, np.zeros(0, dtype=np.float32)
+        columns = np.fromiter(vector.keys(), dtype=np.int64, count=len(vector))
+        weights = np.fromiter(vector.values(), dtype=np.float32, count=len(vector))
+        return keys, matrix[:, columns] @ weights
+
+    def similar(self, vector, exclude, limit):
+        """[(key, score)] of the documents most similar to a query vector"""
+        scores = self.scores(vector)
+        position = np.searchsorted(self.keys, exclude)
+        if position < len(self.keys) and self.keys[position] == exclude:
+            scores[position] = 0
+        delta_keys, delta_scores = self.delta_scores(vector)
+        delta_scores[delta_keys == exclude] = 0
+        results = []
+        for keys, scores in ((self.keys, scores), (delta_keys, delta_scores)):
+            count = min(limit, len(scores))
+            top = np.argpartition(-scores, count - 1)[:count] if count else []
+            results.extend((int(keys[i]), float(scores[i])) for i in top if scores[i] > 0)
+        return sorted(results, key=lambda item: -item[1])[:limit]
+
+
+def load_index(tenant_id):
+    """The tenant's current index, reloaded after a rebuild and caught up with later saves"""
+    version = _current_version(tenant_id)
+    entry = _indexes.get(tenant_id)
+    if entry is not None and entry[0] == version:
+        if entry[1] is not None:
+            entry[1].catch_up()
+        return entry[1]
+
+    directory = current_generation(store_dir(tenant_id, 'similarity'))
+    index = Index(directory, tenant_id) if directory is not None else None
+    with _lock:
+        _indexes[tenant_id] = (version, index)
+    return index
+
+
+def related(tenant_id, scope, pk, limit=DEFAULT_RESULTS):
+    """[(scope, pk, score)] of the records most like one record, best first"""
+    index = load_index(tenant_id)
+    if index is None:
+        return []
+    model, fields = SOURCES[scope]
+    record = model.objects.unscoped().filter(tenant_id=tenant_id, pk=pk).only('pk', *fields).first()
+    if record is None:
+        return []
+    vector = index.vectorize(term_counts(record, fields))
+    if not vector:
+        return []
+    return [split_key(key) + (score,) for key, score in index.similar(vector, doc_key(scope, pk), limit)]
+
+
+def related_records(tenant_id, scope, pk, limit=DEFAULT_RESULTS):
+    """related() with the matched records' titles, for display"""
+    matches = related(tenant_id, scope, pk, limit)
+    titles = {}
+    for match_scope in {s for s, _, _ in matches}:
+        model = SOURCES[match_scope][0]
+        ids = [p for s, p, _ in matches if s == match_scope]
+        for record_pk, title in model.objects.unscoped().filter(pk__in=ids).values_list('pk', 'title_summary'):
+            titles[(match_scope, record_pk)] = title
+    return [
+        {'scope': s, 'id': p, 'title': titles[(s, p)], 'score': round(score, 4)}
+        for s, p, score in matches if (s, p) in titles
+    ]
@@ -0,0 +1,129 @@
+"""
+Reading the institute's record spreadsheets for import_csv.
+
+Sheets are read row by row: CSV files with the csv module and .xlsx
+workbooks with openpyxl in read-only mode, which streams rows from the
+zipped XML instead of loading the workbook. Neither keeps more than the
+current row in memory. The header row is found among the first rows of a
+sheet (titles and blank rows usually sit above it), and the sheet is
+matched to Copyright, PatentFiled or PatentGranted by comparing its
+column headings with the models' field labels, so sheets can come in any
+order, under any name, with columns in any order.
+"""
+import csv
+import re
+from datetime import date, datetime
+
+from .models import Copyright, PatentFiled, PatentGranted
+
+
+MODELS = [Copyright, PatentFiled, PatentGranted]
+# Headings that differ from the model's verbose_name, normalized
+HEADER_ALIASES = {
+    'sl no': 'sl_no',
+    'sl': 'sl_no',
+    'serial no': 'sl_no',
+}
+# Rows searched for the header before giving up on a sheet
+HEADER_SEARCH_ROWS = 20
+# A header must match this many fields of a model
+MIN_HEADER_MATCHES = 3
+DATE_FORMAT = '%d.%m.%Y'
+
+_non_word = re.compile(r'[^a-z0-9]+')
+
+
+class SheetError(Exception):
+    """A sheet has no recognizable header row"""
+
+
+def normalize_heading(text):
+    return _non_word.sub(' ', str(text or '').lower()).strip()
+
+
+def cell_text(value):
+    """Text of a cell as the CSV exports show it: whole numbers without '.0', dates as dd.mm.yyyy"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (datetime, date)):
+        return value.strftime(DATE_FORMAT)
+    return str(value).strip()
+
+
+def field_labels(model):
+    """Normalized heading -> field name of a model's editable fields"""
+    labels = {
+        normalize_heading(field.verbose_name): field.name
+        for field in model._meta.concrete_fields if field.editable and not field.is_relation
+    }
+    labels.update((alias, name) for alias, name in HEADER_ALIASES.items() if name in labels.values())
+    return labels
+
+
+def match_header(row):
+    """(model, {column index: field name}) for the model a header row describes best, or None"""
+    best = None
+    for model in MODELS:
+        labels = field_labels(model)
+        columns = {}
+        for i, heading in enumerate(row):
+            name = labels.get(normalize_heading(heading))
+            if name and name not in columns.values():
+                columns[i] = name
+        if len(columns) >= MIN_HEADER_MATCHES and (best is None or len(columns) > len(best[1])):
+            best = (model, columns)
+    return best
+
+
+def read_sheet(rows):
+    """
+    Find the header of a sheet given as an iterator of cell-text lists.
+    Returns (model, columns, data rows); the data rows stay a lazy iterator.
+    """
+    for _, row in zip(range(HEADER_SEARCH_ROWS), rows):
+        match = match_header(row)
+        if match:
+            return match[0], match[1], rows
+    raise SheetError(f'No header row matching {", ".join(m._meta.verbose_name for m in MODELS)} found')
+
+
+def record_values(row, columns):
+    """{field: text} of a data row, or None for blank rows and year separator rows"""
+    values = {name: row[i].strip() for i, name in columns.items() if i < len(row) and row[i].strip()}
+    # Sheets separate years with a row holding just the year
+    if len(values) < 2:
+        return None
+    return values
+
+
+def csv_sheets(path):
+    """(sheet name, rows) of a CSV file: a single sheet named after the file"""
+    def rows():
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            for row in csv.reader(f):
+                yield [cell.strip() for cell in row]
+
+    yield str(path), rows()
+
+
+def xlsx_sheets(path):
+    """(sheet name, rows) of every worksheet of a workbook, streamed"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise SheetError('Reading .xlsx files needs openpyxl (pip install openpyxl)')
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            yield sheet.title, ([cell_text(value) for value in row] for row in sheet.iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+
+def open_sheets(path):
+    """(sheet name, rows) of a .csv or .xlsx file"""
+    if str(path).lower().endswith(('.xlsx', '.xlsm')):
+        return xlsx_sheets(path)
+    return csv_sheets(path)
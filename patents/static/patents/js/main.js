@@ -95,17 +95,149 @@ function confirmDelete(itemName) {
     return confirm(`Are you sure you want to delete "${itemName}"?`);
 }
 
-// ===== Table Sorting (Optional Enhancement) =====
+// ===== Incremental Table Loading =====
+// List and search tables render their first rows on the server. More rows
+// are fetched from the table's rows endpoint as the user scrolls, and
+// clicking a sortable header asks the server for a re-sorted first window.
 document.addEventListener('DOMContentLoaded', function() {
-    const tables = document.querySelectorAll('table');
+    const tables = document.querySelectorAll('table.incremental-table');
     
     tables.forEach(table => {
-        const headers = table.querySelectorAll('th');
-        headers.forEach((header, index) => {
-            if (!header.classList.contains('no-sort')) {
-                header.style.cursor = 'pointer';
-                header.title = 'Click to sort';
+        const tbody = table.querySelector('tbody');
+        const state = {
+            offset: tbody.querySelectorAll('tr').length,
+            hasMore: table.getAttribute('data-has-more') === 'true',
+            sort: '',
+            dir: 'asc',
+            loading: false
+        };
+        
+        function rowsUrl() {
+            const url = new URL(table.getAttribute('data-rows-url'), window.location.origin);
+            // Carry the search form parameters of the current page
+            new URLSearchParams(window.location.search).forEach((value, key) => {
+                url.searchParams.set(key, value);
+            });
+            url.searchParams.set('offset', state.offset);
+            if (state.sort) {
+                url.searchParams.set('sort', state.sort);
+                url.searchParams.set('dir', state.dir);
+            }
+            return url;
+        }
+        
+        function loadRows(replace) {
+            if (state.loading || (!replace && !state.hasMore)) {
+                return;
+            }
+            state.loading = true;
+            if (replace) {
+                state.offset = 0;
+            }
+            fetch(rowsUrl())
+                .then(response => {
+                    if (response.status === 429) {
+                        // Rate limited: ask again once the server allows it
+                        const wait = parseInt(response.headers.get('Retry-After'), 10) || 1;
+                        setTimeout(() => loadRows(replace), wait * 1000);
+                        return null;
+                    }
+                    return response.json();
+                })
+                .then(data => {
+                    if (!data) {
+                        return;
+                    }
+                    if (replace) {
+                        tbody.innerHTML = data.html;
+                    } else {
+                        tbody.insertAdjacentHTML('beforeend', data.html);
+                    }
+                    state.offset += data.count;
+                    state.hasMore = data.has_more;
+                })
+                .finally(() => {
+                    state.loading = false;
+                });
+        }
+        
+        // Load the next window when the end of the table scrolls into view
+        const sentinel = document.createElement('div');
+        sentinel.className = 'table-sentinel';
+        table.after(sentinel);
+        if ('IntersectionObserver' in window) {
+            const observer = new IntersectionObserver(entries => {
+                if (entries.some(entry => entry.isIntersecting)) {
+                    loadRows(false);
+                }
+            }, { rootMargin: '400px' });
+            observer.observe(sentinel);
+        }
+        
+        table.querySelectorAll('th[data-sort]').forEach(header => {
+            header.style.cursor = 'pointer';
+            header.title = 'Click to sort';
+            header.addEventListener('click', function() {
+                const key = this.getAttribute('data-sort');
+                state.dir = state.sort === key && state.dir === 'asc' ? 'desc' : 'asc';
+                state.sort = key;
+                table.querySelectorAll('th[data-sort]').forEach(th => th.removeAttribute('data-dir'));
+                this.setAttribute('data-dir', state.dir);
+                loadRows(true);
+            });
+        });
+    });
+});
+
+// ===== Search Suggestions =====
+// Inputs with data-suggest-url get a datalist filled from the suggest
+// endpoint. Requests are debounced and stale responses are ignored.
+document.addEventListener('DOMContentLoaded', function() {
+    const SUGGEST_DELAY = 150;
+    const MIN_PREFIX = 2;
+    
+    document.querySelectorAll('input[data-suggest-url]').forEach(input => {
+        const list = document.createElement('datalist');
+        list.id = input.id + '-suggestions';
+        input.after(list);
+        input.setAttribute('list', list.id);
+        
+        const cache = new Map();
+        let timer = null;
+        let latest = '';
+        
+        function fill(suggestions) {
+            list.replaceChildren(...suggestions.map(text => {
+                const option = document.createElement('option');
+                option.value = text;
+                return option;
+            }));
+        }
+        
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            const prefix = input.value.trim().toLowerCase();
+            latest = prefix;
+            if (prefix.length < MIN_PREFIX) {
+                fill([]);
+                return;
+            }
+            if (cache.has(prefix)) {
+                fill(cache.get(prefix));
+                return;
             }
+            timer = setTimeout(function() {
+                const url = input.getAttribute('data-suggest-url') + '?q=' + encodeURIComponent(prefix);
+                fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+                    .then(response => response.ok ? response.json() : { suggestions: [] })
+                    .then(data => {
+                        cache.set(prefix, data.suggestions);
+                        if (prefix === latest) {
+                            fill(data.suggestions);
+                        }
+                    })
+                    .catch(() => {});
+            }, SUGGEST_DELAY);
         });
     });
 });
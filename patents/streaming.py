@@ -0,0 +1,60 @@
+"""
+Streamed rendering of list and search pages with every row (?all=1).
+
+The page around the table is rendered first, with a marker where the
+table body goes, and sent as soon as the view returns. The rows follow in
+chunks of STREAM_CHUNK_SIZE, read from a database cursor with
+QuerySet.iterator() and rendered with the table's row template, so the
+first byte and the memory a worker needs do not grow with the number of
+rows. CompressionMiddleware compresses and flushes every chunk.
+
+The page is rendered inside the view so its CSRF token and messages are
+handled before the response leaves the middleware; the rows are rendered
+after the request's tenant scope has ended, so the tenant is passed on.
+"""
+from django.http import StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+from .tenants import tenant_context
+
+
+STREAM_CHUNK_SIZE = 200
+ROWS_MARKER = mark_safe('<!-- streamed rows -->')
+
+
+def requested(request):
+    return request.GET.get('all') == '1'
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def stream_page(request, template, context, rows_template, queryset, prepare_rows=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    StreamingHttpResponse of a page whose table body is every row of
+    ``queryset``. The page template prints ``streamed_rows`` in place of
+    its rows include when it is set.
+    """
+    page = render_to_string(template, dict(context, has_more=False, streamed_rows=ROWS_MARKER), request=request)
+    head, tail = page.split(ROWS_MARKER, 1)
+    tenant = request.tenant
+
+    def content():
+        yield head
+        with tenant_context(tenant):
+            rows_template_obj = get_template(rows_template)
+            for chunk in _chunks(queryset.iterator(chunk_size=chunk_size), chunk_size):
+                rows = prepare_rows(chunk) if prepare_rows else chunk
+                yield rows_template_obj.render(dict(context, rows=rows), request)
+        yield tail
+
+    return StreamingHttpResponse(content(), content_type='text/html; charset=utf-8')
@@ -0,0 +1,241 @@
+"""
+Search-as-you-type suggestions backed by a sorted term table.
+
+Every indexed value is stored in SuggestTerm as a normalized (lowercase,
+single-spaced) term. Titles and inventor names also get one entry per word
+boundary, so typing the start of any word matches. A prefix lookup is then
+a range scan on the (tenant, scope, field, term) unique index, and hot
+prefixes are answered from a small per-process LRU.
+
+Saves add terms with a single INSERT ... ON CONFLICT DO UPDATE that
+inserts new terms and raises the weight of known ones, and lower removed
+terms with one UPDATE per field (``field = ? AND term IN (...)``); both are
+answered from the unique index. An OR of several fields would only use its
+(tenant, scope) part and scan every term of the scope.
+
+Saves do not invalidate the LRU, or every worker would lose its hot
+prefixes on each write: entries live for LRU_TTL seconds, so new terms and
+changed weights show up within that time. Each tenant has its own version
+token, bumped by rebuilds and restores, which drops that institute's cached
+suggestions at once.
+
+The index is kept up to date by the save/delete signals in signals.py and
+can be rebuilt from scratch with ``manage.py rebuild_suggest_index``.
+"""
+import re
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import Copyright, PatentFiled, PatentGranted, SuggestTerm
+
+
+TERM_LENGTH = 100
+DISPLAY_LENGTH = 255
+MIN_PREFIX_LENGTH = 2
+MAX_SUGGESTIONS = 10
+# Rows read per lookup before ranking by weight
+CANDIDATES = 50
+
+# scope -> (model, fields offered as suggestions)
+SOURCES = {
+    'copyrights': (Copyright, ['title', 'inventors']),
+    'filed': (PatentFiled, ['title', 'inventors', 'application_number']),
+    'granted': (PatentGranted, ['title', 'inventors', 'application_number', 'granted_patent_no']),
+}
+# Fields whose values are split into names; number fields are indexed whole
+NAME_FIELDS = {'inventors'}
+PHRASE_FIELDS = {'title', 'inventors'}
+
+VERSION_KEY = 'patents:suggest_version:{}'
+LRU_SIZE = 2048
+# Seconds a cached lookup is served before the table is read again
+LRU_TTL = 30
+
+# (tenant, scope, field, prefix, limit) -> (version, expires, suggestions)
+_lru = OrderedDict()
+_lru_lock = threading.Lock()
+
+_name_separators = re.compile(r',|;|\n|\band\b|\bet al\b', re.IGNORECASE)
+
+
+def scope_for_model(model):
+    for scope, (source_model, fields) in SOURCES.items():
+        if source_model is model:
+            return scope, fields
+    return None, []
+
+
+def normalize(text):
+    return ' '.join(str(text).lower().split())
+
+
+def terms_for(field, value):
+    """Map of normalized term -> display text for one field value"""
+    if not value:
+        return {}
+    phrases = _name_separators.split(value) if field in NAME_FIELDS else [value]
+
+    terms = {}
+    for phrase in phrases:
+        display = ' '.join(phrase.split())[:DISPLAY_LENGTH]
+        words = display.lower().split(' ')
+        if len(display) < MIN_PREFIX_LENGTH:
+            continue
+        if field not in PHRASE_FIELDS:
+            terms.setdefault(display.lower()[:TERM_LENGTH], display)
+            continue
+        for i, word in enumerate(words):
+            if len(word) >= MIN_PREFIX_LENGTH:
+                terms.setdefault(' '.join(words[i:])[:TERM_LENGTH], display)
+    return terms
+
+
+def record_terms(record, fields):
+    """Map of (field, term) -> display for a model instance"""
+    return row_terms({field: getattr(record, field) for field in fields}, fields)
+
+
+def row_terms(row, fields):
+    """Map of (field, term) -> display for a row of values"""
+    terms = {}
+    for field in fields:
+        for term, display in terms_for(field, row[field]).items():
+            terms[(field, term)] = display
+    return terms
+
+
+def _terms_by_field(keys):
+    """Map of field -> terms for (field, term) keys"""
+    by_field = {}
+    for field, term in keys:
+        by_field.setdefault(field, []).append(term)
+    return by_field
+
+
+def _upsert_sql(count):
+    """INSERT of ``count`` terms at weight 1 that adds 1 to the weight of terms already there"""
+    table = SuggestTerm._meta.db_table
+    values = ', '.join(['(%s, %s, %s, %s, %s, 1)'] * count)
+    return (
+        f'INSERT INTO {table} (tenant_id, scope, field, term, display, weight) VALUES {values} '
+        f'ON CONFLICT (tenant_id, scope, field, term) DO UPDATE SET weight = {table}.weight + 1'
+    )
+
+
+def apply_changes(tenant_id, scope, added, removed):
+    """
+    Adjust a tenant's term weights: ``added``/``removed`` map (field, term)
+    to display. Terms whose weight drops to zero are deleted. Added terms
+    take one statement and removed ones two per changed field, however
+    many terms a record has.
+    """
+    if not added and not removed:
+        return
+    terms = SuggestTerm.objects.unscoped().filter(tenant_id=tenant_id, scope=scope)
+    with transaction.atomic(savepoint=False):
+        for field, field_terms in _terms_by_field(removed).items():
+            removed_terms = terms.filter(field=field, term__in=field_terms)
+            removed_terms.update(weight=F('weight') - 1)
+            removed_terms.filter(weight__lte=0).delete()
+
+        if added and connection.features.supports_update_conflicts_with_target:
+            params = []
+            for (field, term), display in added.items():
+                params.extend([tenant_id, scope, field, term, display])
+            with connection.cursor() as cursor:
+                cursor.execute(_upsert_sql(len(added)), params)
+        elif added:
+            # New terms go in at zero, then every added term gains one
+            SuggestTerm.objects.bulk_create([
+                SuggestTerm(tenant_id=tenant_id, scope=scope, field=field, term=term, display=display, weight=0)
+                for (field, term), display in added.items()
+            ], ignore_conflicts=True)
+            for field, field_terms in _terms_by_field(added).items():
+                terms.filter(field=field, term__in=field_terms).update(weight=F('weight') + 1)
+
+
+def rebuild(scope=None):
+    """Recreate the index for one scope (or all) from the records; returns term count"""
+    total = 0
+    tenants = set()
+    for name, (model, fields) in SOURCES.items():
+        if scope and name != scope:
+            continue
+        weights = Counter()
+        displays = {}
+        for record in model.objects.only('pk', 'tenant', *fields).iterator(chunk_size=2000):
+            for (field, term), display in record_terms(record, fields).items():
+                key = (record.tenant_id, field, term)
+                weights[key] += 1
+                displays.setdefault(key, display)
+        with transaction.atomic():
+            SuggestTerm.objects.filter(scope=name).delete()
+            SuggestTerm.objects.bulk_create(
+                (
+                    SuggestTerm(
+                        tenant_id=tenant_id, scope=name, field=field, term=term,
+                        display=displays[(tenant_id, field, term)], weight=weight,
+                    )
+                    for (tenant_id, field, term), weight in weights.items()
+                ),
+                batch_size=2000,
+            )
+        tenants.update(tenant_id for tenant_id, _, _ in weights)
+        total += len(weights)
+    for tenant_id in tenants:
+        invalidate(tenant_id)
+    return total
+
+
+def invalidate(tenant_id):
+    cache.set(VERSION_KEY.format(tenant_id), uuid.uuid4().hex, None)
+
+
+def _current_version(tenant_id):
+    key = VERSION_KEY.format(tenant_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def suggest(tenant_id, scope, field, prefix, limit=MAX_SUGGESTIONS):
+    """A tenant's suggestions for a typed prefix, most common first"""
+    prefix = normalize(prefix)[:TERM_LENGTH]
+    if len(prefix) < MIN_PREFIX_LENGTH:
+        return []
+
+    version = _current_version(tenant_id)
+    key = (tenant_id, scope, field, prefix, limit)
+    with _lru_lock:
+        entry = _lru.get(key)
+        if entry is not None and entry[0] == version and entry[1] > time.monotonic():
+            _lru.move_to_end(key)
+            return entry[2]
+
+    # Range scan on the unique index instead of LIKE, which SQLite cannot index here
+    candidates = (
+        SuggestTerm.objects.unscoped().filter(
+            tenant_id=tenant_id, scope=scope, field=field, term__gte=prefix, term__lt=prefix + '\uffff',
+        )
+        .order_by('term')
+        .values_list('display', 'weight')[:CANDIDATES]
+    )
+    ranked = {}
+    for display, weight in candidates:
+        ranked[display] = ranked.get(display, 0) + weight
+    suggestions = [d for d, _ in sorted(ranked.items(), key=lambda item: (-item[1], item[0]))][:limit]
+
+    with _lru_lock:
+        _lru[key] = (version, time.monotonic() + LRU_TTL, suggestions)
+        _lru.move_to_end(key)
+        if len(_lru) > LRU_SIZE:
+            _lru.popitem(last=False)
+    return suggestions
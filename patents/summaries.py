@@ -0,0 +1,111 @@
+"""
+Short display strings stored next to the full text columns.
+
+List and search pages used to truncate long titles, inventor lists and
+IP data values on every render. These helpers compute the same strings
+once, when a record is saved or imported, so list pages can load only the
+short columns. Used by the models, the 0005 migration and the
+backfill_summaries command.
+"""
+from django.utils.text import Truncator
+
+
+SUMMARY_MAX_LENGTH = 255
+DISPLAY_TITLE_LENGTH = 50
+DATA_SUMMARY_LENGTH = 100
+
+# summary column -> (source column, number of words), per model
+SUMMARY_FIELDS = {
+    'Copyright': {
+        'faculty_students_summary': ('faculty_students', 8),
+        'title_summary': ('title', 10),
+        'filing_info_summary': ('filing_info', 8),
+        'inventors_summary': ('inventors', 6),
+    },
+    'PatentFiled': {
+        'inventors_summary': ('inventors', 6),
+        'title_summary': ('title', 12),
+    },
+    'PatentGranted': {
+        'inventors_summary': ('inventors', 6),
+        'title_summary': ('title', 12),
+        'filing_institute_summary': ('filing_institute', 6),
+    },
+}
+
+
+def summarize_words(value, num_words):
+    """Same output as the truncatewords filter"""
+    if not value:
+        return ''
+    return Truncator(value).words(num_words, truncate=' …')[:SUMMARY_MAX_LENGTH]
+
+
+def update_record_summaries(record):
+    """Fill the summary columns of a Copyright/PatentFiled/PatentGranted instance"""
+    for summary_field, (source_field, num_words) in SUMMARY_FIELDS[record.__class__.__name__].items():
+        setattr(record, summary_field, summarize_words(getattr(record, source_field), num_words))
+
+
+def _ordered_values(data, field_definitions=None):
+    if field_definitions:
+        for field_def in field_definitions:
+            yield field_def['name'], data.get(field_def['name'])
+    else:
+        yield from data.items()
+
+
+def build_display_title(data, field_definitions=None):
+    """First non-empty text value, in field definition order when known"""
+    for key, value in _ordered_values(data or {}, field_definitions):
+        if value and isinstance(value, str):
+            return value[:DISPLAY_TITLE_LENGTH]
+    return ''
+
+
+def build_data_summary(data):
+    """Each value cut to the length the IP tables display"""
+    summary = {}
+    for key, value in (data or {}).items():
+        value = str(value)
+        summary[key] = value[:DATA_SUMMARY_LENGTH] + '...' if len(value) > DATA_SUMMARY_LENGTH else value
+    return summary
+
+
+def update_item_summaries(item, field_definitions=None):
+    """Fill display_title and data_summary of an IntellectualProperty instance"""
+    item.display_title = build_display_title(item.data, field_definitions)
+    item.data_summary = build_data_summary(item.data)
+
+
+def backfill_summaries(model, chunk_size=1000):
+    """
+    Recompute the summary columns of every row of a model in primary key
+    chunks. Works with historical models too, so migrations can call it.
+    Returns the number of rows updated.
+    """
+    name = model.__name__
+    if name == 'IntellectualProperty':
+        category_model = model._meta.get_field('category').related_model
+        definitions = dict(category_model.objects.values_list('pk', 'field_definitions'))
+        load_fields = ['pk', 'category_id', 'data']
+        summary_fields = ['display_title', 'data_summary']
+    else:
+        load_fields = ['pk'] + [source for source, _ in SUMMARY_FIELDS[name].values()]
+        summary_fields = list(SUMMARY_FIELDS[name])
+
+    updated = 0
+    last_pk = 0
+    while True:
+        chunk = list(model.objects.filter(pk__gt=last_pk).order_by('pk').only(*load_fields)[:chunk_size])
+        if not chunk:
+            break
+        for record in chunk:
+            if name == 'IntellectualProperty':
+                update_item_summaries(record, definitions.get(record.category_id))
+            else:
+                update_record_summaries(record)
+        model.objects.bulk_update(chunk, summary_fields)
+        updated += len(chunk)
+        last_pk = chunk[-1].pk
+    return updated
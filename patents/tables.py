@@ -0,0 +1,237 @@
+"""
+Server-side description of the record tables.
+
+The list and search pages render only the first window of rows; further
+windows, and any re-sort, are fetched from the ``table_rows`` JSON
+endpoint. Both paths go through the same filtering, ordering and row
+templates defined here. Every sortable column has a database index.
+"""
+from collections import namedtuple
+
+from django.db.models import Exists, OuterRef
+from django.urls import reverse
+from django.utils import timezone
+
+from . import readstore
+from .facets import Facet, apply_facet_filters, facet_counts
+from .models import Copyright, PatentFiled, PatentGranted, Topic
+
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def topic_labels(ids):
+    return dict(Topic.objects.filter(pk__in=ids).values_list('pk', 'label'))
+
+
+class TableSpec:
+    """Columns, filters and row templates of one record table"""
+
+    def __init__(self, model, list_fields, search_fields, sort_fields, row_templates, facets=None):
+        self.model = model
+        # Columns loaded for rendering; long text is read from *_summary columns
+        self.list_fields = list_fields
+        # GET parameter -> lookup used by the search form
+        self.search_fields = search_fields
+        # sort key sent by the table header -> indexed column
+        self.sort_fields = sort_fields
+        # 'list' / 'search' -> template rendering a run of <tr> rows
+        self.row_templates = row_templates
+        # Facets counted on the search page and applied as drill-down filters
+        self.facets = facets or []
+
+    def base_queryset(self):
+        return self.model.objects.only(*self.list_fields)
+
+    def rows(self):
+        """Rows to list and search: the read store's copy when it is on (readstore.py), else base_queryset()"""
+        stored = readstore.rows(self)
+        return stored if stored is not None else self.base_queryset()
+
+    def filter(self, queryset, params):
+        """Apply the search form parameters (case-insensitive partial match) and selected facets"""
+        if isinstance(queryset, readstore.StoredRows):
+            return queryset.search(params)
+        for param, lookup in self.search_fields.items():
+            value = params.get(param, '').strip()
+            if value:
+                queryset = queryset.filter(**{lookup: value})
+        return apply_facet_filters(queryset, self.facets, params)
+
+    def facet_counts(self, queryset, params):
+        """(facets, total) for a filtered queryset, in one grouped query"""
+        if isinstance(queryset, readstore.StoredRows):
+            return queryset.facet_counts(params)
+        return facet_counts(queryset, self.facets, params)
+
+    def order(self, queryset, sort, direction):
+        """Order by an indexed column; unknown keys keep the model's default order"""
+        column = self.sort_fields.get(sort)
+        if not column:
+            return queryset
+        if isinstance(queryset, readstore.StoredRows):
+            return queryset.ordered(column, direction == 'desc')
+        prefix = '-' if direction == 'desc' else ''
+        return queryset.order_by(f'{prefix}{column}', f'{prefix}pk')
+
+
+TABLES = {
+    'copyrights': TableSpec(
+        model=Copyright,
+        list_fields=[
+            'sl_no', 'year', 'faculty_students_summary', 'title_summary', 'filing_info_summary',
+            'inventors_summary',
+        ],
+        search_fields={
+            'year': 'year__icontains',
+            'faculty_students': 'faculty_students__icontains',
+            'title': 'title__icontains',
+            'inventors': 'inventors__icontains',
+        },
+        sort_fields={
+            'sl_no': 'sl_no',
+            'year': 'year',
+            'title': 'title_summary',
+        },
+        row_templates={
+            'list': 'patents/rows/copyright_list_rows.html',
+            'search': 'patents/rows/copyright_search_rows.html',
+        },
+        facets=[
+            Facet('year', 'Year', 'year', sort_by_value=True),
+        ],
+    ),
+    'filed': TableSpec(
+        model=PatentFiled,
+        list_fields=[
+            'sl_no', 'date_of_filing', 'inventors_summary', 'title_summary', 'application_number',
+            'date_of_publication',
+        ],
+        search_fields={
+            'date_of_filing': 'date_of_filing__icontains',
+            'inventors': 'inventors__icontains',
+            'title': 'title__icontains',
+            'application_number': 'application_number__icontains',
+            'applicant_name': 'applicant_name__icontains',
+        },
+        sort_fields={
+            'sl_no': 'sl_no',
+            'date_of_filing': 'date_of_filing',
+            'title': 'title_summary',
+            'application_number': 'application_number',
+            'date_of_publication': 'date_of_publication',
+        },
+        row_templates={
+            'list': 'patents/rows/filed_list_rows.html',
+            'search': 'patents/rows/filed_search_rows.html',
+        },
+        facets=[
+            Facet('year', 'Year of Filing', 'filing_year', sort_by_value=True, integer=True),
+            Facet('applicant', 'Applicant', 'applicant_facet'),
+            # Matched on the normalized application number, see lifecycle.py
+            Facet(
+                'status', 'Status', 'is_granted',
+                expression=lambda: Exists(
+                    PatentGranted.objects.exclude(application_key='')
+                    .filter(tenant=OuterRef('tenant'), application_key=OuterRef('application_key'))
+                ),
+                value_labels={True: 'Granted', False: 'Filed only'},
+            ),
+            # Assigned by topics.py
+            Facet('topic', 'Topic', 'topic', label_lookup=topic_labels, integer=True),
+        ],
+    ),
+    'granted': TableSpec(
+        model=PatentGranted,
+        list_fields=[
+            'sl_no', 'granted_patent_no', 'date_of_grant', 'inventors_summary', 'title_summary',
+            'filing_institute_summary',
+        ],
+        search_fields={
+            'granted_patent_no': 'granted_patent_no__icontains',
+            'date_of_grant': 'date_of_grant__icontains',
+            'inventors': 'inventors__icontains',
+            'title': 'title__icontains',
+            'filing_institute': 'filing_institute__icontains',
+        },
+        sort_fields={
+            'sl_no': 'sl_no',
+            'granted_patent_no': 'granted_patent_no',
+            'date_of_grant': 'date_of_grant',
+            'title': 'title_summary',
+        },
+        row_templates={
+            'list': 'patents/rows/granted_list_rows.html',
+            'search': 'patents/rows/granted_search_rows.html',
+        },
+        facets=[
+            Facet('year', 'Year of Grant', 'grant_year', sort_by_value=True, integer=True),
+            Facet('institute', 'Filing Institute', 'institute_facet'),
+            Facet('topic', 'Topic', 'topic', label_lookup=topic_labels, integer=True),
+        ],
+    ),
+}
+
+# Dynamic IP items can be sorted by their indexed columns only
+IP_SORT_FIELDS = {
+    'id': 'pk',
+    'created_at': 'created_at',
+    'title': 'display_title',
+}
+
+
+# Shown in IP table cells without a value
+EMPTY_CELL = '—'
+# Reversed once per window in place of the real primary key
+_PK_PLACEHOLDER = 2 ** 53
+
+# One rendered IP table row with every value already formatted
+IPRow = namedtuple('IPRow', ['pk', 'cells', 'created', 'edit_url', 'delete_url'])
+
+
+def _pk_url(name, slug):
+    """Prefix/suffix of a per-item URL, so rows avoid a reverse() each"""
+    prefix, _, suffix = reverse(name, args=[slug, _PK_PLACEHOLDER]).rpartition(str(_PK_PLACEHOLDER))
+    return prefix, suffix
+
+
+def ip_table_rows(category, items):
+    """
+    Precompute the cells, date and action URLs of IP table rows so the row
+    template only prints strings. Rendering with a filter lookup, a date
+    filter and two {% url %} tags per row was several times slower (see the
+    benchmark_rendering command).
+    """
+    names = [field_def['name'] for field_def in category.field_definitions]
+    edit_prefix, edit_suffix = _pk_url('patents:ip_edit', category.slug)
+    delete_prefix, delete_suffix = _pk_url('patents:ip_delete', category.slug)
+    rows = []
+    for item in items:
+        rows.append(IPRow(
+            pk=item.pk,
+            cells=[item.data_summary.get(name) or EMPTY_CELL for name in names],
+            created=timezone.localtime(item.created_at).strftime('%Y-%m-%d'),
+            edit_url=f'{edit_prefix}{item.pk}{edit_suffix}',
+            delete_url=f'{delete_prefix}{item.pk}{delete_suffix}',
+        ))
+    return rows
+
+
+def parse_window(params):
+    """Read offset/limit from GET parameters, clamped to sane values"""
+    try:
+        offset = max(int(params.get('offset', 0)), 0)
+    except (TypeError, ValueError):
+        offset = 0
+    try:
+        limit = min(max(int(params.get('limit', PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except (TypeError, ValueError):
+        limit = PAGE_SIZE
+    return offset, limit
+
+
+def fetch_window(queryset, offset, limit):
+    """One window of rows plus whether more follow, without a COUNT query"""
+    rows = list(queryset[offset:offset + limit + 1])
+    return rows[:limit], len(rows) > limit
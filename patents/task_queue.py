@@ -0,0 +1,197 @@
+"""
+A small database-backed task queue.
+
+Tasks are plain functions registered with ``@task``. ``enqueue`` stores a
+BackgroundTask row (inside the caller's transaction, so the task only
+becomes visible once the request commits) and ``manage.py run_worker``
+claims and runs them. There is no broker: workers poll the table and claim
+rows with a conditional UPDATE, which is safe on SQLite and PostgreSQL.
+For a task with a concurrency limit the same UPDATE also counts the copies
+already running, so two workers cannot both take the last slot; SQLite
+runs one write statement at a time, and on PostgreSQL claims of the same
+task name are serialized with a transaction-level advisory lock.
+A task runs scoped to the tenant that was active when it was queued.
+
+A running task is held under a lease: the worker process touches
+``updated_at`` of its running rows every few seconds, and any worker puts
+back rows that have not been touched for ``--stale-after`` seconds, so a
+task whose worker died does not hold its concurrency slot for good.
+"""
+import logging
+import traceback
+import zlib
+from datetime import timedelta
+
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, IntegerField, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import BackgroundTask
+from .tenants import get_current_tenant, tenant_context
+
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class TaskSpec:
+    """Registered task function and its queue options"""
+
+    def __init__(self, func, name, max_attempts, retry_delay, concurrency):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.concurrency = concurrency
+
+
+def task(name=None, max_attempts=3, retry_delay=30, concurrency=None):
+    """
+    Register a function as a background task.
+
+    The function is called as ``func(task, **kwargs)`` where ``task`` is the
+    BackgroundTask row, so it can call ``task.set_progress(...)``.
+    ``concurrency`` caps how many copies of this task run at once across all
+    workers; ``retry_delay`` (seconds) doubles on every failed attempt.
+    """
+    def decorator(func):
+        spec = TaskSpec(func, name or func.__name__, max_attempts, retry_delay, concurrency)
+        _registry[spec.name] = spec
+        func.task_name = spec.name
+        return func
+    return decorator
+
+
+def get_task(name):
+    return _registry.get(name)
+
+
+def registered_tasks():
+    return dict(_registry)
+
+
+def enqueue(name, run_after=None, **kwargs):
+    """Queue a registered task by name; kwargs must be JSON-serializable"""
+    spec = _registry.get(getattr(name, 'task_name', name))
+    if spec is None:
+        raise ValueError(f'Unknown task: {name}')
+    return BackgroundTask.objects.create(
+        tenant=get_current_tenant(),
+        name=spec.name,
+        kwargs=kwargs,
+        max_attempts=spec.max_attempts,
+        run_after=run_after or timezone.now(),
+    )
+
+
+def _saturated_names():
+    """Task names that already run at their concurrency limit"""
+    limited = {name: spec.concurrency for name, spec in _registry.items() if spec.concurrency}
+    if not limited:
+        return []
+    running = (
+        BackgroundTask.objects.unscoped().filter(status='running', name__in=limited)
+        .values('name').annotate(n=Count('pk'))
+    )
+    return [row['name'] for row in running if row['n'] >= limited[row['name']]]
+
+
+def _claim(pk, name, worker_id, now):
+    """
+    Mark a queued task running for this worker with one conditional UPDATE,
+    which fails if another worker claimed it first or, for a task with a
+    concurrency limit, if that many copies already run.
+    """
+    claim = BackgroundTask.objects.unscoped().filter(pk=pk, status='queued')
+    spec = _registry.get(name)
+    if spec is None or not spec.concurrency:
+        return claim.update(status='running', locked_by=worker_id, started_at=now, updated_at=now)
+
+    running = (
+        BackgroundTask.objects.unscoped().filter(name=name, status='running')
+        .order_by().values('name').annotate(n=Count('pk')).values('n')
+    )
+    claim = claim.alias(running=Coalesce(Subquery(running, output_field=IntegerField()), 0))
+    claim = claim.filter(running__lt=spec.concurrency)
+    if connection.vendor != 'postgresql':
+        return claim.update(status='running', locked_by=worker_id, started_at=now, updated_at=now)
+    # READ COMMITTED would let two claims count the same running rows
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)', [zlib.crc32(name.encode('utf-8'))])
+        return claim.update(status='running', locked_by=worker_id, started_at=now, updated_at=now)
+
+
+def claim_next(worker_id):
+    """
+    Claim the oldest runnable task for this worker, or return None.
+    The conditions in the UPDATE make the claim atomic between workers;
+    the saturated names only save claims that would fail anyway.
+    """
+    now = timezone.now()
+    candidates = (
+        BackgroundTask.objects.unscoped().filter(status='queued', run_after__lte=now)
+        .exclude(name__in=_saturated_names())
+        .order_by('run_after', 'pk')
+        .values_list('pk', 'name')[:5]
+    )
+    for pk, name in list(candidates):
+        if _claim(pk, name, worker_id, now):
+            return BackgroundTask.objects.unscoped().select_related('tenant').get(pk=pk)
+    return None
+
+
+def run_task(task_obj):
+    """Run a claimed task and record the outcome, scheduling a retry on failure"""
+    spec = _registry.get(task_obj.name)
+    task_obj.attempts += 1
+    try:
+        if spec is None:
+            raise LookupError(f'Task "{task_obj.name}" is not registered')
+        with tenant_context(task_obj.tenant):
+            result = spec.func(task_obj, **task_obj.kwargs)
+    except Exception as e:
+        logger.exception('Task %s (%s) failed', task_obj.pk, task_obj.name)
+        task_obj.error = f'{e}\n\n{traceback.format_exc()}'
+        task_obj.locked_by = ''
+        if spec is not None and task_obj.attempts < task_obj.max_attempts:
+            delay = spec.retry_delay * 2 ** (task_obj.attempts - 1)
+            task_obj.status = 'queued'
+            task_obj.run_after = timezone.now() + timedelta(seconds=delay)
+        else:
+            task_obj.status = 'failed'
+            task_obj.finished_at = timezone.now()
+        task_obj.save()
+        return task_obj
+
+    task_obj.status = 'done'
+    task_obj.result = result
+    task_obj.error = None
+    task_obj.finished_at = timezone.now()
+    task_obj.save()
+    return task_obj
+
+
+def renew_leases(worker_prefix):
+    """Touch the running tasks of one worker process, so requeue_stale leaves them alone"""
+    return BackgroundTask.objects.unscoped().filter(status='running', locked_by__startswith=worker_prefix).update(
+        updated_at=timezone.now(),
+    )
+
+
+def requeue_stale(timeout):
+    """Put back tasks left 'running' by a worker that died more than timeout seconds ago"""
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return BackgroundTask.objects.unscoped().filter(status='running', updated_at__lt=cutoff).update(
+        status='queued', locked_by='', run_after=timezone.now(),
+    )
+
+
+def work_once(worker_id):
+    """Claim and run a single task; returns the task or None if the queue is empty"""
+    close_old_connections()
+    task_obj = claim_next(worker_id)
+    if task_obj is not None:
+        run_task(task_obj)
+    return task_obj
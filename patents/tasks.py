@@ -0,0 +1,79 @@
+"""
+Background task definitions, run by ``manage.py run_worker``.
+"""
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from . import analytics, similarity, topics
+from .models import BackgroundTask, Tenant
+from .schema_migration import run_pending_migrations
+from .task_queue import enqueue, task
+
+
+# Management commands that may be queued through the run_command task
+QUEUEABLE_COMMANDS = {
+    'import_csv', 'import_ip', 'migrate_category_data', 'rebuild_lifecycle', 'rebuild_similarity_index',
+    'rebuild_suggest_index',
+}
+
+
+@task(name='category_schema_migration', concurrency=1)
+def category_schema_migration(task_obj):
+    """Apply pending IP category data migrations, oldest first"""
+    applied = run_pending_migrations(progress=task_obj.set_progress)
+    failed = [m.pk for m in applied if m.status == 'failed']
+    if failed:
+        raise RuntimeError(f'Schema migration(s) failed: {failed}')
+    return {'migrations': [m.pk for m in applied]}
+
+
+@task(name='run_command', max_attempts=1)
+def run_command(task_obj, command, args=None, options=None):
+    """Run a whitelisted management command and keep its output as the result"""
+    if command not in QUEUEABLE_COMMANDS:
+        raise ValueError(f'Command "{command}" cannot be run as a background task')
+    task_obj.set_progress(0, message=f'Running {command}')
+    out = StringIO()
+    call_command(command, *(args or []), stdout=out, **(options or {}))
+    return {'output': out.getvalue()[-10000:]}
+
+
+@task(name='rebuild_similarity_index', concurrency=1)
+def rebuild_similarity_index(task_obj, tenant_id):
+    """Rebuild a tenant's similarity index, folding in its pending deltas"""
+    documents = similarity.rebuild(Tenant.objects.get(pk=tenant_id), progress=task_obj.set_progress)
+    return {'documents': documents}
+
+
+@task(name='cluster_topics', concurrency=1)
+def cluster_topics(task_obj, tenant_id, topics_count=topics.DEFAULT_TOPICS):
+    """Re-cluster a tenant's patents into topics and tag every record"""
+    tenant = Tenant.objects.get(pk=tenant_id)
+    found = topics.cluster(tenant, topics_count, progress=task_obj.set_progress)
+    return {'topics': [topic.label for topic in found]}
+
+
+@task(name='build_analytics_snapshot', concurrency=1)
+def build_analytics_snapshot(task_obj, tenant_id, every=None):
+    """Take a tenant's analytics snapshot; with ``every`` (seconds), queue the next one"""
+    tenant = Tenant.objects.get(pk=tenant_id)
+    if every:
+        # Queued before building so a failed snapshot does not end the schedule
+        enqueue('build_analytics_snapshot', run_after=timezone.now() + timedelta(seconds=every), tenant_id=tenant_id, every=every)
+    counts = analytics.build_snapshot(tenant, progress=lambda name, rows: task_obj.set_progress(0, message=f'{name}: {rows} rows'))
+    return {'tables': counts}
+
+
+def queue_similarity_rebuild(tenant_id):
+    """Queue an index rebuild for a tenant once its deltas pile up, unless one is already waiting"""
+    if not similarity.rebuild_check_due(tenant_id):
+        return None
+    pending = BackgroundTask.objects.unscoped().filter(
+        tenant_id=tenant_id, name='rebuild_similarity_index', status__in=['queued', 'running'],
+    )
+    if not pending.exists() and similarity.needs_rebuild(tenant_id):
+        return enqueue('rebuild_similarity_index', tenant_id=tenant_id)
+    return None
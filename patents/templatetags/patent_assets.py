@@ -0,0 +1,69 @@
+from functools import lru_cache
+
+from django import template
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from patents.assets import (
+    BUNDLES, LOGO_FALLBACK_WIDTH, LOGO_FORMATS, LOGO_SOURCE, LOGO_WIDTHS, bundles_enabled,
+    logo_variant_name,
+)
+
+register = template.Library()
+
+
+@lru_cache(maxsize=None)
+def _built(name):
+    return finders.find(name) is not None
+
+
+def _asset_names(kind):
+    output, sources = BUNDLES[kind]
+    if bundles_enabled() and _built(output):
+        return [output]
+    return sources
+
+
+@register.simple_tag
+def bundle_css():
+    """
+    Stylesheet link(s): the minified bundle when built, else the sources.
+    Usage: {% bundle_css %}
+    """
+    return format_html_join('\n', '<link rel="stylesheet" href="{}">', ((static(name),) for name in _asset_names('css')))
+
+
+@register.simple_tag
+def bundle_js():
+    """
+    Script tag(s): the minified bundle when built, else the sources.
+    Usage: {% bundle_js %}
+    """
+    return format_html_join('\n', '<script src="{}"></script>', ((static(name),) for name in _asset_names('js')))
+
+
+@register.simple_tag
+def logo_picture(alt, css_class=''):
+    """
+    Header logo as a <picture> with AVIF/WebP sources at 1x-3x widths.
+    Usage: {% logo_picture "IIEST Shibpur Logo" "logo" %}
+    """
+    fallback = logo_variant_name(LOGO_FALLBACK_WIDTH, 'png')
+    if not (bundles_enabled() and _built(fallback)):
+        return format_html('<img src="{}" alt="{}" class="{}">', static(LOGO_SOURCE), alt, css_class)
+
+    base_width = LOGO_WIDTHS[0]
+    sources = []
+    for extension, mime, options in LOGO_FORMATS.values():
+        srcset = ', '.join(
+            f'{static(logo_variant_name(width, extension))} {width // base_width}x'
+            for width in LOGO_WIDTHS if _built(logo_variant_name(width, extension))
+        )
+        if srcset:
+            sources.append((srcset, mime))
+    return format_html(
+        '<picture>{}<img src="{}" alt="{}" class="{}" width="{}" height="{}"></picture>',
+        format_html_join('', '<source srcset="{}" type="{}">', sources),
+        static(fallback), alt, css_class, base_width, base_width,
+    )
@@ -0,0 +1,144 @@
+"""
+Tenants: several institutes served by one deployment.
+
+Every record belongs to a Tenant. TenantMiddleware resolves the tenant from
+the request's host name (its own ``domain``, or a subdomain equal to its
+slug, falling back to PATENTS_DEFAULT_TENANT) and activates it for the
+request. The default manager of tenant-owned models then adds the tenant
+to every query, and save() stamps new rows with it, so views need no
+per-query filtering. Management commands and the task worker run unscoped
+unless they activate a tenant (``--tenant``, or the tenant a task was
+queued for); rows they save go to the default tenant.
+
+Host lookups are cached per process behind a shared version token, like
+the category registry, so resolving the tenant costs no query per request.
+"""
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+
+
+VERSION_KEY = 'patents:tenant_version'
+# Distinct host names remembered per process
+MAX_CACHED_HOSTS = 1000
+
+_current = ContextVar('patents_tenant', default=None)
+_hosts = {}
+_lock = threading.Lock()
+
+
+class QuotaExceeded(Exception):
+    """A write would take a tenant past one of its limits"""
+
+
+class TenantManager(models.Manager):
+    """Default manager of tenant-owned models, scoped to the active tenant if there is one"""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        tenant = _current.get()
+        if tenant is not None:
+            queryset = queryset.filter(tenant_id=tenant.pk)
+        return queryset
+
+    def unscoped(self):
+        return super().get_queryset()
+
+
+def get_current_tenant():
+    return _current.get()
+
+
+@contextmanager
+def tenant_context(tenant):
+    """Scope queries and new rows to ``tenant`` (None: unscoped) inside the block"""
+    token = _current.set(tenant)
+    try:
+        yield tenant
+    finally:
+        _current.reset(token)
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """Make every worker re-resolve host names (after a tenant is saved or deleted)"""
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def default_tenant_slug():
+    return getattr(settings, 'PATENTS_DEFAULT_TENANT', '')
+
+
+def get_tenant(slug):
+    """Active tenant by slug, raising Tenant.DoesNotExist"""
+    from .models import Tenant
+    return Tenant.objects.get(slug=slug, is_active=True)
+
+
+def default_tenant():
+    """Tenant that owns rows saved outside a request, or None"""
+    from .models import Tenant
+    slug = default_tenant_slug()
+    return Tenant.objects.filter(slug=slug, is_active=True).first() if slug else None
+
+
+def _lookup(host):
+    from .models import Tenant
+    tenants = Tenant.objects.filter(is_active=True)
+    tenant = tenants.filter(domain=host).first()
+    if tenant is None and host.count('.') >= 2:
+        tenant = tenants.filter(slug=host.split('.', 1)[0]).first()
+    return tenant or default_tenant()
+
+
+def resolve_tenant(host):
+    """Tenant serving a host name (lowercase, without port), or None"""
+    version = current_version()
+    entry = _hosts.get(host)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    tenant = _lookup(host)
+    with _lock:
+        if len(_hosts) >= MAX_CACHED_HOSTS or any(v != version for v, _ in _hosts.values()):
+            _hosts.clear()
+        _hosts[host] = (version, tenant)
+    return tenant
+
+
+def usage(tenant, kind):
+    """Rows a tenant holds against one quota ('records' or 'categories')"""
+    from .models import Copyright, IntellectualProperty, IPCategory, PatentFiled, PatentGranted
+    if kind == 'categories':
+        return IPCategory.objects.unscoped().filter(tenant=tenant).count()
+    return sum(
+        model.objects.unscoped().filter(tenant=tenant).count()
+        for model in (Copyright, PatentFiled, PatentGranted, IntellectualProperty)
+    )
+
+
+def check_quota(tenant, kind, adding=1):
+    """
+    Raise QuotaExceeded if ``adding`` more rows of ``kind`` ('records' or
+    'categories') would take the tenant past its limit. Returns the number
+    of rows still allowed (None for no limit).
+    """
+    limit = getattr(tenant, f'max_{kind}', None)
+    if limit is None:
+        return None
+    used = usage(tenant, kind)
+    if used + adding > limit:
+        raise QuotaExceeded(f'{tenant.name} is limited to {limit} {kind} ({used} in use)')
+    return limit - used
@@ -1,3 +1,963 @@
-from django.test import TestCase
+import gzip
+import json
+import re
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+from . import (
+    alerts, changelog, history, ip_schema, readstore, registry, schema_migration, similarity, snapshots, spreadsheets,
+    suggest, task_queue, tenants, throttling, topics,
+)
+from .middleware import CompressionMiddleware
+from .models import (
+    BackgroundTask, CategorySchemaMigration, ChangeLogEntry, Copyright, IPCategory, IntellectualProperty, PatentFiled,
+    PatentGranted, PatentLifecycle, RecordVersion, SearchAlert, SuggestTerm, Tenant, Topic,
+)
+from .tables import TABLES
+from .tenants import tenant_context
+
+
+class PatentsTestCase(TestCase):
+    """
+    Tests run with an in-memory cache, throttling and the read store off, and
+    index, snapshot and analytics files in a temporary directory.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.files = Path(tempfile.mkdtemp())
+        cls.settings_override = override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+            PATENTS_THROTTLING=False,
+            PATENTS_READ_STORE=False,
+            PATENTS_VECTOR_DIR=cls.files / 'vectors',
+            PATENTS_BACKUP_DIR=cls.files / 'backups',
+            PATENTS_ANALYTICS_DIR=cls.files / 'analytics',
+        )
+        cls.settings_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.settings_override.disable()
+        shutil.rmtree(cls.files, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        # Created by the tenants migration
+        cls.tenant = Tenant.objects.get(slug='iiest')
+
+    def setUp(self):
+        cache.clear()
+        self.scope = tenant_context(self.tenant)
+        self.scope.__enter__()
+        self.addCleanup(self.scope.__exit__, None, None, None)
+
+
+@override_settings(ALLOWED_HOSTS=['.example.org'])
+class TenantIsolationTests(PatentsTestCase):
+    home = 'iiest.example.org'
+    other_host = 'other.example.org'
+
+    def setUp(self):
+        super().setUp()
+        self.other = Tenant.objects.create(name='Other Institute', slug='other', domain=self.other_host)
+        self.patent = PatentFiled.objects.create(title='Perovskite solar cell', abstract='Thin film absorber')
+
+    def test_records_of_another_tenant_are_not_found(self):
+        for url in [
+            f'/patents/filed/{self.patent.pk}/update/',
+            f'/patents/filed/{self.patent.pk}/delete/',
+            f'/history/filed/{self.patent.pk}/',
+            f'/related/filed/{self.patent.pk}/',
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, HTTP_HOST=self.home).status_code, 200)
+                self.assertEqual(self.client.get(url, HTTP_HOST=self.other_host).status_code, 404)
+        self.assertContains(self.client.get('/patents/filed/', HTTP_HOST=self.home), 'Perovskite solar cell')
+        self.assertNotContains(self.client.get('/patents/filed/', HTTP_HOST=self.other_host), 'Perovskite solar cell')
+
+        self.client.post(f'/patents/filed/{self.patent.pk}/delete/', HTTP_HOST=self.other_host)
+        self.assertTrue(PatentFiled.objects.filter(pk=self.patent.pk).exists())
+
+    def test_save_stamps_the_active_tenant(self):
+        self.assertEqual(self.patent.tenant_id, self.tenant.pk)
+        with tenant_context(self.other):
+            other = PatentFiled.objects.create(title='Solar panel mount')
+            category = IPCategory.objects.create(name='Gadgets')
+            item = IntellectualProperty.objects.create(category=category, data={'title': 'Gadget'})
+            self.assertEqual(list(PatentFiled.objects.values_list('pk', flat=True)), [other.pk])
+        self.assertEqual((other.tenant_id, category.tenant_id, item.tenant_id), (self.other.pk,) * 3)
+        # Outside a request rows go to the default tenant; an explicit tenant is kept
+        with tenant_context(None):
+            self.assertEqual(PatentFiled.objects.create(title='Wind turbine').tenant_id, self.tenant.pk)
+            self.assertEqual(PatentFiled.objects.create(title='Wind blade', tenant=self.other).tenant_id, self.other.pk)
+
+    def test_unscoped_callers_filter_by_tenant(self):
+        with tenant_context(self.other):
+            twin = PatentFiled.objects.create(title='Perovskite solar cell', abstract='Thin film absorber')
+            with self.captureOnCommitCallbacks(execute=True):
+                alerts.save_search('Solar', 'filed', {'title': 'solar'})
+            PatentFiled.objects.create(title='Solar panel mount')
+        PatentFiled.objects.create(title='Solar cell coating')
+        similarity.rebuild(self.tenant)
+        similarity.rebuild(self.other)
+
+        self.assertEqual(tenants.usage(self.tenant, 'records'), 2)
+        self.assertEqual(tenants.usage(self.other, 'records'), 2)
+        self.assertEqual(SearchAlert.objects.unscoped().filter(tenant=self.tenant).count(), 0)
+        self.assertEqual(SearchAlert.objects.unscoped().filter(tenant=self.other).count(), 1)
+        self.assertNotIn(twin.pk, [pk for _, pk, _ in similarity.related(self.tenant.pk, 'filed', self.patent.pk)])
+        self.assertEqual(similarity.related(self.other.pk, 'filed', self.patent.pk), [])
+        self.assertEqual(history.versions(self.other.pk, 'filed', self.patent.pk), [])
+        self.assertEqual(
+            suggest.suggest(self.other.pk, 'filed', 'title', 'perov'), ['Perovskite solar cell'],
+        )
+        self.assertEqual(
+            set(SuggestTerm.objects.unscoped().filter(term='solar cell coating').values_list('tenant', flat=True)),
+            {self.tenant.pk},
+        )
+
+    def test_quota_rejects_a_create(self):
+        self.other.max_records = 1
+        self.other.save()
+        data = {'title': 'Solar panel mount'}
+        response = self.client.post('/patents/filed/create/', data, HTTP_HOST=self.other_host)
+        self.assertRedirects(response, '/patents/filed/', fetch_redirect_response=False)
+        response = self.client.post('/patents/filed/create/', {'title': 'Wind turbine'}, HTTP_HOST=self.other_host)
+        self.assertContains(response, 'Other Institute is limited to 1 records (1 in use)')
+        self.assertEqual(tenants.usage(self.other, 'records'), 1)
+        with self.assertRaises(tenants.QuotaExceeded):
+            tenants.check_quota(self.other, 'records')
+        # The limit is the other tenant's alone
+        self.assertIsNone(tenants.check_quota(self.tenant, 'records'))
+
+
+class RowWindowTests(PatentsTestCase):
+    def setUp(self):
+        super().setUp()
+        for number, title in enumerate(['Delta', 'Alpha', 'Echo', 'Charlie', 'Bravo'], start=1):
+            PatentFiled.objects.create(sl_no=number, title=title)
+        self.category = IPCategory.objects.create(
+            name='Gadgets', field_definitions=[{'name': 'title', 'label': 'Title', 'type': 'text'}],
+        )
+        for title in ['Lathe', 'Drill', 'Anvil']:
+            IntellectualProperty.objects.create(category=self.category, data={'title': title})
+
+    def _get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        titles = re.findall(r'<td>([A-Z][a-z]+)</td>', data.pop('html'))
+        return titles, data
+
+    def test_windows(self):
+        url = '/tables/filed/rows/'
+        titles, data = self._get(url, sort='title', offset=0, limit=2)
+        self.assertEqual(titles, ['Alpha', 'Bravo'])
+        self.assertEqual(data, {'offset': 0, 'count': 2, 'has_more': True, 'total': 5})
+        titles, data = self._get(url, sort='title', offset=2, limit=2)
+        self.assertEqual((titles, data), (['Charlie', 'Delta'], {'offset': 2, 'count': 2, 'has_more': True}))
+        titles, data = self._get(url, sort='title', dir='desc', offset=4, limit=2)
+        self.assertEqual((titles, data), (['Alpha'], {'offset': 4, 'count': 1, 'has_more': False}))
+
+        # Out of range and malformed values are clamped
+        self.assertEqual(self._get(url, offset=-3, limit=0)[1], {'offset': 0, 'count': 1, 'has_more': True, 'total': 5})
+        self.assertEqual(self._get(url, offset='x', limit='y')[1]['count'], 5)
+
+    def test_unknown_sort_keeps_the_default_order(self):
+        titles, _ = self._get('/tables/filed/rows/', sort='abstract', dir='asc')
+        self.assertEqual(titles, ['Bravo', 'Charlie', 'Echo', 'Alpha', 'Delta'])
+        self.assertEqual(self.client.get('/tables/abstracts/rows/').status_code, 404)
+
+    def test_ip_windows(self):
+        url = f'/ip/{self.category.slug}/rows/'
+        titles, data = self._get(url, sort='title', offset=1, limit=1)
+        self.assertEqual((titles, data), (['Drill'], {'offset': 1, 'count': 1, 'has_more': True}))
+        self.assertEqual(self._get(url, sort='title', dir='desc')[0], ['Lathe', 'Drill', 'Anvil'])
+        self.assertEqual(self._get(url, sort='category__tenant')[0], ['Anvil', 'Drill', 'Lathe'])
+
+
+class ChangeFeedTests(PatentsTestCase):
+    def _lines(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def test_invalid_parameters(self):
+        for params in [{'since': 'abc'}, {'limit': '1.5'}, {'table': 'abstracts'}]:
+            with self.subTest(params=params):
+                response = self.client.get('/changes/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    @mock.patch.object(changelog, 'FEED_CHUNK_SIZE', 2)
+    def test_resume_from_the_last_seq(self):
+        patents = [PatentFiled.objects.create(title=f'Patent {n}') for n in range(5)]
+        patents[0].title = 'Patent 0 revised'
+        patents[0].save()
+        Copyright.objects.create(title='Lab manual')
+
+        response = self.client.get('/changes/', {'since': -1, 'limit': 3})
+        head = int(response['X-Change-Log-Head'])
+        first = self._lines(response)
+        self.assertEqual([line['id'] for line in first], [p.pk for p in patents[:3]])
+        rest = self._lines(self.client.get('/changes/', {'since': first[-1]['seq']}))
+        self.assertEqual(
+            [(line['table'], line['id'], line['action']) for line in rest],
+            [('filed', patents[3].pk, 'upsert'), ('filed', patents[4].pk, 'upsert'),
+             ('filed', patents[0].pk, 'upsert'), ('copyrights', Copyright.objects.get().pk, 'upsert')],
+        )
+        self.assertEqual(rest[-1]['seq'], head)
+        self.assertEqual(rest[2]['data']['title'], 'Patent 0 revised')
+
+        filed = self._lines(self.client.get('/changes/', {'table': 'filed', 'limit': 100000000}))
+        self.assertEqual(len(filed), 6)
+        self.assertEqual(self._lines(self.client.get('/changes/', {'since': head})), [])
+
+
+class SnapshotTests(PatentsTestCase):
+    def test_columnar_round_trip_keeps_record_versions(self):
+        patent = PatentFiled.objects.create(title='Solar cell', application_number='201831000001', abstract='A cell')
+        patent.title = 'Solar cell with coating'
+        patent.save()
+        before = list(RecordVersion.objects.order_by('version').values_list('version', 'kind', 'data'))
+        self.assertEqual([kind for _, kind, _ in before], ['checkpoint', 'delta'])
+
+        path = self.files / 'export.zip'
+        snapshots.export_columnar(path)
+        binary = {entry['table']: entry['binary'] for entry in snapshots.read_manifest(path)['tables']}
+        self.assertEqual(binary[RecordVersion._meta.db_table], ['data'])
+        RecordVersion.objects.unscoped().all().delete()
+        snapshots.import_columnar(path)
+
+        after = list(RecordVersion.objects.order_by('version').values_list('version', 'kind', 'data'))
+        self.assertEqual([(v, k, bytes(d)) for v, k, d in after], [(v, k, bytes(d)) for v, k, d in before])
+        self.assertEqual(len(history.versions(self.tenant.pk, 'filed', patent.pk)), 2)
+        version, state = history.as_of(self.tenant.pk, 'filed', patent.pk, timezone.now())
+        self.assertEqual((version, state['title']), (2, 'Solar cell with coating'))
+
+
+class RecordHistoryTests(PatentsTestCase):
+    def test_updates_continue_the_stored_history(self):
+        patent = PatentFiled.objects.create(title='Solar cell', application_number='201831000002')
+        for title in ['Solar cell array', 'Solar cell stack']:
+            patent.title = title
+            patent.save()
+        self.assertEqual([v['kind'] for v in history.versions(self.tenant.pk, 'filed', patent.pk)], [
+            'delta', 'delta', 'checkpoint',
+        ])
+
+    def test_row_saved_before_history_gets_a_checkpoint(self):
+        patent = PatentFiled.objects.create(title='Solar cell', application_number='201831000003')
+        RecordVersion.objects.unscoped().all().delete()
+        patent = PatentFiled.objects.get(pk=patent.pk)
+        patent.title = 'Solar cell array'
+        patent.save()
+
+        rows = history.versions(self.tenant.pk, 'filed', patent.pk)
+        self.assertEqual([(v['version'], v['kind'], v['fields']) for v in rows], [
+            (2, 'delta', ['title']),
+            (1, 'checkpoint', sorted(field.attname for field in history.history_fields(PatentFiled))),
+        ])
+        version, state = history.as_of(self.tenant.pk, 'filed', patent.pk, timezone.now())
+        self.assertEqual((version, state['title']), (2, 'Solar cell array'))
+
+
+class LifecycleLinkTests(PatentsTestCase):
+    def _links(self):
+        return list(PatentLifecycle.objects.order_by('application_key').values_list(
+            'application_key', 'filed_id', 'granted_id', 'days_to_grant',
+        ))
+
+    def test_saves_refresh_the_links_they_affect(self):
+        filed = PatentFiled.objects.create(
+            title='Solar cell', application_number='202331002921', date_of_filing='14.01.2023',
+        )
+        granted = PatentGranted.objects.create(
+            title='Solar cell', application_number='202331002921 dated 14.01.2023', date_of_grant='24.01.2023',
+        )
+        self.assertEqual(self._links(), [('202331002921', filed.pk, granted.pk, 10)])
+
+        filed.date_of_filing = '04.01.2023'
+        filed.save()
+        self.assertEqual(self._links(), [('202331002921', filed.pk, granted.pk, 20)])
+
+        granted.application_number = '202331009999'
+        granted.save()
+        self.assertEqual(self._links(), [
+            ('202331002921', filed.pk, None, None), ('202331009999', None, granted.pk, None),
+        ])
+
+        filed.delete()
+        self.assertEqual(self._links(), [('202331009999', None, granted.pk, None)])
+
+    def test_other_edits_leave_the_links_alone(self):
+        filed = PatentFiled.objects.create(title='Solar cell', application_number='202331002921')
+        updated_at = PatentLifecycle.objects.get().updated_at
+        filed.title = 'Solar cell array'
+        filed.save()
+        self.assertEqual(PatentLifecycle.objects.get().updated_at, updated_at)
+
+
+    def test_report_grant_rate_is_the_share_of_filings(self):
+        for number in ('201931000001', '201931000002'):
+            PatentFiled.objects.create(title='Solar cell', application_number=number, date_of_filing='12.03.2019')
+        for number in ('201931000001', '201931000003'):
+            PatentGranted.objects.create(title='Solar cell', application_number=number, date_of_grant='12.03.2021')
+
+        response = self.client.get('/analytics/lifecycle/')
+        year = response.context['years'][0]
+        self.assertEqual(
+            (year['filing_year'], year['filings'], year['grants'], year['grants_without_filing'], year['grant_rate']),
+            (2019, 2, 1, 1, 50),
+        )
+        self.assertEqual(response.context['totals']['grant_rate'], 50)
+
+
+class TopicAssignmentTests(PatentsTestCase):
+    def _cluster(self):
+        for title in ['Solar cell coating', 'Solar panel coating', 'Protein folding assay', 'Protein binding assay']:
+            PatentFiled.objects.create(title=title)
+        return topics.cluster(self.tenant, k=2)
+
+    def test_new_record_gets_nearest_topic(self):
+        self._cluster()
+        patent = PatentFiled.objects.create(title='Solar coating')
+        self.assertIn(patent.topic_id, set(Topic.objects.values_list('pk', flat=True)))
+
+    def test_files_of_another_database_are_ignored(self):
+        self._cluster()
+        # As on a fresh or restored database: the files name topics it does not have
+        Topic.objects.unscoped().all().delete()
+        topics.invalidate(self.tenant.pk)
+        patent = PatentFiled.objects.create(title='Solar coating')
+        self.assertIsNone(patent.topic_id)
+        self.assertIsNone(topics.load_model(self.tenant.pk))
+
+    def test_drop_model(self):
+        self._cluster()
+        topics.drop_model(self.tenant.pk)
+        self.assertIsNone(topics.load_model(self.tenant.pk))
+        self.assertIsNone(PatentFiled.objects.create(title='Solar coating').topic_id)
+
+
+class FacetParameterTests(PatentsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.old = PatentFiled.objects.create(title='Old coating', date_of_filing='12.03.2019')
+        self.new = PatentFiled.objects.create(title='New coating', date_of_filing='01.02.2024')
+
+    def _get(self, url, read_store=False):
+        with override_settings(PATENTS_READ_STORE=read_store):
+            return self.client.get(url)
+
+    def test_invalid_values_are_ignored(self):
+        for read_store in (False, True):
+            for url in [
+                '/patents/filed/search/?facet_year=abc',
+                '/patents/filed/search/?facet_topic=abc',
+                '/patents/filed/search/?facet_year=99999999999999999999',
+                '/patents/granted/search/?facet_topic=1x',
+                '/tables/filed/rows/?facet_year=abc&facet_topic=abc',
+            ]:
+                with self.subTest(url=url, read_store=read_store):
+                    response = self._get(url, read_store)
+                    self.assertEqual(response.status_code, 200)
+                    if url.startswith('/patents/filed/'):
+                        self.assertContains(response, 'Old coating')
+                        self.assertContains(response, 'New coating')
+
+    def test_valid_values_filter(self):
+        for read_store in (False, True):
+            with self.subTest(read_store=read_store):
+                response = self._get('/patents/filed/search/?facet_year=2024', read_store)
+                self.assertContains(response, 'New coating')
+                self.assertNotContains(response, 'Old coating')
+
+
+class ReadStoreOrderTests(PatentsTestCase):
+    """The read store lists rows in the order the database gives for the same query"""
+
+    def setUp(self):
+        super().setUp()
+        values = [
+            ('Solar cell', '12.03.2019', 3), ('solar cell', '12.03.2019', None), ('Solar cell', None, 3),
+            ('', '01.02.2024', 1), (None, '01.02.2024', None), ('Zinc oxide', '', 2), ('Ämter', 'Dec 2020', 2),
+        ]
+        # Every value twice, so ties are broken by pk
+        for title, date, number in values + values:
+            Copyright.objects.create(title=title, year=date, sl_no=number)
+            PatentFiled.objects.create(
+                title=title, date_of_filing=date, sl_no=number, application_number=date, date_of_publication=title,
+            )
+            PatentGranted.objects.create(
+                title=title, date_of_grant=date, sl_no=number, granted_patent_no=title, application_number=date,
+            )
+
+    def _pks(self, rows):
+        return [row.pk for row in rows]
+
+    def test_every_sort_matches_the_database(self):
+        for name, spec in TABLES.items():
+            for params in [{}, {'title': 'solar'}]:
+                for sort in spec.sort_fields:
+                    for direction in ('asc', 'desc'):
+                        with self.subTest(table=name, params=params, sort=sort, direction=direction):
+                            queryset = spec.order(spec.filter(spec.base_queryset(), params), sort, direction)
+                            with override_settings(PATENTS_READ_STORE=True):
+                                stored = spec.order(spec.filter(spec.rows(), params), sort, direction)
+                            self.assertIsInstance(stored, readstore.StoredRows)
+                            self.assertEqual(self._pks(stored), self._pks(queryset))
+
+
+class ImportIPTests(PatentsTestCase):
+    def _import(self, name, content, *args, **options):
+        path = self.files / name
+        path.write_text(content, encoding='utf-8')
+        out = StringIO()
+        call_command('import_ip', str(path), *args, stdout=out, **options)
+        return out.getvalue()
+
+    def test_batches_log_changes_and_checkpoints(self):
+        rows = ''.join(f'Gadget {i},Lab {i % 3},{2000 + i}\n' for i in range(7))
+        self._import('items.csv', 'Title,Owner,Year\n' + rows, create_category='Gadgets', batch_size=3)
+
+        items = list(IntellectualProperty.objects.order_by('pk'))
+        self.assertEqual([item.data['title'] for item in items], [f'Gadget {i}' for i in range(7)])
+        entries = {entry.object_id: entry.data for entry in ChangeLogEntry.objects.filter(table='ip')}
+        for item in items:
+            expected = history._normalized(changelog.serialize(item))
+            logged = entries[item.pk]
+            for name in ('created_at', 'updated_at'):
+                self.assertEqual(parse_datetime(logged.pop(name)), parse_datetime(expected.pop(name)))
+            self.assertEqual(logged, expected)
+            version, state = history.as_of(self.tenant.pk, 'ip', item.pk, timezone.now())
+            self.assertEqual((version, state), (1, history.snapshot(item)))
+
+    def test_bad_ndjson_lines_are_reported_and_skipped(self):
+        content = '\n'.join([
+            '{"Title": "Gadget 0", "Owner": "Lab A"',
+            '{"Title": "Gadget 1", "Owner": "Lab A"}',
+            '',
+            '["Gadget 2", "Lab B"]',
+            '{"Title": "Gadget 3", "Owner": "Lab B"}',
+            'not json',
+            '{"Title": "Gadget 4", "Owner": "Lab C"}',
+        ]) + '\n'
+        out = self._import('items.ndjson', content, create_category='Gadgets', batch_size=2)
+
+        titles = sorted(item.data['title'] for item in IntellectualProperty.objects.all())
+        self.assertEqual(titles, ['Gadget 1', 'Gadget 3', 'Gadget 4'])
+        self.assertIn('Skipped row 1: invalid JSON', out)
+        self.assertIn('Skipped row 4: not a JSON object', out)
+        self.assertIn('Skipped row 6: invalid JSON', out)
+        self.assertIn('Imported 3 items into "Gadgets" (3 skipped)', out)
+
+    def test_ndjson_keys_after_the_first_line_are_mapped_or_reported(self):
+        IPCategory.objects.create(name='Gadgets', field_definitions=[
+            {'name': 'title', 'label': 'Title', 'type': 'text'}, {'name': 'owner', 'label': 'Owner', 'type': 'text'},
+        ])
+        content = '\n'.join([
+            '{"Title": "Gadget 0"}',
+            '{"Title": "Gadget 1", "Owner": "Lab A", "Colour": "red"}',
+            '{"Title": "Gadget 2", "Colour": "blue"}',
+        ]) + '\n'
+        out = self._import('items.ndjson', content, category='gadgets')
+
+        items = IntellectualProperty.objects.order_by('pk')
+        self.assertEqual([item.data for item in items], [
+            {'title': 'Gadget 0'}, {'title': 'Gadget 1', 'owner': 'Lab A'}, {'title': 'Gadget 2'},
+        ])
+        self.assertEqual(out.count('Ignoring unmapped column'), 1)
+        self.assertIn('Ignoring unmapped column "Colour" first seen on row 2', out)
+
+    def test_file_without_objects_cannot_create_a_category(self):
+        with self.assertRaisesMessage(CommandError, 'Cannot create a category from an empty header'):
+            self._import('items.ndjson', '[1, 2]\n\n', create_category='Gadgets')
+
+
+class SpreadsheetImportTests(PatentsTestCase):
+    def _import(self, path):
+        out = StringIO()
+        call_command('import_csv', str(path), stdout=out)
+        return out.getvalue()
+
+    def test_cell_text(self):
+        for value, text in [
+            (None, ''), (3.0, '3'), (2.5, '2.5'), (7, '7'), (' Solar cell ', 'Solar cell'),
+            (datetime(2023, 1, 14, 0, 0), '14.01.2023'), (date(2019, 3, 12), '12.03.2019'),
+        ]:
+            with self.subTest(value=value):
+                self.assertEqual(spreadsheets.cell_text(value), text)
+
+    @skipUnless(openpyxl, 'Reading .xlsx files needs openpyxl')
+    def test_workbook_sheets_are_matched_by_their_headings(self):
+        workbook = openpyxl.Workbook()
+        granted = workbook.active
+        granted.title = 'Sheet A'
+        granted.append(['Patents granted to the institute'])
+        granted.append([])
+        granted.append(['Title of Patent', 'Date of Grant', 'Sl. No.', 'Granted Patent No.', 'Application Number'])
+        granted.append(['Solar cell', datetime(2023, 1, 24), 1.0, 512345.0, '202331002921'])
+        notes = workbook.create_sheet('Notes')
+        notes.append(['Exported from the records office'])
+        filed = workbook.create_sheet('Sheet B')
+        filed.append([
+            'Sl No', 'Application Number', 'Date of Filing', 'Title of Patent', 'Inventor(s)/Faculty/Student',
+        ])
+        filed.append([2019])
+        filed.append([1, '201931000001', date(2019, 3, 12), 'Protein assay', 'A. Roy'])
+        filed.append([None, None, None, None, None])
+        filed.append([2.0, '201931000002', '14.05.2019', 'Solar panel mount', 'B. Sen'])
+        path = self.files / 'records.xlsx'
+        workbook.save(path)
+
+        out = self._import(path)
+        self.assertIn('Skipping Notes', out)
+        self.assertEqual(
+            list(PatentGranted.objects.values_list('sl_no', 'granted_patent_no', 'date_of_grant', 'title')),
+            [(1, '512345', '24.01.2023', 'Solar cell')],
+        )
+        self.assertEqual(
+            list(PatentFiled.objects.order_by('sl_no').values_list('sl_no', 'date_of_filing', 'title', 'inventors')),
+            [(1, '12.03.2019', 'Protein assay', 'A. Roy'), (2, '14.05.2019', 'Solar panel mount', 'B. Sen')],
+        )
+        self.assertFalse(Copyright.objects.exists())
+
+    def test_csv_sheet(self):
+        path = self.files / 'copyrights.csv'
+        path.write_text('\n'.join([
+            'Copyrights,,,',
+            'Sl No,Year,Title of Copy rights,Name of Faculty/Students',
+            '2021,,,',
+            '1,2021,Campus map software,A. Roy',
+            ',,,',
+            '2,2021,Lab manual,B. Sen',
+        ]) + '\n', encoding='utf-8')
+
+        self._import(path)
+        self.assertEqual(
+            list(Copyright.objects.order_by('sl_no').values_list('sl_no', 'year', 'title', 'faculty_students')),
+            [(1, '2021', 'Campus map software', 'A. Roy'), (2, '2021', 'Lab manual', 'B. Sen')],
+        )
+        self.assertFalse(PatentFiled.objects.exists())
+
+
+class SimilarityTests(PatentsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cell = PatentFiled.objects.create(title='Perovskite solar cell', abstract='Thin film perovskite absorber')
+        self.panel = PatentFiled.objects.create(title='Solar panel mount', abstract='Tracking frame for panels')
+        self.assay = PatentFiled.objects.create(title='Protein assay', abstract='Binding assay for antibodies')
+        similarity.rebuild(self.tenant)
+
+    def _related(self, pk):
+        related = similarity.related(self.tenant.pk, 'filed', pk)
+        return [(scope, match, round(score, 5)) for scope, match, score in related]
+
+    def test_saves_are_applied_without_reloading(self):
+        index = similarity.load_index(self.tenant.pk)
+        version = similarity._current_version(self.tenant.pk)
+        before = [r[:2] for r in self._related(self.cell.pk)]
+        self.assertIn(('filed', self.panel.pk), before)
+        self.assertNotIn(('filed', self.assay.pk), before)
+
+        panel_pk = self.panel.pk
+        self.assay.title = 'Perovskite film assay'
+        self.assay.save()
+        added = PatentFiled.objects.create(title='Perovskite absorber coating', abstract='Thin film')
+        self.panel.delete()
+
+        self.assertEqual(similarity._current_version(self.tenant.pk), version)
+        caught_up = self._related(self.cell.pk)
+        self.assertIs(similarity.load_index(self.tenant.pk), index)
+        matches = [r[:2] for r in caught_up]
+        self.assertIn(('filed', self.assay.pk), matches)
+        self.assertIn(('filed', added.pk), matches)
+        self.assertNotIn(('filed', panel_pk), matches)
+
+        # The same as an index loaded from scratch
+        similarity.invalidate(self.tenant.pk)
+        self.assertEqual(self._related(self.cell.pk), caught_up)
+        self.assertNotIn(('filed', self.cell.pk), [r[:2] for r in self._related(self.cell.pk)])
+
+    @mock.patch.object(similarity, 'MIN_REBUILD_DELTAS', 2)
+    @mock.patch.object(similarity, 'REBUILD_CHECK_EVERY', 3)
+    def test_deltas_are_counted_every_few_saves(self):
+        rebuilds = BackgroundTask.objects.filter(name='rebuild_similarity_index')
+        cache.delete(similarity.SAVES_KEY.format(self.tenant.pk))
+        PatentFiled.objects.create(title='Solar tracker')
+        PatentFiled.objects.create(title='Solar inverter')
+        self.assertFalse(rebuilds.exists())
+        PatentFiled.objects.create(title='Solar battery')
+        self.assertEqual(rebuilds.count(), 1)
+        for title in ['Wind turbine', 'Wind blade', 'Wind tower']:
+            PatentFiled.objects.create(title=title)
+        self.assertEqual(rebuilds.count(), 1)
+
+
+class SuggestTermTests(PatentsTestCase):
+    def _weights(self):
+        return set(SuggestTerm.objects.filter(scope='filed').values_list('field', 'term', 'weight'))
+
+    def test_saves_keep_the_weights_of_a_rebuild(self):
+        first = PatentFiled.objects.create(title='Solar cell coating', inventors='A. Roy, B. Sen')
+        second = PatentFiled.objects.create(title='Solar cell', inventors='A. Roy')
+        PatentFiled.objects.create(title='Protein assay', inventors='C. Das and B. Sen')
+        first.title = 'Solar panel coating'
+        first.inventors = 'B. Sen'
+        first.save()
+        second.delete()
+
+        saved = self._weights()
+        suggest.rebuild('filed')
+        self.assertEqual(saved, self._weights())
+        self.assertNotIn(('title', 'cell', 1), saved)
+        self.assertIn(('inventors', 'b. sen', 2), saved)
+
+    def test_weight_updates_use_the_term_index(self):
+        patent = PatentFiled.objects.create(title='Solar cell coating', inventors='A. Roy, B. Sen')
+        with CaptureQueriesContext(connection) as queries:
+            patent.title = 'Solar panel coating'
+            patent.inventors = 'B. Sen'
+            patent.save()
+        table = SuggestTerm._meta.db_table
+        inserts = [q['sql'] for q in queries if q['sql'].startswith(f'INSERT INTO {table}')]
+        updates = [q['sql'] for q in queries if q['sql'].startswith(f'UPDATE "{table}"')]
+        self.assertEqual((len(inserts), len(updates)), (1, 2))
+        for sql in updates:
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plan = ' '.join(row[-1] for row in cursor.fetchall())
+            self.assertIn('term=?', plan)
+
+    def test_saves_keep_cached_lookups_until_they_expire(self):
+        PatentFiled.objects.create(title='Solar cell')
+        self.assertEqual(suggest.suggest(self.tenant.pk, 'filed', 'title', 'sol'), ['Solar cell'])
+        PatentFiled.objects.create(title='Solar panel')
+        PatentFiled.objects.create(title='Solar panel mount', inventors='A. Roy')
+        self.assertEqual(suggest.suggest(self.tenant.pk, 'filed', 'title', 'sol'), ['Solar cell'])
+
+        with mock.patch.object(suggest.time, 'monotonic', return_value=suggest.time.monotonic() + suggest.LRU_TTL):
+            self.assertEqual(
+                suggest.suggest(self.tenant.pk, 'filed', 'title', 'sol'),
+                ['Solar cell', 'Solar panel', 'Solar panel mount'],
+            )
+        # A rebuild drops them at once
+        suggest.rebuild('filed')
+        self.assertEqual(len(suggest.suggest(self.tenant.pk, 'filed', 'title', 'sol')), 3)
+
+
+class SavedSearchAlertTests(PatentsTestCase):
+    def _alerted(self):
+        return set(SearchAlert.objects.values_list('search__name', 'object_id'))
+
+    def test_saved_records_alert_matching_searches(self):
+        alerts.save_search('Solar', 'filed', {'title': 'solar cell'})
+        alerts.save_search('2024', 'filed', {'facet_year': '2024'})
+        solar = PatentFiled.objects.create(title='Perovskite solar cell', date_of_filing='12.03.2019')
+        recent = PatentFiled.objects.create(title='Protein assay', date_of_filing='01.02.2024')
+        self.assertEqual(self._alerted(), {('Solar', solar.pk), ('2024', recent.pk)})
+
+        # A search saved after the key fields were cached is found too
+        alerts.save_search('Assay', 'filed', {'title': 'assay'})
+        recent.abstract = 'Binding assay'
+        recent.save()
+        self.assertEqual(self._alerted(), {('Solar', solar.pk), ('2024', recent.pk), ('Assay', recent.pk)})
+
+    def test_no_saved_searches_no_lookup(self):
+        patent = PatentFiled.objects.create(title='Solar cell')
+        self.assertEqual(alerts.candidates('filed', patent), [])
+        with self.assertNumQueries(0):
+            alerts.candidates('filed', patent)
+
+
+class VersionTokenTests(PatentsTestCase):
+    """Tokens change only once the write commits, so no worker caches the old row under the new token"""
+
+    def test_category_registry(self):
+        category = IPCategory.objects.create(name='Gadgets')
+        self.assertEqual(registry.get_category(category.slug).name, 'Gadgets')
+        version = registry.current_version(self.tenant.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            category.name = 'Gadgets and tools'
+            category.save()
+            self.assertEqual(registry.current_version(self.tenant.pk), version)
+        self.assertNotEqual(registry.current_version(self.tenant.pk), version)
+        self.assertEqual(registry.get_category(category.slug).name, 'Gadgets and tools')
+
+    def test_tenant_hosts(self):
+        version = tenants.current_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Tenant.objects.create(name='Other Institute', slug='other')
+            self.assertEqual(tenants.current_version(), version)
+        self.assertNotEqual(tenants.current_version(), version)
+
+    def test_saved_search_fields(self):
+        alerts.key_fields(self.tenant.pk, 'filed')
+        with self.captureOnCommitCallbacks(execute=True):
+            alerts.save_search('Solar', 'filed', {'title': 'solar cell'})
+            self.assertEqual(alerts.key_fields(self.tenant.pk, 'filed'), set())
+        self.assertEqual(alerts.key_fields(self.tenant.pk, 'filed'), {'title'})
+
+
+class SaveQueryTests(PatentsTestCase):
+    def test_update_query_count(self):
+        alerts.save_search('Solar', 'filed', {'title': 'solar cell'})
+        patent = PatentFiled.objects.create(
+            title='Perovskite solar cell', application_number='202331002921', abstract='Thin film absorber',
+        )
+        # The stored row, the update, the removed and added suggestion terms (two statements and one), the
+        # similarity delta, the saved search candidates, the alert, the change log entry and the version
+        with self.assertNumQueries(10):
+            patent.title = 'Perovskite solar cell array'
+            patent.save()
+
+
+class TaskClaimTests(PatentsTestCase):
+    def test_concurrency_limit_holds_in_the_claim(self):
+        first = task_queue.enqueue('category_schema_migration')
+        second = task_queue.enqueue('category_schema_migration')
+        self.assertEqual(task_queue.claim_next('worker-1').pk, first.pk)
+        self.assertIsNone(task_queue.claim_next('worker-2'))
+        # As for a worker that read the candidates before the first claim
+        now = timezone.now()
+        self.assertEqual(task_queue._claim(second.pk, second.name, 'worker-2', now), 0)
+
+        BackgroundTask.objects.filter(pk=first.pk).update(status='done')
+        self.assertEqual(task_queue._claim(second.pk, second.name, 'worker-2', now), 1)
+        self.assertEqual(task_queue._claim(second.pk, second.name, 'worker-3', now), 0)
+        self.assertEqual(BackgroundTask.objects.get(pk=second.pk).locked_by, 'worker-2')
+
+
+    def test_tasks_of_dead_workers_are_requeued(self):
+        live = task_queue.enqueue('category_schema_migration')
+        dead = task_queue.enqueue('rebuild_similarity_index', tenant_id=self.tenant.pk)
+        self.assertEqual(task_queue.claim_next('host:1:0').pk, live.pk)
+        self.assertEqual(task_queue.claim_next('host:2:0').pk, dead.pk)
+        self.assertIsNone(task_queue.claim_next('host:1:1'))
+
+        past = timezone.now() - timedelta(seconds=120)
+        BackgroundTask.objects.filter(pk__in=[live.pk, dead.pk]).update(updated_at=past)
+        self.assertEqual(task_queue.renew_leases('host:1:'), 1)
+        self.assertEqual(task_queue.requeue_stale(60), 1)
+        self.assertEqual(BackgroundTask.objects.get(pk=live.pk).status, 'running')
+        self.assertEqual(task_queue.claim_next('host:1:1').pk, dead.pk)
+
+
+class CategorySchemaDiffTests(PatentsTestCase):
+    old = [{'name': 'a', 'label': 'A', 'type': 'text'}, {'name': 'b', 'label': 'B', 'type': 'text'}]
+    new = [{'name': 'b', 'label': 'B', 'type': 'text'}]
+
+    def test_rename_onto_a_removed_field(self):
+        operations = ip_schema.diff_field_definitions(self.old, self.new, {'a': 'b', 'b': 'b'})
+        self.assertEqual(operations, [{'op': 'remove', 'field': 'b'}, {'op': 'rename', 'field': 'a', 'to': 'b'}])
+        self.assertEqual(ip_schema.apply_operations({'a': 'A', 'b': 'OLD-B'}, operations, self.new), {'b': 'A'})
+        self.assertEqual(ip_schema.apply_operations({'b': 'OLD-B'}, operations, self.new), {})
+
+    def test_sql_and_python_paths_agree(self):
+        operations = ip_schema.diff_field_definitions(self.old, self.new, {'a': 'b'})
+        for use_sql in (True, False):
+            with self.subTest(use_sql=use_sql):
+                category = IPCategory.objects.create(name=f'Gadgets {use_sql}', field_definitions=self.old)
+                items = [
+                    IntellectualProperty.objects.create(category=category, data=data)
+                    for data in ({'a': 'A', 'b': 'OLD-B'}, {'b': 'OLD-B'}, {'a': 'A'})
+                ]
+                migration = CategorySchemaMigration.objects.create(
+                    category=category, operations=operations, field_definitions=self.new,
+                )
+                with mock.patch.object(schema_migration, '_can_use_sql', return_value=use_sql):
+                    self.assertEqual(schema_migration.apply_migration(migration).status, 'done')
+                self.assertEqual(
+                    [IntellectualProperty.objects.get(pk=item.pk).data for item in items], [{'b': 'A'}, {}, {'b': 'A'}],
+                )
+
+
+class SchemaMigrationClaimTests(PatentsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = IPCategory.objects.create(
+            name='Gadgets', field_definitions=[{'name': 'title', 'label': 'Title', 'type': 'text'}],
+        )
+        self.older, self.newer = [
+            CategorySchemaMigration.objects.create(
+                category=self.category, field_definitions=self.category.field_definitions,
+            )
+            for _ in range(2)
+        ]
+
+    def test_category_migrations_are_claimed_in_order(self):
+        self.assertEqual(schema_migration._claim(self.newer), 0)
+        CategorySchemaMigration.objects.filter(pk=self.older.pk).update(status='running')
+        self.assertEqual(schema_migration._claim(self.newer), 0)
+        self.assertEqual(schema_migration._claim(self.older), 0)
+
+    def test_failed_migration_holds_back_later_ones(self):
+        CategorySchemaMigration.objects.filter(pk=self.older.pk).update(status='failed')
+        self.assertEqual(schema_migration.run_pending_migrations(), [])
+        self.assertEqual(schema_migration.requeue(), 1)
+        self.assertEqual([m.pk for m in schema_migration.run_pending_migrations()], [self.older.pk, self.newer.pk])
+
+    def test_only_running_migrations_past_the_lease_are_requeued(self):
+        running = CategorySchemaMigration.objects.filter(pk=self.older.pk)
+        running.update(status='running')
+        self.assertEqual(schema_migration.requeue(), 0)
+        running.update(updated_at=timezone.now() - timedelta(seconds=schema_migration.RUNNING_LEASE + 1))
+        self.assertEqual(schema_migration.requeue(), 1)
+        self.assertEqual(running.get().status, 'pending')
+
+    def test_run_pending_migrations(self):
+        applied = schema_migration.run_pending_migrations()
+        self.assertEqual([(m.pk, m.status) for m in applied], [(self.older.pk, 'done'), (self.newer.pk, 'done')])
+        self.assertEqual(schema_migration.run_pending_migrations(), [])
+
+
+# A query of about a million SQLite VM steps
+HEAVY_QUERY = (
+    'WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 200000) SELECT COUNT(*) FROM n'
+)
+
+
+def heavy_query():
+    with connection.cursor() as cursor:
+        cursor.execute(HEAVY_QUERY)
+        return cursor.fetchone()[0]
+
+
+@override_settings(
+    PATENTS_THROTTLING=True,
+    PATENTS_RATE_LIMITS={'search': (100, 100)},
+    PATENTS_CLIENT_CONCURRENCY_LIMITS={'search': 1},
+    PATENTS_CONCURRENCY_LIMITS={'search': 2},
+    PATENTS_QUERY_BUDGETS={'search': 200_000},
+)
+class ThrottleTests(PatentsTestCase):
+    def _get(self, view, address='10.0.0.1'):
+        return view(RequestFactory().get('/', REMOTE_ADDR=address))
+
+    @staticmethod
+    @throttling.throttle('search', json=True)
+    def quick_view(request):
+        return JsonResponse({})
+
+    @staticmethod
+    @throttling.throttle('search', json=True)
+    def streamed_view(request):
+        return StreamingHttpResponse(iter(['rows']))
+
+    def test_slots_are_per_client(self):
+        held = self._get(self.streamed_view, '10.0.0.1')
+        self.assertEqual(self._get(self.quick_view, '10.0.0.1').status_code, 429)
+        self.assertEqual(self._get(self.quick_view, '10.0.0.2').status_code, 200)
+        self.assertEqual(self._get(self.quick_view, '10.0.0.2').status_code, 200)
+        # Sending the body frees the slot
+        list(held.streaming_content)
+        self.assertEqual(self._get(self.quick_view, '10.0.0.1').status_code, 200)
+
+    def test_deployment_wide_slots(self):
+        held = [self._get(self.streamed_view, address) for address in ('10.0.0.1', '10.0.0.2')]
+        response = self._get(self.quick_view, '10.0.0.3')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+        for response in held:
+            list(response.streaming_content)
+        self.assertEqual(self._get(self.quick_view, '10.0.0.3').status_code, 200)
+
+    @override_settings(PATENTS_RATE_LIMITS={'search': (1, 2)})
+    def test_empty_bucket(self):
+        for status in (200, 200, 429):
+            self.assertEqual(self._get(self.quick_view).status_code, status)
+        self.assertEqual(self._get(self.quick_view, '10.0.0.2').status_code, 200)
+
+    def test_query_budget(self):
+        @throttling.throttle('search', json=True)
+        def view(request):
+            return JsonResponse({'n': heavy_query()})
+
+        self.assertEqual(self._get(view).status_code, 429)
+        with override_settings(PATENTS_QUERY_BUDGETS={'search': 20_000_000}):
+            self.assertEqual(self._get(view).status_code, 200)
+
+    def test_streamed_body_spends_the_query_budget(self):
+        @throttling.throttle('search', json=True)
+        def view(request):
+            def content():
+                yield 'count '
+                yield str(heavy_query())
+            return StreamingHttpResponse(content())
+
+        response = self._get(view)
+        self.assertEqual(response.status_code, 200)
+        with self.assertLogs('patents.throttling', 'WARNING'):
+            self.assertEqual(b''.join(response.streaming_content), b'count ')
+        self.assertEqual(self._get(self.quick_view).status_code, 200)
+        with override_settings(PATENTS_QUERY_BUDGETS={'search': 20_000_000}):
+            self.assertEqual(b''.join(self._get(view).streaming_content), b'count 200000')
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'default'},
+        'throttle': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'throttle'},
+    })
+    def test_own_cache(self):
+        self._get(self.quick_view)
+        key = f'{throttling.KEY_PREFIX}:bucket:search:0:10.0.0.1'
+        self.assertIsNotNone(caches['throttle'].get(key))
+        self.assertIsNone(caches['default'].get(key))
+
+
+class CompressionTests(PatentsTestCase):
+    page = b'<p>' + b'Solar cell coating. ' * 50 + b'</p>'
+    form = b'<form><input type="hidden" name="csrfmiddlewaretoken" value="abc123"></form>'
+
+    def _compress(self, response):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        return CompressionMiddleware(lambda request: response).process_response(request, response)
+
+    def _padding(self, body):
+        # Length of the file name field of a gzip header
+        self.assertEqual(body[3], gzip.FNAME)
+        return body.index(b'\x00', 10) - 10
+
+    def test_pages_without_secrets_use_brotli(self):
+        response = self._compress(HttpResponse(self.page))
+        self.assertEqual(response['Content-Encoding'], 'br')
+
+    def test_pages_with_a_csrf_token_are_padded(self):
+        paddings = set()
+        for _ in range(20):
+            response = self._compress(HttpResponse(self.page + self.form))
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(gzip.decompress(response.content), self.page + self.form)
+            paddings.add(self._padding(response.content))
+        self.assertGreater(len(paddings), 1)
+
+    def test_streams_are_padded(self):
+        paddings = set()
+        for _ in range(20):
+            response = self._compress(StreamingHttpResponse(iter([self.form, self.page, self.page])))
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            body = b''.join(response.streaming_content)
+            self.assertEqual(gzip.decompress(body), self.form + self.page + self.page)
+            paddings.add(self._padding(body))
+        self.assertGreater(len(paddings), 1)
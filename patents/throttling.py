@@ -0,0 +1,269 @@
+"""
+Admission control for the expensive pages: search, list and export.
+
+Each scope has a token bucket per client (tenant + IP address), a cap on
+the requests one client runs at once and a deployment-wide cap on requests
+running at once, all kept in a cache every worker shares. A request takes
+tokens according to its estimated cost: substring searches scan the whole
+table, so each search term costs one token per ROWS_PER_TOKEN rows of the
+table and short terms (which match, and facet-count, most rows) cost
+double. Requests that find the bucket empty or every slot taken get a 429
+with Retry-After. Per-client slots keep one client from taking every
+deployment-wide slot and locking everyone else out.
+
+Queries are also capped while the view runs: on SQLite a progress handler
+aborts any statement that goes past the scope's budget of virtual machine
+steps, so one broad search cannot hold the database for long. A streamed
+body (?all=1 pages, the change feed) spends what is left of the same
+budget while it is sent; past it the stream is cut short, since its
+status line has already gone out.
+
+The buckets and slots live in the 'throttle' cache when settings.CACHES
+defines one, else in the default cache. It needs room for an entry per
+active client and scope: a cache that culls at a few hundred entries
+forgets buckets and hands out fresh ones.
+
+Limits can be overridden with the PATENTS_RATE_LIMITS,
+PATENTS_CLIENT_CONCURRENCY_LIMITS, PATENTS_CONCURRENCY_LIMITS and
+PATENTS_QUERY_BUDGETS settings, and PATENTS_THROTTLING = False turns
+everything off. The cache updates are not atomic on the file-based cache,
+so under heavy contention the limits are approximate; they are exact per
+key on cache backends with atomic add.
+"""
+import logging
+import math
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.db import OperationalError, connection
+from django.http import HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+
+from .tenants import get_current_tenant
+
+
+logger = logging.getLogger(__name__)
+
+# scope -> (tokens added per second, bucket size)
+RATE_LIMITS = {
+    'search': (2, 30),
+    'list': (5, 60),
+    'export': (1, 50),
+}
+# scope -> requests one client runs at once
+CLIENT_CONCURRENCY_LIMITS = {
+    'search': 2,
+    'list': 3,
+    'export': 1,
+}
+# scope -> requests running at once across all workers
+CONCURRENCY_LIMITS = {
+    'search': 4,
+    'list': 8,
+    'export': 2,
+}
+# scope -> SQLite VM steps per request (roughly 5 per row scanned)
+QUERY_BUDGETS = {
+    'search': 20_000_000,
+    'list': 20_000_000,
+}
+
+ROWS_PER_TOKEN = 2000
+SHORT_TERM_LENGTH = 3
+# Seconds a concurrency slot is held if its worker dies mid-request
+SLOT_LEASE = 60
+# Seconds table sizes used for cost estimates are cached
+TABLE_SIZE_TIMEOUT = 300
+PROGRESS_INTERVAL = 10000
+
+KEY_PREFIX = 'patents:throttle'
+CACHE_ALIAS = 'throttle'
+
+
+class QueryBudgetExceeded(Exception):
+    """A statement ran past the request's query budget and was interrupted"""
+
+
+def _setting(name, defaults):
+    return {**defaults, **getattr(settings, name, {})}
+
+
+def enabled():
+    return getattr(settings, 'PATENTS_THROTTLING', True)
+
+
+def throttle_cache():
+    """The 'throttle' cache when one is configured, else the default cache"""
+    return caches[CACHE_ALIAS if CACHE_ALIAS in settings.CACHES else DEFAULT_CACHE_ALIAS]
+
+
+def client_id(request):
+    """Tenant and address of the client; behind a proxy the first forwarded address"""
+    address = request.META.get('REMOTE_ADDR', '')
+    if getattr(settings, 'PATENTS_TRUST_X_FORWARDED_FOR', False):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        address = forwarded.split(',')[0].strip() or address
+    tenant = getattr(request, 'tenant', None)
+    return f'{tenant.pk if tenant else 0}:{address}'
+
+
+def take_tokens(key, rate, burst, tokens):
+    """Take tokens from a bucket; returns 0 on success or the seconds until enough have refilled"""
+    cache = throttle_cache()
+    now = time.time()
+    level, stamp = cache.get(key, (burst, now))
+    level = min(burst, level + (now - stamp) * rate)
+    if level < tokens:
+        return (tokens - level) / rate
+    # A bucket that has refilled completely is the same as a missing key
+    cache.set(key, (level - tokens, now), math.ceil(burst / rate) + 1)
+    return 0
+
+
+def acquire_slot(prefix, limit):
+    """Key of a free one of ``limit`` concurrency slots named ``prefix``, or None when all are taken"""
+    cache = throttle_cache()
+    for i in range(limit):
+        key = f'{prefix}:{i}'
+        if cache.add(key, 1, SLOT_LEASE):
+            return key
+    return None
+
+
+def release_slots(keys):
+    throttle_cache().delete_many(keys)
+
+
+def cached_count(name, queryset):
+    """Row count of a queryset of the active tenant, cached for cost estimates"""
+    cache = throttle_cache()
+    tenant = get_current_tenant()
+    key = f'{KEY_PREFIX}:size:{tenant.pk if tenant else 0}:{name}'
+    size = cache.get(key)
+    if size is None:
+        size = queryset.count()
+        cache.set(key, size, TABLE_SIZE_TIMEOUT)
+    return size
+
+
+def search_cost(rows, terms):
+    """Estimated tokens for substring filters on ``terms`` over a table of ``rows`` rows"""
+    terms = [term.strip() for term in terms if term and term.strip()]
+    if not terms:
+        return 1
+    scan = math.ceil(rows / ROWS_PER_TOKEN)
+    return 1 + sum(scan * (2 if len(term) < SHORT_TERM_LENGTH else 1) for term in terms)
+
+
+@contextmanager
+def query_budget(steps, remaining=None):
+    """
+    Interrupt SQLite statements that run for more than ``steps`` VM steps in
+    total. Yields the list holding the steps left, to pass as ``remaining``
+    when the same request queries again later (a streamed body).
+    """
+    if not steps or connection.vendor != 'sqlite':
+        yield None
+        return
+    connection.ensure_connection()
+    if remaining is None:
+        remaining = [steps // PROGRESS_INTERVAL]
+
+    def progress():
+        remaining[0] -= 1
+        return remaining[0] < 0
+
+    connection.connection.set_progress_handler(progress, PROGRESS_INTERVAL)
+    try:
+        yield remaining
+    except OperationalError as e:
+        if remaining[0] < 0 and 'interrupted' in str(e):
+            raise QueryBudgetExceeded() from e
+        raise
+    finally:
+        connection.connection.set_progress_handler(None, 0)
+
+
+def _release_after(response, keys, steps, remaining):
+    """Free the slots now, or once a streaming response has been sent within the rest of its budget"""
+    if not response.streaming:
+        release_slots(keys)
+        return response
+    content = response.streaming_content
+
+    def stream():
+        try:
+            with query_budget(steps, remaining):
+                yield from content
+        except QueryBudgetExceeded:
+            logger.warning('Streamed response cut short by its query budget')
+        finally:
+            release_slots(keys)
+
+    response.streaming_content = stream()
+    return response
+
+
+def too_many_requests(request, retry_after, message, json=False):
+    retry_after = max(1, math.ceil(retry_after))
+    if json:
+        response = JsonResponse({'error': message, 'retry_after': retry_after}, status=429)
+    else:
+        response = HttpResponse(
+            render_to_string('patents/throttled.html', {'message': message, 'retry_after': retry_after}, request),
+            status=429,
+        )
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def throttle(scope, cost=None, json=False):
+    """
+    Rate-limit, concurrency-limit and query-cap a view. ``cost(request,
+    *args, **kwargs)`` returns the tokens a request takes (default 1);
+    ``json`` selects a JSON 429 body for endpoints read by scripts.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not enabled():
+                return view(request, *args, **kwargs)
+            rate, burst = _setting('PATENTS_RATE_LIMITS', RATE_LIMITS)[scope]
+            client = client_id(request)
+            # Capped at the bucket size so an expensive request is still possible once it refills
+            tokens = min(cost(request, *args, **kwargs) if cost else 1, burst)
+            wait = take_tokens(f'{KEY_PREFIX}:bucket:{scope}:{client}', rate, burst, tokens)
+            if wait:
+                return too_many_requests(request, wait, 'Too many requests, please slow down.', json)
+
+            client_key = acquire_slot(
+                f'{KEY_PREFIX}:slot:{scope}:{client}',
+                _setting('PATENTS_CLIENT_CONCURRENCY_LIMITS', CLIENT_CONCURRENCY_LIMITS)[scope],
+            )
+            if client_key is None:
+                return too_many_requests(request, 1, 'Wait for your other requests to finish.', json)
+            key = acquire_slot(
+                f'{KEY_PREFIX}:slot:{scope}', _setting('PATENTS_CONCURRENCY_LIMITS', CONCURRENCY_LIMITS)[scope],
+            )
+            if key is None:
+                release_slots([client_key])
+                return too_many_requests(request, 1, 'The server is busy, please try again shortly.', json)
+            keys = [client_key, key]
+            steps = _setting('PATENTS_QUERY_BUDGETS', QUERY_BUDGETS).get(scope)
+            try:
+                with query_budget(steps) as remaining:
+                    response = view(request, *args, **kwargs)
+            except QueryBudgetExceeded:
+                release_slots(keys)
+                return too_many_requests(
+                    request, burst / rate, 'This search is too broad; add more specific search terms.', json,
+                )
+            except BaseException:
+                release_slots(keys)
+                raise
+            return _release_after(response, keys, steps, remaining)
+        return wrapped
+    return decorator
@@ -0,0 +1,326 @@
+"""
+Technology-area topics for filed and granted patents.
+
+``manage.py cluster_topics`` groups a tenant's patents with mini-batch
+k-means over TF-IDF vectors of their title and abstract, reading the
+tables in keyset-paginated batches so memory stays bounded by the batch
+and the centroids (topics x vocabulary) however large the corpus is:
+
+1. one pass counts document frequencies (pruning terms seen once when the
+   counter grows past MAX_COUNTED_TERMS) and reservoir-samples records to
+   seed the centroids with k-means++;
+2. EPOCHS passes update the centroids batch by batch, each centre moving
+   towards its members with a per-centre learning rate of 1 / records
+   assigned so far;
+3. a last pass stores each record's nearest topic in its ``topic`` column.
+
+Centroids, vocabulary and IDF weights are kept as .npy files next to the
+similarity index. Records saved later are assigned to their nearest
+existing topic on save (signals.py), so the corpus is only re-clustered
+when asked to. Files whose topics are not in the database (left from
+another database, or from before restore_db) are ignored until the next
+clustering. Topics are labelled with the strongest terms of their
+centre.
+"""
+import heapq
+import json
+import math
+import random
+import threading
+import uuid
+from collections import Counter
+
+import numpy as np
+from django.core.cache import cache
+from django.utils import timezone
+from scipy import sparse
+
+from . import readstore
+from .models import PatentFiled, PatentGranted, Topic
+from .generations import current_generation, new_generation, publish, store_dir, unpublish
+from .similarity import term_counts, text_counts
+
+
+SOURCES = {
+    'filed': PatentFiled,
+    'granted': PatentGranted,
+}
+FIELDS = ['title', 'abstract']
+
+DEFAULT_TOPICS = 20
+MAX_TOPICS = 200
+BATCH_SIZE = 2000
+EPOCHS = 3
+SEED_SAMPLE = 5000
+MAX_TERMS = 20000
+# Terms in more than this share of the records say nothing about the topic
+MAX_DOCUMENT_SHARE = 0.5
+MAX_COUNTED_TERMS = 2000000
+LABEL_TERMS = 4
+
+VERSION_KEY = 'patents:topics_version:{}'
+
+_models = {}
+_lock = threading.Lock()
+
+
+# ===== CLUSTERING =====
+
+def _records(tenant_id, batch_size):
+    """(scope, pk, term counts) of every patent of a tenant, read in pk-ordered batches"""
+    for scope, model in SOURCES.items():
+        last_pk = 0
+        while True:
+            batch = list(
+                model.objects.unscoped().filter(tenant_id=tenant_id, pk__gt=last_pk)
+                .order_by('pk').values_list('pk', *FIELDS)[:batch_size]
+            )
+            if not batch:
+                break
+            for pk, *texts in batch:
+                yield scope, pk, text_counts(*texts)
+            last_pk = batch[-1][0]
+
+
+def _batches(tenant_id, vocabulary, idf, batch_size):
+    """(keys, matrix) batches of normalized TF-IDF rows; records with no known terms get empty rows"""
+    keys, indptr, indices, values = [], [0], [], []
+    for scope, pk, counts in _records(tenant_id, batch_size):
+        row = {vocabulary[t]: c for t, c in counts.items() if t in vocabulary}
+        keys.append((scope, pk))
+        indices.extend(row)
+        values.extend(row.values())
+        indptr.append(len(indices))
+        if len(keys) == batch_size:
+            yield keys, _weigh(indptr, indices, values, idf)
+            keys, indptr, indices, values = [], [0], [], []
+    if keys:
+        yield keys, _weigh(indptr, indices, values, idf)
+
+
+def _weigh(indptr, indices, counts, idf):
+    """Sublinear TF-IDF matrix with L2-normalized rows"""
+    matrix = sparse.csr_matrix(
+        (np.asarray(counts, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr)),
+        shape=(len(indptr) - 1, len(idf)),
+    )
+    matrix.data = (1 + np.log(matrix.data)) * idf[matrix.indices]
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.csr_matrix(sparse.diags(1 / norms) @ matrix, dtype=np.float32)
+
+
+def _normalized(centroids):
+    norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return centroids / norms
+
+
+def _seed(sample, k, rng):
+    """k-means++ centres chosen from a sample matrix"""
+    rows = sample.shape[0]
+    chosen = [rng.randrange(rows)]
+    distance = np.full(rows, 2.0, dtype=np.float32)
+    while len(chosen) < min(k, rows):
+        # Rows are unit vectors, so squared distance is 2 - 2 * cosine
+        similarity = np.asarray((sample @ sample[chosen[-1]].T).todense()).ravel()
+        distance = np.minimum(distance, np.maximum(2 - 2 * similarity, 0))
+        total = distance.sum()
+        if total <= 0:
+            break
+        chosen.append(int(np.searchsorted(np.cumsum(distance), rng.random() * total)))
+    return sample[chosen].toarray()
+
+
+def cluster(tenant, k=DEFAULT_TOPICS, batch_size=BATCH_SIZE, epochs=EPOCHS, progress=None, seed=0):
+    """
+    Re-cluster a tenant's patents into ``k`` topics and store every
+    record's topic. ``progress(done, total)`` is called after each batch.
+    Returns the Topic rows.
+    """
+    rng = random.Random(seed)
+
+    # Pass 1: document frequencies and a uniform sample to seed the centres
+    df = Counter()
+    sample = []
+    documents = 0
+    for scope, pk, counts in _records(tenant.pk, batch_size):
+        if not counts:
+            continue
+        documents += 1
+        df.update(counts.keys())
+        if len(df) > MAX_COUNTED_TERMS:
+            df = Counter({term: n for term, n in df.items() if n > 1})
+        if len(sample) < SEED_SAMPLE:
+            sample.append(counts)
+        elif rng.random() < SEED_SAMPLE / documents:
+            sample[rng.randrange(SEED_SAMPLE)] = counts
+
+    most = MAX_DOCUMENT_SHARE * documents if documents >= 100 else documents
+    least = 2 if documents >= 1000 else 1
+    candidates = ((term, n) for term, n in df.items() if least <= n <= most)
+    chosen = heapq.nlargest(MAX_TERMS, candidates, key=lambda item: (item[1], item[0]))
+    del df
+    terms = [term for term, n in chosen]
+    vocabulary = {term: i for i, term in enumerate(terms)}
+    idf = np.array([math.log((1 + documents) / (1 + n)) + 1 for term, n in chosen], dtype=np.float32)
+
+    rows = [{vocabulary[t]: c for t, c in counts.items() if t in vocabulary} for counts in sample]
+    rows = [row for row in rows if row]
+    if not rows:
+        return _save_topics(tenant, np.zeros((0, len(terms)), dtype=np.float32), terms, idf, [])
+    seed_matrix = _weigh(
+        np.cumsum([0] + [len(row) for row in rows]),
+        [i for row in rows for i in row], [c for row in rows for c in row.values()], idf,
+    )
+    centroids = _seed(seed_matrix, min(k, MAX_TOPICS), rng).astype(np.float32)
+    k = len(centroids)
+    seen = np.zeros(k, dtype=np.int64)
+
+    # Passes 2..: mini-batch updates, each centre's step shrinking as it gathers records
+    total_batches = (epochs + 1) * math.ceil(documents / batch_size)
+    done = 0
+    for epoch in range(epochs):
+        for keys, batch in _batches(tenant.pk, vocabulary, idf, batch_size):
+            batch = batch[batch.getnnz(axis=1) > 0]
+            if not batch.shape[0]:
+                continue
+            nearest = np.asarray(batch @ _normalized(centroids).T).argmax(axis=1)
+            members = np.bincount(nearest, minlength=k)
+            sums = sparse.csr_matrix(
+                (np.ones(len(nearest), dtype=np.float32), (nearest, np.arange(len(nearest)))),
+                shape=(k, len(nearest)),
+            ) @ batch
+            seen += members
+            moved = members > 0
+            step = (members[moved] / seen[moved]).astype(np.float32)[:, None]
+            centroids[moved] = centroids[moved] * (1 - step) + sums[moved].toarray() / seen[moved][:, None]
+            # A centre that never wins restarts at a random record of the batch
+            for empty in np.flatnonzero(seen == 0):
+                centroids[empty] = batch[rng.randrange(batch.shape[0])].toarray()
+            done += 1
+            if progress:
+                progress(done, total_batches)
+
+    # Last pass: store each record's topic (none for records sharing no term with the vocabulary)
+    unit = _normalized(centroids)
+    topics = _save_topics(tenant, unit, terms, idf, [0] * k)
+    sizes = np.zeros(k, dtype=np.int64)
+    for keys, batch in _batches(tenant.pk, vocabulary, idf, batch_size):
+        nearest = np.asarray(batch @ unit.T).argmax(axis=1)
+        nearest[batch.getnnz(axis=1) == 0] = -1
+        sizes += np.bincount(nearest[nearest >= 0], minlength=k)
+        by_topic = {}
+        for (scope, pk), number in zip(keys, nearest):
+            by_topic.setdefault((scope, int(number)), []).append(pk)
+        for (scope, number), pks in by_topic.items():
+            SOURCES[scope].objects.unscoped().filter(pk__in=pks).update(
+                topic=topics[number] if number >= 0 else None,
+            )
+        done += 1
+        if progress:
+            progress(done, total_batches)
+    for topic, size in zip(topics, sizes):
+        topic.records = int(size)
+    Topic.objects.unscoped().bulk_update(topics, ['records'])
+    # The topic columns were updated without the change log
+    readstore.invalidate(tenant.pk)
+    return topics
+
+
+def _save_topics(tenant, centroids, terms, idf, sizes):
+    """Store Topic rows and the centroid files, replacing the previous clustering"""
+    topics = []
+    for number, centre in enumerate(centroids):
+        strongest = [terms[i] for i in np.argsort(-centre)[:LABEL_TERMS * 2] if centre[i] > 0]
+        topic, _ = Topic.objects.unscoped().update_or_create(
+            tenant=tenant, number=number,
+            defaults={'label': ', '.join(strongest[:LABEL_TERMS]), 'terms': strongest, 'records': sizes[number]},
+        )
+        topics.append(topic)
+    Topic.objects.unscoped().filter(tenant=tenant, number__gte=len(centroids)).delete()
+
+    directory = new_generation(store_dir(tenant.pk, 'topics'))
+    np.save(directory / 'centroids.npy', centroids.astype(np.float32))
+    np.save(directory / 'idf.npy', idf)
+    (directory / 'terms.json').write_text(json.dumps(terms), encoding='utf-8')
+    (directory / 'manifest.json').write_text(json.dumps({
+        'topics': [topic.pk for topic in topics], 'built_at': timezone.now().isoformat(),
+    }), encoding='utf-8')
+    publish(directory)
+    invalidate(tenant.pk)
+    return topics
+
+
+# ===== ASSIGNMENT =====
+
+def invalidate(tenant_id):
+    cache.set(VERSION_KEY.format(tenant_id), uuid.uuid4().hex, None)
+
+
+def drop_model(tenant_id):
+    """Forget a tenant's clustering (after its database was replaced) until cluster_topics runs again"""
+    unpublish(store_dir(tenant_id, 'topics'))
+    invalidate(tenant_id)
+
+
+def _current_version(tenant_id):
+    key = VERSION_KEY.format(tenant_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+class TopicModel:
+    """Centroids of one clustering, memory-mapped"""
+
+    def __init__(self, directory):
+        self.centroids = np.load(directory / 'centroids.npy', mmap_mode='r')
+        self.idf = np.load(directory / 'idf.npy', mmap_mode='r')
+        terms = json.loads((directory / 'terms.json').read_text(encoding='utf-8'))
+        self.vocabulary = {term: i for i, term in enumerate(terms)}
+        self.topic_ids = json.loads((directory / 'manifest.json').read_text(encoding='utf-8'))['topics']
+
+    def nearest(self, counts):
+        """Topic id closest to a record's term counts, or None if it shares no terms"""
+        columns, weights = [], []
+        for term, count in counts.items():
+            column = self.vocabulary.get(term)
+            if column is not None:
+                columns.append(column)
+                weights.append((1 + math.log(count)) * float(self.idf[column]))
+        if not columns or not self.topic_ids:
+            return None
+        scores = self.centroids[:, columns] @ np.asarray(weights, dtype=np.float32)
+        return self.topic_ids[int(scores.argmax())] if scores.max() > 0 else None
+
+
+def _matches_database(tenant_id, model):
+    """Whether the Topic rows a clustering's files point to are the tenant's current topics"""
+    stored = Topic.objects.unscoped().filter(tenant_id=tenant_id, pk__in=model.topic_ids).count()
+    return stored == len(model.topic_ids)
+
+
+def load_model(tenant_id):
+    """The tenant's current clustering, or None if it has never been clustered in this database"""
+    version = _current_version(tenant_id)
+    entry = _models.get(tenant_id)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    directory = current_generation(store_dir(tenant_id, 'topics'))
+    model = TopicModel(directory) if directory is not None else None
+    if model is not None and not _matches_database(tenant_id, model):
+        # Files left from a clustering of another database (a fresh one, or
+        # before restore_db): its topic ids would be dangling foreign keys
+        model = None
+    with _lock:
+        _models[tenant_id] = (version, model)
+    return model
+
+
+def assign(record):
+    """Topic id for a PatentFiled/PatentGranted instance from the last clustering"""
+    model = load_model(record.tenant_id)
+    return model.nearest(term_counts(record, FIELDS)) if model is not None else None
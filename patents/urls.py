@@ -33,11 +33,38 @@ urlpatterns = [
     path('categories/create/', views.category_create, name='category_create'),
     path('categories/<int:pk>/edit/', views.category_edit, name='category_edit'),
     path('categories/<int:pk>/delete/', views.category_delete, name='category_delete'),
+    path('categories/<int:pk>/migration-status/', views.category_migration_status, name='category_migration_status'),
     
     # Dynamic IP URLs
     path('ip/<slug:category_slug>/', views.ip_list, name='ip_list'),
     path('ip/<slug:category_slug>/search/', views.ip_search, name='ip_search'),
+    path('ip/<slug:category_slug>/rows/', views.ip_rows, name='ip_rows'),
     path('ip/<slug:category_slug>/create/', views.ip_create, name='ip_create'),
     path('ip/<slug:category_slug>/<int:pk>/edit/', views.ip_edit, name='ip_edit'),
     path('ip/<slug:category_slug>/<int:pk>/delete/', views.ip_delete, name='ip_delete'),
+    
+    # Incremental table loading
+    path('tables/<str:table>/rows/', views.table_rows, name='table_rows'),
+    
+    # Analytics
+    path('analytics/lifecycle/', views.lifecycle_report, name='lifecycle_report'),
+    path('analytics/overview/', views.analytics_report, name='analytics_report'),
+    path('history/<str:table>/<int:pk>/', views.record_history, name='record_history'),
+    path('saved-searches/', views.saved_search_list, name='saved_search_list'),
+    path('saved-searches/create/', views.saved_search_create, name='saved_search_create'),
+    path('saved-searches/<int:pk>/', views.saved_search_detail, name='saved_search_detail'),
+    path('saved-searches/<int:pk>/delete/', views.saved_search_delete, name='saved_search_delete'),
+    
+    # Autocomplete
+    path('suggest/<str:scope>/<str:field>/', views.suggest, name='suggest'),
+    
+    # Similar records
+    path('related/<str:scope>/<int:pk>/', views.related, name='related'),
+    
+    # Incremental sync feed
+    path('changes/', views.changes, name='changes'),
+    
+    # Background task URLs
+    path('tasks/', views.task_list, name='task_list'),
+    path('tasks/<int:pk>/status/', views.task_status, name='task_status'),
 ]
@@ -1,9 +1,28 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.db.models import Q, Count
-from django.http import HttpResponse, JsonResponse
-from .models import Copyright, PatentFiled, PatentGranted, IPCategory, IntellectualProperty
+from django.contrib import messages
+from django.db.models import Q, Count, Avg, Min, Max
+from django.db import transaction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse, JsonResponse, QueryDict, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .models import (
+    Copyright, PatentFiled, PatentGranted, IPCategory, IntellectualProperty, CategorySchemaMigration,
+    BackgroundTask, PatentLifecycle, SavedSearch,
+)
+from . import alerts, analytics, changelog, history, reports, similarity, streaming
+from .ip_schema import diff_field_definitions
+from .registry import get_category_or_404
+from .suggest import SOURCES as SUGGEST_SOURCES, suggest as suggest_terms
+from .tables import IP_SORT_FIELDS, PAGE_SIZE, TABLES, fetch_window, ip_table_rows, parse_window
+from .task_queue import enqueue
+from .tenants import QuotaExceeded, check_quota
+from .throttling import ROWS_PER_TOKEN, cached_count, search_cost, throttle
 from django.forms import ModelForm
 import json
+import math
 
 
 # ===== FORMS =====
@@ -28,55 +47,135 @@ class PatentGrantedForm(ModelForm):
                   'application_number', 'date_of_publication', 'filing_institute', 'abstract']
 
 
+def _within_quota(request, kind):
+    """False, with an error message, if one more row of kind would pass the tenant's limit"""
+    try:
+        check_quota(request.tenant, kind)
+    except QuotaExceeded as e:
+        messages.error(request, str(e))
+        return False
+    return True
+
+
+# ===== RELATED RECORDS =====
+
+RELATED_URLS = {
+    'copyrights': 'patents:copyright_update',
+    'filed': 'patents:filed_update',
+    'granted': 'patents:granted_update',
+}
+
+
+def _related_records(request, scope, pk, limit=similarity.DEFAULT_RESULTS):
+    """Records most like one record, with links to their edit pages"""
+    records = similarity.related_records(request.tenant.pk, scope, pk, limit)
+    for record in records:
+        record['url'] = reverse(RELATED_URLS[record['scope']], args=[record['id']])
+    return records
+
+
+# ===== ADMISSION CONTROL =====
+
+def _stream_cost(request, rows):
+    """Extra throttle cost of sending every row of a table (?all=1) rather than one window"""
+    return math.ceil(rows / ROWS_PER_TOKEN) if streaming.requested(request) else 0
+
+
+def _table_list_cost(request, table):
+    """Throttle cost of a record list: one token, plus a table read when every row is streamed"""
+    spec = TABLES[table]
+    return 1 + _stream_cost(request, cached_count(table, spec.model.objects.all()))
+
+
+def _table_search_cost(request, table):
+    """Throttle cost of a record search: a table scan per search term"""
+    spec = TABLES.get(table)
+    if spec is None:
+        return 1
+    rows = cached_count(table, spec.model.objects.all())
+    return search_cost(rows, [request.GET.get(param, '') for param in spec.search_fields]) + _stream_cost(request, rows)
+
+
+def _ip_list_cost(request, category_slug):
+    """Throttle cost of an IP list: one token, plus a read of the category when every item is streamed"""
+    category = get_category_or_404(category_slug)
+    rows = cached_count(f'ip:{category.pk}', IntellectualProperty.objects.filter(category=category))
+    return 1 + _stream_cost(request, rows)
+
+
+def _ip_search_cost(request, category_slug):
+    """Throttle cost of an IP search: a scan of the category's items per search term"""
+    category = get_category_or_404(category_slug)
+    rows = cached_count(f'ip:{category.pk}', IntellectualProperty.objects.filter(category=category))
+    return search_cost(rows, [request.GET.get(f['name'], '') for f in category.field_definitions]) + _stream_cost(request, rows)
+
+
+def _feed_cost(request):
+    """Throttle cost of a change feed pull: one token per chunk of entries"""
+    try:
+        limit = min(int(request.GET.get('limit', changelog.DEFAULT_FEED_LIMIT)), changelog.MAX_FEED_LIMIT)
+    except ValueError:
+        return 1
+    return max(1, limit // changelog.FEED_CHUNK_SIZE)
+
+
 # ===== HOMEPAGE =====
 
 def home(request):
     """Homepage with dashboard statistics"""
     context = {
-        'total_copyrights': Copyright.objects.count(),
-        'total_filed': PatentFiled.objects.count(),
-        'total_granted': PatentGranted.objects.count(),
-        'recent_copyrights': Copyright.objects.all()[:5],
-        'recent_filed': PatentFiled.objects.all()[:5],
-        'recent_granted': PatentGranted.objects.all()[:5],
+        'total_copyrights': TABLES['copyrights'].rows().count(),
+        'total_filed': TABLES['filed'].rows().count(),
+        'total_granted': TABLES['granted'].rows().count(),
+        'recent_copyrights': TABLES['copyrights'].rows()[:5],
+        'recent_filed': TABLES['filed'].rows()[:5],
+        'recent_granted': TABLES['granted'].rows()[:5],
     }
     return render(request, 'patents/home.html', context)
 
 
 # ===== COPYRIGHT VIEWS =====
 
+@throttle('list', cost=lambda request: _table_list_cost(request, 'copyrights'))
 def copyright_list(request):
     """List all copyrights"""
-    copyrights = Copyright.objects.all()
-    return render(request, 'patents/copyright_list.html', {'copyrights': copyrights})
+    table = TABLES['copyrights']
+    rows = table.rows()
+    copyrights, has_more = fetch_window(rows, 0, PAGE_SIZE)
+    context = {
+        'copyrights': copyrights,
+        'has_more': has_more,
+        'total': rows.count(),
+    }
+    if has_more and streaming.requested(request):
+        return streaming.stream_page(request, 'patents/copyright_list.html', context, table.row_templates['list'], rows)
+    return render(request, 'patents/copyright_list.html', context)
 
 
+@throttle('search', cost=lambda request: _table_search_cost(request, 'copyrights'))
 def copyright_search(request):
     """Search copyrights with dynamic parameters"""
-    results = Copyright.objects.all()
+    table = TABLES['copyrights']
+    results = table.rows()
     search_performed = False
     
     if request.GET:
         search_performed = True
-        year = request.GET.get('year', '').strip()
-        faculty = request.GET.get('faculty_students', '').strip()
-        title = request.GET.get('title', '').strip()
-        inventors = request.GET.get('inventors', '').strip()
-        
-        if year:
-            results = results.filter(year__icontains=year)
-        if faculty:
-            results = results.filter(faculty_students__icontains=faculty)
-        if title:
-            results = results.filter(title__icontains=title)
-        if inventors:
-            results = results.filter(inventors__icontains=inventors)
+        results = table.filter(results, request.GET)
     
+    first_rows, has_more = fetch_window(results, 0, PAGE_SIZE) if search_performed else (None, False)
+    facets, count = table.facet_counts(results, request.GET) if search_performed else ([], 0)
     context = {
-        'results': results if search_performed else None,
+        'results': first_rows,
+        'has_more': has_more,
         'search_performed': search_performed,
-        'count': results.count() if search_performed else 0
+        'count': count,
+        'facets': facets,
     }
+    if has_more and streaming.requested(request):
+        return streaming.stream_page(
+            request, 'patents/copyright_search.html', context, table.row_templates['search'], results,
+        )
     return render(request, 'patents/copyright_search.html', context)
 
 
@@ -84,7 +183,7 @@ def copyright_create(request):
     """Create new copyright"""
     if request.method == 'POST':
         form = CopyrightForm(request.POST)
-        if form.is_valid():
+        if form.is_valid() and _within_quota(request, 'records'):
             form.save()
             return redirect('patents:copyright_list')
     else:
@@ -102,7 +201,9 @@ def copyright_update(request, pk):
             return redirect('patents:copyright_list')
     else:
         form = CopyrightForm(instance=copyright)
-    return render(request, 'patents/copyright_form.html', {'form': form, 'action': 'Update'})
+    return render(request, 'patents/copyright_form.html', {
+        'form': form, 'action': 'Update', 'related': _related_records(request, 'copyrights', pk),
+    })
 
 
 def copyright_delete(request, pk):
@@ -116,41 +217,46 @@ def copyright_delete(request, pk):
 
 # ===== PATENT FILED VIEWS =====
 
+@throttle('list', cost=lambda request: _table_list_cost(request, 'filed'))
 def filed_list(request):
     """List all filed patents"""
-    patents = PatentFiled.objects.all()
-    return render(request, 'patents/filed_list.html', {'patents': patents})
+    table = TABLES['filed']
+    rows = table.rows()
+    patents, has_more = fetch_window(rows, 0, PAGE_SIZE)
+    context = {
+        'patents': patents,
+        'has_more': has_more,
+        'total': rows.count(),
+    }
+    if has_more and streaming.requested(request):
+        return streaming.stream_page(request, 'patents/filed_list.html', context, table.row_templates['list'], rows)
+    return render(request, 'patents/filed_list.html', context)
 
 
+@throttle('search', cost=lambda request: _table_search_cost(request, 'filed'))
 def filed_search(request):
     """Search filed patents with dynamic parameters"""
-    results = PatentFiled.objects.all()
+    table = TABLES['filed']
+    results = table.rows()
     search_performed = False
     
     if request.GET:
         search_performed = True
-        date_filing = request.GET.get('date_of_filing', '').strip()
-        inventors = request.GET.get('inventors', '').strip()
-        title = request.GET.get('title', '').strip()
-        app_number = request.GET.get('application_number', '').strip()
-        applicant = request.GET.get('applicant_name', '').strip()
-        
-        if date_filing:
-            results = results.filter(date_of_filing__icontains=date_filing)
-        if inventors:
-            results = results.filter(inventors__icontains=inventors)
-        if title:
-            results = results.filter(title__icontains=title)
-        if app_number:
-            results = results.filter(application_number__icontains=app_number)
-        if applicant:
-            results = results.filter(applicant_name__icontains=applicant)
+        results = table.filter(results, request.GET)
     
+    first_rows, has_more = fetch_window(results, 0, PAGE_SIZE) if search_performed else (None, False)
+    facets, count = table.facet_counts(results, request.GET) if search_performed else ([], 0)
     context = {
-        'results': results if search_performed else None,
+        'results': first_rows,
+        'has_more': has_more,
         'search_performed': search_performed,
-        'count': results.count() if search_performed else 0
+        'count': count,
+        'facets': facets,
     }
+    if has_more and streaming.requested(request):
+        return streaming.stream_page(
+            request, 'patents/filed_search.html', context, table.row_templates['search'], results,
+        )
     return render(request, 'patents/filed_search.html', context)
 
 
@@ -158,7 +264,7 @@ def filed_create(request):
     """Create new filed patent"""
     if request.method == 'POST':
         form = PatentFiledForm(request.POST)
-        if form.is_valid():
+        if form.is_valid() and _within_quota(request, 'records'):
             form.save()
             return redirect('patents:filed_list')
     else:
@@ -176,7 +282,9 @@ def filed_update(request, pk):
             return redirect('patents:filed_list')
     else:
         form = PatentFiledForm(instance=patent)
-    return render(request, 'patents/filed_form.html', {'form': form, 'action': 'Update'})
+    return render(request, 'patents/filed_form.html', {
+        'form': form, 'action': 'Update', 'related': _related_records(request, 'filed', pk),
+    })
 
 
 def filed_delete(request, pk):
@@ -190,41 +298,46 @@ def filed_delete(request, pk):
 
 # ===== PATENT GRANTED VIEWS =====
 
+@throttle('list', cost=lambda request: _table_list_cost(request, 'granted'))
 def granted_list(request):
     """List all granted patents"""
-    patents = PatentGranted.objects.all()
-    return render(request, 'patents/granted_list.html', {'patents': patents})
+    table = TABLES['granted']
+    rows = table.rows()
+    patents, has_more = fetch_window(rows, 0, PAGE_SIZE)
+    context = {
+        'patents': patents,
+        'has_more': has_more,
+        'total': rows.count(),
+    }
+    if has_more and streaming.requested(request):
+        return streaming.stream_page(request, 'patents/granted_list.html', context, table.row_templates['list'], rows)
+    return render(request, 'patents/granted_list.html', context)
 
 
+@throttle('search', cost=lambda request: _table_search_cost(request, 'granted'))
 def granted_search(request):
     """Search granted patents with dynamic parameters"""
-    results = PatentGranted.objects.all()
+    table = TABLES['granted']
+    results = table.rows()
     search_performed = False
     
     if request.GET:
         search_performed = True
-        patent_no = request.GET.get('granted_patent_no', '').strip()
-        date_grant = request.GET.get('date_of_grant', '').strip()
-        inventors = request.GET.get('inventors', '').strip()
-        title = request.GET.get('title', '').strip()
-        filing_inst = request.GET.get('filing_institute', '').strip()
-        
-        if patent_no:
-            results = results.filter(granted_patent_no__icontains=patent_no)
-        if date_grant:
-            results = results.filter(date_of_grant__icontains=date_grant)
-        if inventors:
-            results = results.filter(inventors__icontains=inventors)
-        if title:
-            results = results.filter(title__icontains=title)
-        if filing_inst:
-            results = results.filter(filing_institute__icontains=filing_inst)
+        results = table.filter(results, request.GET)
     
+    first_rows, has_more = fetch_window(results, 0, PAGE_SIZE) if search_performed else (None, False)
+    facets, count = table.facet_counts(results, request.GET) if search_performed else ([], 0)
     context = {
-        'results': results if search_performed else None,
+        'results': first_rows,
+        'has_more': has_more,
         'search_performed': search_performed,
-        'count': results.count() if search_performed else 0
+        'count': count,
+        'facets': facets,
     }
+    if has_more and streaming.requested(request):
+        return streaming.stream_page(
+            request, 'patents/granted_search.html', context, table.row_templates['search'], results,
+        )
     return render(request, 'patents/granted_search.html', context)
 
 
@@ -232,7 +345,7 @@ def granted_create(request):
     """Create new granted patent"""
     if request.method == 'POST':
         form = PatentGrantedForm(request.POST)
-        if form.is_valid():
+        if form.is_valid() and _within_quota(request, 'records'):
             form.save()
             return redirect('patents:granted_list')
     else:
@@ -250,7 +363,9 @@ def granted_update(request, pk):
             return redirect('patents:granted_list')
     else:
         form = PatentGrantedForm(instance=patent)
-    return render(request, 'patents/granted_form.html', {'form': form, 'action': 'Update'})
+    return render(request, 'patents/granted_form.html', {
+        'form': form, 'action': 'Update', 'related': _related_records(request, 'granted', pk),
+    })
 
 
 def granted_delete(request, pk):
@@ -264,9 +379,21 @@ def granted_delete(request, pk):
 
 # ===== IP CATEGORY MANAGEMENT VIEWS =====
 
+def _posted_field_indexes(post):
+    """Indexes of the posted field definitions (removed fields leave gaps)"""
+    return sorted(
+        int(key[len('field_name_'):]) for key in post
+        if key.startswith('field_name_') and key[len('field_name_'):].isdigit()
+    )
+
+
 def category_list(request):
     """List all IP categories"""
-    categories = IPCategory.objects.all()
+    categories = list(IPCategory.objects.annotate(item_count=Count('items')))
+    migrations = CategorySchemaMigration.objects.filter(category__tenant=request.tenant).exclude(status='done')
+    unfinished = {m.category_id: m for m in migrations.order_by('pk')}
+    for category in categories:
+        category.active_migration = unfinished.get(category.pk)
     return render(request, 'patents/category_list.html', {'categories': categories})
 
 
@@ -278,8 +405,7 @@ def category_create(request):
         
         # Parse field definitions from POST data
         field_definitions = []
-        field_count = 0
-        while f'field_name_{field_count}' in request.POST:
+        for field_count in _posted_field_indexes(request.POST):
             field_name = request.POST.get(f'field_name_{field_count}', '').strip()
             field_label = request.POST.get(f'field_label_{field_count}', '').strip()
             field_type = request.POST.get(f'field_type_{field_count}', 'text')
@@ -300,10 +426,8 @@ def category_create(request):
                     field_def['options'] = options
                 
                 field_definitions.append(field_def)
-            
-            field_count += 1
         
-        if name and field_definitions:
+        if name and field_definitions and _within_quota(request, 'categories'):
             category = IPCategory.objects.create(
                 name=name,
                 description=description,
@@ -324,14 +448,18 @@ def category_edit(request, pk):
         
         # Parse field definitions from POST data
         field_definitions = []
-        field_count = 0
-        while f'field_name_{field_count}' in request.POST:
+        renames = {}
+        for field_count in _posted_field_indexes(request.POST):
             field_name = request.POST.get(f'field_name_{field_count}', '').strip()
             field_label = request.POST.get(f'field_label_{field_count}', '').strip()
             field_type = request.POST.get(f'field_type_{field_count}', 'text')
             field_required = request.POST.get(f'field_required_{field_count}') == 'on'
+            original_name = request.POST.get(f'field_original_name_{field_count}', '').strip()
             
             if field_name and field_label:
+                if original_name:
+                    renames[original_name] = field_name
+                
                 field_def = {
                     'name': field_name,
                     'label': field_label,
@@ -346,12 +474,20 @@ def category_edit(request, pk):
                     field_def['options'] = options
                 
                 field_definitions.append(field_def)
-            
-            field_count += 1
         
         if category.name and field_definitions:
-            category.field_definitions = field_definitions
-            category.save()
+            # Existing item data is rewritten in the background to match the new fields
+            operations = diff_field_definitions(category.field_definitions, field_definitions, renames)
+            with transaction.atomic():
+                category.field_definitions = field_definitions
+                category.save()
+                if operations:
+                    CategorySchemaMigration.objects.create(
+                        category=category,
+                        operations=operations,
+                        field_definitions=field_definitions
+                    )
+                    enqueue('category_schema_migration')
             return redirect('patents:category_list')
     
     return render(request, 'patents/category_form.html', {
@@ -360,6 +496,22 @@ def category_edit(request, pk):
     })
 
 
+def category_migration_status(request, pk):
+    """Progress of the latest data migration for a category (JSON)"""
+    category = get_object_or_404(IPCategory, pk=pk)
+    migration = category.schema_migrations.order_by('-pk').first()
+    if migration is None:
+        return JsonResponse({'status': None})
+    return JsonResponse({
+        'status': migration.status,
+        'operations': migration.operations,
+        'total_items': migration.total_items,
+        'processed_items': migration.processed_items,
+        'progress_percent': migration.progress_percent,
+        'error': migration.error,
+    })
+
+
 def category_delete(request, pk):
     """Delete an IP category"""
     category = get_object_or_404(IPCategory, pk=pk)
@@ -371,19 +523,52 @@ def category_delete(request, pk):
 
 # ===== DYNAMIC IP VIEWS =====
 
+def _category_items(category):
+    """Items of a category with only the columns the list/search tables render"""
+    return (
+        IntellectualProperty.objects.filter(category=category)
+        .select_related('category')
+        .only('pk', 'data_summary', 'created_at', 'category__name', 'category__slug')
+    )
+
+
+def _search_category_items(category, items, params):
+    """Filter items on the category's fields (case-insensitive partial match)"""
+    for field_def in category.field_definitions:
+        field_name = field_def['name']
+        search_value = params.get(field_name, '').strip()
+        
+        if search_value:
+            # Search in JSON data field
+            # Filter items where data contains the field with matching value
+            items = items.filter(
+                **{f'data__{field_name}__icontains': search_value}
+            )
+    return items
+
+
+@throttle('list', cost=_ip_list_cost)
 def ip_list(request, category_slug):
     """List all IPs in a category"""
-    category = get_object_or_404(IPCategory, slug=category_slug)
-    items = IntellectualProperty.objects.filter(category=category)
-    return render(request, 'patents/ip_list.html', {
+    category = get_category_or_404(category_slug)
+    items, has_more = fetch_window(_category_items(category), 0, PAGE_SIZE)
+    context = {
         'category': category,
-        'items': items
-    })
+        'items': ip_table_rows(category, items),
+        'has_more': has_more,
+        'total': IntellectualProperty.objects.filter(category=category).count(),
+    }
+    if has_more and streaming.requested(request):
+        return streaming.stream_page(
+            request, 'patents/ip_list.html', context, 'patents/rows/ip_rows.html', _category_items(category),
+            prepare_rows=lambda rows: ip_table_rows(category, rows),
+        )
+    return render(request, 'patents/ip_list.html', context)
 
 
 def ip_create(request, category_slug):
     """Create a new IP in a category"""
-    category = get_object_or_404(IPCategory, slug=category_slug)
+    category = get_category_or_404(category_slug)
     
     if request.method == 'POST':
         data = {}
@@ -393,7 +578,7 @@ def ip_create(request, category_slug):
             if value:
                 data[field_name] = value
         
-        if data:
+        if data and _within_quota(request, 'records'):
             IntellectualProperty.objects.create(
                 category=category,
                 data=data
@@ -408,7 +593,7 @@ def ip_create(request, category_slug):
 
 def ip_edit(request, category_slug, pk):
     """Edit an existing IP"""
-    category = get_object_or_404(IPCategory, slug=category_slug)
+    category = get_category_or_404(category_slug)
     ip_item = get_object_or_404(IntellectualProperty, pk=pk, category=category)
     
     if request.method == 'POST':
@@ -420,6 +605,7 @@ def ip_edit(request, category_slug, pk):
                 data[field_name] = value
         
         if data:
+            ip_item.category = category
             ip_item.data = data
             ip_item.save()
             return redirect('patents:ip_list', category_slug=category_slug)
@@ -433,7 +619,7 @@ def ip_edit(request, category_slug, pk):
 
 def ip_delete(request, category_slug, pk):
     """Delete an IP"""
-    category = get_object_or_404(IPCategory, slug=category_slug)
+    category = get_category_or_404(category_slug)
     ip_item = get_object_or_404(IntellectualProperty, pk=pk, category=category)
     
     if request.method == 'POST':
@@ -446,27 +632,282 @@ def ip_delete(request, category_slug, pk):
     })
 
 
+@throttle('search', cost=_ip_search_cost)
 def ip_search(request, category_slug):
     """Search IPs in a category"""
-    category = get_object_or_404(IPCategory, slug=category_slug)
-    items = IntellectualProperty.objects.filter(category=category)
+    category = get_category_or_404(category_slug)
+    items = _category_items(category)
     
     # Build search query
     if request.method == 'GET' and request.GET:
-        query_parts = []
-        for field_def in category.field_definitions:
-            field_name = field_def['name']
-            search_value = request.GET.get(field_name, '').strip()
-            
-            if search_value:
-                # Search in JSON data field
-                # Filter items where data contains the field with matching value
-                items = items.filter(
-                    **{f'data__{field_name}__icontains': search_value}
-                )
+        items = _search_category_items(category, items, request.GET)
     
-    return render(request, 'patents/ip_search.html', {
+    first_rows, has_more = fetch_window(items, 0, PAGE_SIZE)
+    context = {
         'category': category,
-        'items': items
+        'items': ip_table_rows(category, first_rows),
+        'has_more': has_more,
+        'total': items.count(),
+    }
+    if has_more and streaming.requested(request):
+        return streaming.stream_page(
+            request, 'patents/ip_search.html', context, 'patents/rows/ip_rows.html', items,
+            prepare_rows=lambda rows: ip_table_rows(category, rows),
+        )
+    return render(request, 'patents/ip_search.html', context)
+
+
+# ===== INCREMENTAL TABLE LOADING =====
+
+def _rows_response(request, queryset, template, context, prepare_rows=None):
+    """Render one window of table rows as JSON for the incremental table script"""
+    offset, limit = parse_window(request.GET)
+    rows, has_more = fetch_window(queryset, offset, limit)
+    count = len(rows)
+    if prepare_rows:
+        rows = prepare_rows(rows)
+    data = {
+        'html': render_to_string(template, dict(context, rows=rows), request=request),
+        'offset': offset,
+        'count': count,
+        'has_more': has_more,
+    }
+    if offset == 0:
+        data['total'] = queryset.count()
+    return JsonResponse(data)
+
+
+@throttle('search', cost=_table_search_cost, json=True)
+def table_rows(request, table):
+    """Rows of a record table, sorted and filtered on the server"""
+    spec = TABLES.get(table)
+    if spec is None:
+        raise Http404('Unknown table')
+    layout = 'search' if request.GET.get('layout') == 'search' else 'list'
+    queryset = spec.filter(spec.rows(), request.GET)
+    queryset = spec.order(queryset, request.GET.get('sort'), request.GET.get('dir'))
+    return _rows_response(request, queryset, spec.row_templates[layout], {})
+
+
+@throttle('search', cost=_ip_search_cost, json=True)
+def ip_rows(request, category_slug):
+    """Rows of a dynamic IP table, sorted and filtered on the server"""
+    category = get_category_or_404(category_slug)
+    items = _search_category_items(category, _category_items(category), request.GET)
+    column = IP_SORT_FIELDS.get(request.GET.get('sort'))
+    if column:
+        prefix = '-' if request.GET.get('dir') == 'desc' else ''
+        items = items.order_by(f'{prefix}{column}', f'{prefix}pk')
+    return _rows_response(
+        request, items, 'patents/rows/ip_rows.html', {'category': category},
+        prepare_rows=lambda rows: ip_table_rows(category, rows),
+    )
+
+
+# ===== ANALYTICS =====
+
+@throttle('list')
+def lifecycle_report(request):
+    """Filed-to-granted funnel and time to grant per filing year"""
+    # The grant rate is the share of filings granted; grants whose application
+    # has no filing record are counted apart
+    years = list(
+        PatentLifecycle.objects.order_by('-filing_year').values('filing_year').annotate(
+            filings=Count('filed'),
+            grants=Count('pk', filter=Q(filed__isnull=False, granted__isnull=False)),
+            grants_without_filing=Count('pk', filter=Q(filed__isnull=True, granted__isnull=False)),
+            avg_days=Avg('days_to_grant'),
+            min_days=Min('days_to_grant'),
+            max_days=Max('days_to_grant'),
+        )
+    )
+    totals = {'filings': 0, 'grants': 0, 'grants_without_filing': 0}
+    for year in years:
+        year['grant_rate'] = 100 * year['grants'] / year['filings'] if year['filings'] else None
+        for key in totals:
+            totals[key] += year[key]
+    totals['grant_rate'] = 100 * totals['grants'] / totals['filings'] if totals['filings'] else None
+    totals.update(PatentLifecycle.objects.aggregate(avg_days=Avg('days_to_grant')))
+    return render(request, 'patents/lifecycle.html', {'years': years, 'totals': totals})
+
+
+@throttle('list')
+def analytics_report(request):
+    """Records per year, top applicants and institutes, topics and IP items, from the last snapshot"""
+    snapshot = analytics.Snapshot.current(request.tenant.pk)
+    if snapshot is None:
+        return render(request, 'patents/analytics.html', {'snapshot': None})
+    return render(request, 'patents/analytics.html', {
+        'snapshot': snapshot,
+        'changes_since': max(changelog.head(request.tenant) - snapshot.change_seq, 0),
+        'years': reports.records_per_year(snapshot),
+        'applicants': reports.top_values(snapshot, 'filed', 'applicant_facet'),
+        'institutes': reports.top_values(snapshot, 'granted', 'institute_facet'),
+        'topics': reports.topic_counts(snapshot),
+        'ip_counts': reports.ip_counts(snapshot),
+    })
+
+
+# ===== HISTORY =====
+
+def _history_rows(table, state):
+    """(label, value) of a reconstructed version, IP data expanded field by field"""
+    rows = []
+    for field in history.history_fields(history.MODELS[table]):
+        value = state.get(field.attname)
+        if field.attname == 'data' and isinstance(value, dict):
+            rows.extend((name.replace('_', ' ').title(), item) for name, item in value.items())
+        elif not field.is_relation:
+            rows.append((field.verbose_name, value))
+    return rows
+
+
+@throttle('list')
+def record_history(request, table, pk):
+    """Versions of a record or IP item, and its values as of a chosen time"""
+    if table not in history.MODELS:
+        raise Http404('Unknown table')
+    versions = history.versions(request.tenant.pk, table, pk)
+    if not versions:
+        raise Http404('No history for this record')
+    
+    as_of = request.GET.get('as_of', '').strip()
+    try:
+        when = parse_datetime(as_of)
+        if when is None and parse_date(as_of):
+            # A date alone means the end of that day
+            when = parse_datetime(f'{as_of}T23:59:59.999999')
+    except ValueError:
+        when = None
+    found = None
+    if when is not None:
+        if timezone.is_naive(when):
+            when = timezone.make_aware(when)
+        found = history.as_of(request.tenant.pk, table, pk, when)
+    return render(request, 'patents/history.html', {
+        'table': table,
+        'pk': pk,
+        'versions': versions,
+        'as_of': as_of,
+        'when': when,
+        'version': found[0] if found else None,
+        'rows': _history_rows(table, found[1]) if found else None,
     })
 
+
+# ===== SAVED SEARCHES =====
+
+def saved_search_list(request):
+    """Saved searches with their unseen alerts"""
+    searches = list(SavedSearch.objects.annotate(unseen=Count('alerts', filter=Q(alerts__seen=False))))
+    for search in searches:
+        search.url = alerts.search_url(search)
+    return render(request, 'patents/saved_search_list.html', {'searches': searches})
+
+
+def saved_search_create(request):
+    """Save the search shown on a search page"""
+    scope = request.POST.get('scope', '')
+    if request.method != 'POST' or scope not in alerts.SOURCES:
+        raise Http404('Unknown table')
+    params = alerts.search_params(scope, QueryDict(request.POST.get('query', '')))
+    name = request.POST.get('name', '').strip()[:200]
+    if not params or not name:
+        messages.error(request, 'Give the search a name and at least one condition.')
+        return redirect(reverse(f'patents:{scope}_search') + '?' + request.POST.get('query', ''))
+    alerts.save_search(name, scope, params)
+    messages.success(request, f'Saved "{name}"; new matching records will be listed here.')
+    return redirect('patents:saved_search_list')
+
+
+def saved_search_detail(request, pk):
+    """Alerts of one saved search, newest first; showing them marks them seen"""
+    search = get_object_or_404(SavedSearch, pk=pk)
+    found = list(search.alerts.all()[:PAGE_SIZE])
+    model = TABLES[search.scope].model
+    titles = dict(model.objects.filter(pk__in=[a.object_id for a in found]).values_list('pk', 'title_summary'))
+    for alert in found:
+        alert.title = titles.get(alert.object_id)
+        alert.url = reverse(RELATED_URLS[search.scope], args=[alert.object_id]) if alert.title is not None else None
+    search.alerts.filter(pk__in=[a.pk for a in found if not a.seen]).update(seen=True)
+    return render(request, 'patents/saved_search_detail.html', {
+        'search': search, 'alerts': found, 'url': alerts.search_url(search),
+    })
+
+
+def saved_search_delete(request, pk):
+    """Delete a saved search and its alerts"""
+    search = get_object_or_404(SavedSearch, pk=pk)
+    if request.method == 'POST':
+        search.delete()
+        messages.success(request, f'Deleted "{search.name}".')
+    return redirect('patents:saved_search_list')
+
+
+# ===== AUTOCOMPLETE =====
+
+def suggest(request, scope, field):
+    """Search-as-you-type suggestions for one search field (JSON)"""
+    source = SUGGEST_SOURCES.get(scope)
+    if source is None or field not in source[1]:
+        raise Http404('Unknown suggestion field')
+    return JsonResponse({'suggestions': suggest_terms(request.tenant.pk, scope, field, request.GET.get('q', ''))})
+
+
+@throttle('search', json=True)
+def related(request, scope, pk):
+    """Records most similar to one record by title and abstract (JSON)"""
+    if scope not in similarity.SOURCES:
+        raise Http404('Unknown table')
+    try:
+        limit = min(max(int(request.GET.get('limit', similarity.DEFAULT_RESULTS)), 1), similarity.MAX_RESULTS)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+    get_object_or_404(similarity.SOURCES[scope][0], pk=pk)
+    return JsonResponse({'related': _related_records(request, scope, pk, limit)})
+
+
+# ===== CHANGE FEED =====
+
+@throttle('export', cost=_feed_cost, json=True)
+def changes(request):
+    """Change log entries after ?since=<seq>, streamed as NDJSON"""
+    try:
+        since = max(int(request.GET.get('since', 0)), 0)
+        limit = min(max(int(request.GET.get('limit', changelog.DEFAULT_FEED_LIMIT)), 1), changelog.MAX_FEED_LIMIT)
+    except ValueError:
+        return JsonResponse({'error': 'since and limit must be integers'}, status=400)
+    table = request.GET.get('table') or None
+    if table and table not in changelog.TABLE_NAMES:
+        return JsonResponse({'error': f'Unknown table: {table}'}, status=400)
+    
+    head = changelog.head(request.tenant)
+    lines = (
+        json.dumps(entry.as_dict(), cls=DjangoJSONEncoder) + '\n'
+        for entry in changelog.entries_since(request.tenant, since, limit, table)
+    )
+    response = StreamingHttpResponse(lines, content_type='application/x-ndjson')
+    # Newest sequence number when the feed started; resume from the last line's seq
+    response['X-Change-Log-Head'] = str(head)
+    return response
+
+
+# ===== BACKGROUND TASK VIEWS =====
+
+def task_list(request):
+    """Recent background tasks and their progress"""
+    tasks = BackgroundTask.objects.all()
+    status = request.GET.get('status', '').strip()
+    if status:
+        tasks = tasks.filter(status=status)
+    return render(request, 'patents/task_list.html', {
+        'tasks': tasks[:100],
+        'status': status,
+        'status_choices': BackgroundTask.STATUS_CHOICES,
+    })
+
+
+def task_status(request, pk):
+    """Status and progress of a single background task (JSON)"""
+    task_obj = get_object_or_404(BackgroundTask, pk=pk)
+    return JsonResponse(task_obj.as_dict())
@@ -0,0 +1,113 @@
+"""
+Warm-up of a preloaded application, run by the gunicorn master before it
+forks workers (see gunicorn.conf.py).
+
+Everything Django and this app otherwise build on the first request -
+URL patterns, compiled templates, tenant host lookups, category registry
+entries, the memory-mapped similarity index and topic centroids, and the
+read store's tables when it is on - is built once in the master. Workers
+inherit it through fork and share the pages copy-on-write, so they serve
+their first request at full speed.
+Every phase is timed; a phase that fails (say, the database is not
+migrated yet) is logged and skipped rather than stopping the server.
+"""
+import logging
+import time
+from pathlib import Path
+
+from django.db import connections
+from django.template import engines
+from django.template.utils import get_app_template_dirs
+from django.urls import get_resolver
+
+from . import readstore, registry, similarity, topics
+from .models import IPCategory, Tenant
+from .tables import TABLES
+from .tenants import resolve_tenant, tenant_context
+
+
+logger = logging.getLogger(__name__)
+
+
+def _populate(resolver):
+    """Fill the reverse() tables of a resolver and its namespaces; returns the named patterns"""
+    named = len(resolver.reverse_dict)
+    for _, namespace in resolver.namespace_dict.values():
+        named += _populate(namespace)
+    return named
+
+
+def warm_urls():
+    """Compile every URL pattern and fill the reverse() lookup tables"""
+    resolver = get_resolver()
+    named = _populate(resolver)
+    resolver.resolve('/')
+    return named
+
+
+def warm_templates():
+    """Compile every template into the cached loader"""
+    compiled = 0
+    for backend in engines.all():
+        engine = getattr(backend, 'engine', None)
+        if engine is None:
+            continue
+        dirs = [Path(d) for d in engine.dirs] + [Path(d) for d in get_app_template_dirs('templates')]
+        for directory in dirs:
+            for path in directory.rglob('*.html'):
+                engine.get_template(path.relative_to(directory).as_posix())
+                compiled += 1
+    return compiled
+
+
+def warm_tenants():
+    """Resolve every institute's host name and load its IP categories"""
+    tenants = list(Tenant.objects.filter(is_active=True))
+    for tenant in tenants:
+        if tenant.domain:
+            resolve_tenant(tenant.domain)
+        with tenant_context(tenant):
+            for slug in IPCategory.objects.values_list('slug', flat=True):
+                registry.get_category(slug)
+    return len(tenants)
+
+
+def warm_indexes():
+    """Open every institute's similarity index and topic centroids"""
+    opened = 0
+    for tenant_id in Tenant.objects.filter(is_active=True).values_list('pk', flat=True):
+        opened += similarity.load_index(tenant_id) is not None
+        opened += topics.load_model(tenant_id) is not None
+    return opened
+
+
+def warm_read_store():
+    """Load every institute's record tables into the read store, if it is on"""
+    if not readstore.enabled():
+        return 0
+    return readstore.load_all(TABLES.values())
+
+
+PHASES = [
+    ('url patterns', warm_urls),
+    ('templates', warm_templates),
+    ('tenants', warm_tenants),
+    ('indexes', warm_indexes),
+    ('read store', warm_read_store),
+]
+
+
+def warm_up():
+    """Run every phase; returns [(phase, seconds, count or None if it failed)]"""
+    timings = []
+    for name, phase in PHASES:
+        started = time.perf_counter()
+        try:
+            count = phase()
+        except Exception:
+            logger.exception('Warm-up phase "%s" failed', name)
+            count = None
+        timings.append((name, time.perf_counter() - started, count))
+    # Forked workers must not share the master's database connections
+    connections.close_all()
+    return timings